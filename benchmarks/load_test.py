@@ -0,0 +1,143 @@
+"""
+Đo thông lượng dịch vụ HTTP (src/service.py) trên localhost.
+
+    python src/service.py --port 8600 --workers 4 &
+    python benchmarks/load_test.py --url http://127.0.0.1:8600 --requests 5000 --concurrency 64
+    python benchmarks/load_test.py --spawn --workers 4      # tự khởi động dịch vụ rồi đo
+
+Bảng điểm gửi đi được sinh theo lộ trình thật (benchmarks/synthetic.py), trộn
+đủ 4 loại yêu cầu. In ra req/s, độ trễ p50/p95/p99 và số lỗi.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError  # noqa: E402
+
+import synthetic  # noqa: E402
+
+# Tỉ lệ các loại yêu cầu trong tải giả lập
+OP_MIX = {'suggestions': 4, 'gpa': 3, 'easiest-subjects': 2, 'credits-needed': 1}
+
+
+def build_requests(data, n, seed=0):
+    """n cặp (op, body) trộn theo OP_MIX, bảng điểm theo lộ trình từng ngành"""
+    rng = random.Random(seed)
+    pools = {
+        code: list(synthetic.generate_transcripts(data, code, 200, seed=seed).values())
+        for code in data['majors']
+    }
+    ops = [op for op, weight in OP_MIX.items() for _ in range(weight)]
+    requests = []
+    for _ in range(n):
+        op = rng.choice(ops)
+        code = rng.choice(list(pools))
+        transcript, done = rng.choice(pools[code])
+        if op == 'gpa':
+            body = {'transcript': transcript}
+        elif op == 'suggestions':
+            body = {'transcript': transcript, 'major_code': code, 'current_sem': done}
+        elif op == 'easiest-subjects':
+            body = {'transcript': transcript, 'major_code': code, 'current_sem': done, 'limit': 4}
+        else:
+            body = {'current_gpa': round(rng.uniform(2, 3.5), 2), 'current_credits': rng.randint(0, 120),
+                    'target_gpa': 3.2, 'performance_gpa': 3.6}
+        requests.append((op, json.dumps(body, ensure_ascii=False)))
+    return requests
+
+
+async def run_load(url, requests, concurrency):
+    """Gửi requests với tối đa `concurrency` yêu cầu đồng thời; trả về thống kê"""
+    client = AsyncHTTPClient(max_clients=concurrency)
+    latencies = []
+    errors = 0
+    queue = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for op, body in queue:
+            start = time.perf_counter()
+            try:
+                await client.fetch(f'{url}/{op}', method='POST', body=body,
+                                   headers={'Content-Type': 'application/json'})
+            except (HTTPClientError, OSError):
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+    }
+
+
+async def wait_ready(url, timeout=60):
+    client = AsyncHTTPClient()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.fetch(f'{url}/health')
+            return True
+        except (HTTPClientError, OSError):
+            await asyncio.sleep(0.2)
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8600')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--data', default=os.path.join(ROOT_DIR, 'data', 'curriculum.json'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spawn', action='store_true', help="Tự chạy src/service.py cho lần đo")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    requests = build_requests(data, args.requests, args.seed)
+
+    server = None
+    if args.spawn:
+        port = args.url.rsplit(':', 1)[-1].strip('/')
+        cmd = [sys.executable, os.path.join(ROOT_DIR, 'src', 'service.py'), '--port', port, '--data', args.data]
+        if args.workers:
+            cmd += ['--workers', str(args.workers)]
+        server = subprocess.Popen(cmd)
+    try:
+        if not asyncio.run(wait_ready(args.url)):
+            print(f"❌ Dịch vụ không phản hồi tại {args.url}")
+            return 1
+        stats = asyncio.run(run_load(args.url, requests, args.concurrency))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"✅ {stats['requests']} yêu cầu trong {stats['seconds']:.2f}s -> {stats['rps']:.0f} req/s "
+          f"| p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms "
+          f"| lỗi: {stats['errors']}")
+    return 0 if stats['errors'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+Benchmark engine tư vấn trên dữ liệu tổng hợp.
+
+    python benchmarks/run_benchmarks.py --sizes 100 1000 10000 --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench_v1.json --output bench_v2.json
+
+Ghi thời gian (median/p95 mỗi lần gọi) và bộ nhớ đỉnh (tracemalloc) cho mọi
+hàm của AcademicAdvisor và ETL tools/convert_data.py (kèm khởi động ấm từ
+snapshot của knowledge_base/ do ETL sinh ra). Với --compare, các ca
+chậm hơn baseline quá --tolerance lần bị báo và script trả mã lỗi 1.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tools'))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import synthetic  # noqa: E402
+from convert_data import run_conversion  # noqa: E402
+from decision_engine import AcademicAdvisor  # noqa: E402
+from grade_model import GradeModel  # noqa: E402
+
+
+def measure(fn, repeat):
+    """Chạy fn `repeat` lần lấy thời gian, thêm 1 lần dưới tracemalloc lấy bộ nhớ đỉnh"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times.sort()
+    return {
+        'median_ms': statistics.median(times) * 1000,
+        'p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+        'peak_kb': peak / 1024,
+        'repeat': repeat,
+    }
+
+
+def bench_size(n_subjects, n_students, repeat, workdir, with_etl=True, seed=0):
+    """Toàn bộ các ca cho một cỡ danh mục; trả về list kết quả"""
+    data = synthetic.generate_curriculum(n_subjects, seed=seed)
+    path = os.path.join(workdir, f'curriculum_{n_subjects}.json')
+    synthetic.write_curriculum(data, path)
+    major = next(iter(data['majors']))
+    cohort = synthetic.generate_transcripts(data, major, n_students, seed=seed)
+    cohort_df = synthetic.transcripts_frame(cohort)
+    samples = itertools.cycle(list(cohort.values())[:200])
+    advisor = AcademicAdvisor(path)
+    compact = itertools.cycle([advisor.compact_transcript(t) for t, _ in list(cohort.values())[:200]])
+    sub_ids = itertools.cycle(list(data['subjects']))
+    # Giỏ môn mẫu cho kiểm tra luật: 6 môn đầu lộ trình, giống nhau cho mọi SV
+    plan_ids = [s for _, ids in sorted(data['majors'][major]['roadmap'].items(), key=lambda kv: int(kv[0]))
+                for s in ids][:6]
+    plans_df = pd.DataFrame([(student, s) for student in cohort for s in plan_ids],
+                           columns=['student', 'subject'])
+    # Mô hình điểm từ cả khóa tổng hợp; ca observe là một lần nộp điểm (đổi 1 dòng)
+    grade_counts = cohort_df.groupby(['subject', 'grade']).size().rename('n').reset_index()
+    grade_model = GradeModel()
+    grade_model.add(grade_counts)
+    grade_changes = itertools.cycle([[(s, 'B', 'A')] for s in itertools.islice(sub_ids, 200)])
+    roadmap_ids = list(dict.fromkeys(s for _, s in advisor.graph.roadmap_entries[major]))
+
+    def per_student(call):
+        def run():
+            transcript, done = next(samples)
+            call(transcript, done)
+        return run
+
+    cases = {
+        '__init__': lambda: AcademicAdvisor(path),
+        'calculate_gpa': per_student(lambda t, d: advisor.calculate_gpa(t)),
+        'compact_transcript': per_student(lambda t, d: advisor.compact_transcript(t)),
+        'calculate_gpa[compact]': lambda: advisor.calculate_gpa(next(compact)),
+        'grade_contribution': lambda: advisor.grade_contribution(next(sub_ids), 'B+'),
+        'suggest_next_semester': per_student(lambda t, d: advisor.suggest_next_semester(t, major, d)),
+        'score_candidate': lambda: advisor.score_candidate(3, next(sub_ids), 2),
+        'critical_path': lambda: advisor.critical_path(next(sub_ids)),
+        'min_semesters_remaining': per_student(lambda t, d: advisor.min_semesters_remaining(t, major)),
+        'auto_fill_basket': per_student(lambda t, d: advisor.auto_fill_basket(t, major, d, difficulty_penalty=2)),
+        'plan_graduation': per_student(lambda t, d: advisor.plan_graduation(t, major, d)),
+        'failure_impact': per_student(lambda t, d: advisor.failure_impact(t, major, d, workers=1)),
+        'advise_cohort': lambda: advisor.advise_cohort(cohort_df, major, 3, top_k=10),
+        'check_plan': per_student(lambda t, d: advisor.check_plan(t, plan_ids, d)),
+        'check_cohort_plans': lambda: advisor.check_cohort_plans(cohort_df, plans_df, 3),
+        'calculate_credits_needed': lambda: advisor.calculate_credits_needed(2.8, 60, 3.2, 3.6),
+        'optimize_gpa': per_student(lambda t, d: advisor.optimize_gpa(t, 3.2)),
+        'project_gpa_grid': lambda: advisor.project_gpa_grid(
+            2.8, 60, np.linspace(2, 4, 41), np.linspace(2, 4, 41), np.arange(0, 151, 3)),
+        'simulate_gpa': per_student(lambda t, d: advisor.simulate_gpa(t, major, 3.2, 3.4, n_sims=2000, seed=0)),
+        'find_easiest_subjects': per_student(lambda t, d: advisor.find_easiest_subjects(t, [], major_code=major)),
+        'find_easiest_subjects[grade_model]': per_student(
+            lambda t, d: advisor.find_easiest_subjects(t, [], major_code=major, grade_model=grade_model)),
+        'remaining_roadmap': per_student(lambda t, d: advisor.remaining_roadmap(t, major)),
+        'expected_grades': lambda: advisor.expected_grades(roadmap_ids, grade_model),
+        'GradeModel.add': lambda: GradeModel().add(grade_counts),
+        'GradeModel.observe': lambda: grade_model.observe(next(grade_changes)),
+    }
+    # Ca nặng chạy ít lần hơn
+    heavy = {'__init__', 'advise_cohort', 'check_cohort_plans', 'plan_graduation', 'failure_impact',
+             'simulate_gpa'}
+
+    results = []
+    for name, fn in cases.items():
+        stats = measure(fn, max(1, repeat // 10) if name in heavy else repeat)
+        case = name if name.startswith('GradeModel.') else f'AcademicAdvisor.{name}'
+        results.append({'case': case, 'subjects': n_subjects, **stats})
+
+    if with_etl:
+        xlsx = os.path.join(workdir, f'data_{n_subjects}.xlsx')
+        synthetic.write_workbook(data, xlsx)
+        out_dir = os.path.join(workdir, f'kb_{n_subjects}')
+
+        def etl():
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_conversion(xlsx, out_dir)
+        results.append({'case': 'convert_data.run_conversion', 'subjects': n_subjects, **measure(etl, 2)})
+        # Khởi động ấm từ snapshot của knowledge_base/ (lần đầu biên dịch, không tính)
+        AcademicAdvisor(out_dir)
+        results.append({'case': 'AcademicAdvisor.__init__[snapshot]', 'subjects': n_subjects,
+                        **measure(lambda: AcademicAdvisor(out_dir), max(1, repeat // 10))})
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Trả về danh sách các ca chậm hơn baseline quá tolerance lần"""
+    old = {(r['case'], r['subjects']): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        ref = old.get((r['case'], r['subjects']))
+        if ref and ref['median_ms'] > 0 and r['median_ms'] / ref['median_ms'] > tolerance:
+            regressions.append((r, ref))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-etl', action='store_true')
+    parser.add_argument('--output', help="Ghi kết quả JSON (dùng làm baseline cho lần sau)")
+    parser.add_argument('--compare', help="File JSON baseline để so sánh")
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results += bench_size(size, args.students, args.repeat, workdir,
+                                  with_etl=not args.skip_etl, seed=args.seed)
+
+    print(f"{'Ca đo':<45}{'Số môn':>8}{'median ms':>12}{'p95 ms':>10}{'peak KB':>12}")
+    for r in results:
+        print(f"{r['case']:<45}{r['subjects']:>8}{r['median_ms']:>12.3f}{r['p95_ms']:>10.3f}{r['peak_kb']:>12.1f}")
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'students': args.students,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r, ref in regressions:
+            print(f"⚠️ Chậm đi: {r['case']} ({r['subjects']} môn) "
+                  f"{ref['median_ms']:.3f} -> {r['median_ms']:.3f} ms")
+        if regressions:
+            return 1
+        print("✅ Không có ca nào chậm hơn baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
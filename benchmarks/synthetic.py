@@ -0,0 +1,114 @@
+"""
+Sinh dữ liệu tổng hợp có seed cho benchmark: chương trình đào tạo (DAG tiên
+quyết nhiều tầng, nhiều ngành) và bảng điểm sinh viên.
+"""
+import json
+import random
+
+import pandas as pd
+
+GRADES = ['A', 'B+', 'B', 'C+', 'C', 'D+', 'D', 'F']
+GRADE_WEIGHTS = [14, 16, 20, 16, 13, 8, 6, 7]
+CATEGORIES = ['Core', 'Math', 'Gen', 'Lang', 'Elective']
+N_LAYERS = 8
+
+
+def generate_curriculum(n_subjects, n_majors=None, seed=0, major_size=None):
+    """
+    DAG theo tầng (1 tầng = 1 kỳ chuẩn): môn ở tầng k chỉ nhận tiên quyết
+    từ 1-2 tầng ngay trước, 0-3 môn, độ khó tăng dần theo tầng.
+    Mỗi ngành chọn một tập môn đóng với quan hệ tiên quyết.
+    """
+    rng = random.Random(seed)
+    n_majors = n_majors or max(1, n_subjects // 60)
+    major_size = major_size or min(n_subjects, 50)
+
+    layers = [[] for _ in range(N_LAYERS)]
+    subjects = {}
+    for i in range(n_subjects):
+        layer = min(N_LAYERS - 1, i * N_LAYERS // n_subjects)
+        sub_id = f"SUB{i:05d}"
+        pool = [s for k in (layer - 1, layer - 2) if k >= 0 for s in layers[k]]
+        prereqs = rng.sample(pool, min(len(pool), rng.choice([0, 1, 1, 2, 2, 3]))) if pool else []
+        subjects[sub_id] = {
+            'name': f"Môn tổng hợp {i}",
+            'credits': rng.choice([2, 3, 3, 3, 4]),
+            'prereq': prereqs,
+            'difficulty': max(1, min(5, 1 + layer // 2 + rng.choice([-1, 0, 0, 1]))),
+            'category': rng.choice(CATEGORIES),
+            'semesters_offered': rng.choice([[1], [2], [1, 2], [1, 2]]),
+        }
+        layers[layer].append(sub_id)
+    layer_of = {s: k for k, ids in enumerate(layers) for s in ids}
+
+    majors = {}
+    for m in range(n_majors):
+        chosen = set()
+        for sub_id in rng.sample(list(subjects), min(major_size, n_subjects)):
+            stack = [sub_id]
+            while stack and len(chosen) < major_size:
+                s = stack.pop()
+                if s not in chosen:
+                    chosen.add(s)
+                    stack.extend(subjects[s]['prereq'])
+            if len(chosen) >= major_size:
+                break
+        # Bổ sung tiên quyết còn thiếu để tập môn của ngành khép kín
+        stack = list(chosen)
+        while stack:
+            for pr in subjects[stack.pop()]['prereq']:
+                if pr not in chosen:
+                    chosen.add(pr)
+                    stack.append(pr)
+        roadmap = {}
+        for s in sorted(chosen):
+            roadmap.setdefault(str(layer_of[s] + 1), []).append(s)
+        majors[f"M{m:03d}"] = {'name': f"Ngành tổng hợp {m}", 'roadmap': roadmap}
+    return {'majors': majors, 'subjects': subjects}
+
+
+def generate_transcripts(data, major_code, n_students, seed=0):
+    """Bảng điểm theo lộ trình: mỗi SV đã học xong 0..7 kỳ, có tỉ lệ rớt môn"""
+    rng = random.Random(seed)
+    roadmap = data['majors'][major_code]['roadmap']
+    transcripts = {}
+    for k in range(n_students):
+        done = rng.randint(0, N_LAYERS - 1)
+        transcript = {}
+        for sem, ids in roadmap.items():
+            if int(sem) <= done:
+                for s in ids:
+                    if rng.random() < 0.95:
+                        transcript[s] = rng.choices(GRADES, GRADE_WEIGHTS)[0]
+        transcripts[f"SV{k:06d}"] = (transcript, done)
+    return transcripts
+
+
+def transcripts_frame(transcripts):
+    """Dạng dài (student, subject, grade) cho advise_cohort"""
+    rows = [(student, s, g) for student, (t, _) in transcripts.items() for s, g in t.items()]
+    return pd.DataFrame(rows, columns=['student', 'subject', 'grade'])
+
+
+def write_curriculum(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def write_workbook(data, path):
+    """Workbook cùng định dạng data/raw cho tools/convert_data.py"""
+    subjects = pd.DataFrame([{
+        'SubjectID': sub_id,
+        'Name': sub['name'],
+        'Credits': sub['credits'],
+        'Theory': sub['credits'] - 1,
+        'Practice': 1,
+        'Semesters': ', '.join(map(str, sub['semesters_offered'])),
+        'Prerequisites': ', '.join(sub['prereq']),
+    } for sub_id, sub in data['subjects'].items()])
+    curriculum = pd.DataFrame([{
+        'MajorCode': code, 'SubjectID': s, 'SuggestedSem': int(sem), 'Type': 'Bắt buộc',
+    } for code, major in data['majors'].items() for sem, ids in major['roadmap'].items() for s in ids])
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        subjects.to_excel(writer, sheet_name='SubjectsList', index=False)
+        curriculum.to_excel(writer, sheet_name='Curriculum', index=False)
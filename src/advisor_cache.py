@@ -0,0 +1,245 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from instrumentation import PROFILER
+from transcript import CompactTranscript
+
+
+class LRUCache:
+    """LRU có giới hạn kích thước + TTL, an toàn đa luồng (Streamlit chạy mỗi phiên một luồng)"""
+
+    def __init__(self, maxsize=512, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < self.clock():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def state_key(*parts):
+    """Băm chuẩn tắc trạng thái (dict/set được sắp xếp nên thứ tự nhập không ảnh hưởng)"""
+    def canon(x):
+        if isinstance(x, Mapping):
+            return tuple(sorted((str(k), canon(v)) for k, v in x.items()))
+        if isinstance(x, (set, frozenset)):
+            return tuple(sorted(map(str, x)))
+        if isinstance(x, (list, tuple)):
+            return tuple(canon(v) for v in x)
+        return x
+    return hashlib.blake2b(repr(canon(parts)).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CachedAdvisor:
+    """
+    Lớp đệm quanh AcademicAdvisor cho calculate_gpa, suggest_next_semester,
+    find_easiest_subjects. Kết quả được ghi nhớ theo trạng thái bảng điểm;
+    nếu truyền session_key, lần tính sau chỉ cập nhật phần chênh lệch so với
+    lần trước của cùng phiên (đổi 1 điểm không phải tính lại từ đầu).
+    Các thuộc tính khác (majors, subjects, graph...) được chuyển thẳng cho advisor.
+    Danh sách trả về là bản sao (cả các dict môn), người gọi sửa thoải mái
+    không làm hỏng cache.
+    """
+
+    def __init__(self, advisor, maxsize=512, ttl=300.0, clock=time.monotonic):
+        self._sizes = (maxsize, ttl, clock)
+        # (engine, kết quả, trạng thái gần nhất từng phiên): đổi cả bộ trong một phép gán,
+        # lượt gọi đang chạy trên engine cũ chỉ ghi vào cache cũ (xem swap)
+        self._live = (advisor, LRUCache(maxsize, ttl, clock), LRUCache(maxsize, ttl, clock))
+        self.hits = 0
+        self.misses = 0
+        self.incremental = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def advisor(self):
+        return self._live[0]
+
+    @property
+    def results(self):
+        return self._live[1]
+
+    @property
+    def sessions(self):
+        return self._live[2]
+
+    def __getattr__(self, name):
+        return getattr(self._live[0], name)
+
+    def swap(self, advisor):
+        """Thay engine (dữ liệu mới) nguyên tử; kết quả tính trên dữ liệu cũ bị bỏ cùng cache cũ"""
+        maxsize, ttl, clock = self._sizes
+        self._live = (advisor, LRUCache(maxsize, ttl, clock), LRUCache(maxsize, ttl, clock))
+
+    def stats(self):
+        """Bộ đếm hit/miss/gia tăng và kích thước cache"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'incremental': self.incremental,
+            'evictions': self.results.evictions,
+            'size': len(self.results),
+        }
+
+    def clear(self):
+        self.results.clear()
+        self.sessions.clear()
+
+    def _bump(self, counter):
+        # += trên thuộc tính không nguyên tử giữa các luồng phiên
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _lookup(self, results, key, kind):
+        value = results.get(key)
+        if value is None:
+            self._bump('misses')
+            PROFILER.count(f'cache.{kind}.miss')
+        else:
+            self._bump('hits')
+            PROFILER.count(f'cache.{kind}.hit')
+        return value
+
+    # =========================================================================
+    # GPA
+    # =========================================================================
+    def calculate_gpa(self, transcript, session_key=None):
+        # Bảng điểm dạng gọn tự ghi nhớ tổng: tính thẳng còn rẻ hơn băm khóa cache
+        advisor, results, sessions = self._live
+        if isinstance(transcript, CompactTranscript):
+            return advisor.calculate_gpa(transcript)
+        key = state_key('gpa', transcript)
+        cached = self._lookup(results, key, 'gpa')
+        if cached is not None:
+            return cached
+
+        prev = sessions.get(('gpa', session_key)) if session_key else None
+        if prev is not None:
+            # Chỉ cộng/trừ đóng góp của các dòng bị đổi
+            old_transcript, points, creds = prev
+            for sub_id in set(old_transcript) | set(transcript):
+                old, new = old_transcript.get(sub_id), transcript.get(sub_id)
+                if old == new:
+                    continue
+                if old is not None:
+                    p, c = advisor.grade_contribution(sub_id, old)
+                    points, creds = points - p, creds - c
+                if new is not None:
+                    p, c = advisor.grade_contribution(sub_id, new)
+                    points, creds = points + p, creds + c
+            self._bump('incremental')
+        else:
+            points = creds = 0
+            for sub_id, grade in transcript.items():
+                p, c = advisor.grade_contribution(sub_id, grade)
+                points, creds = points + p, creds + c
+
+        result = (points / creds if creds > 0 else 0.0, creds)
+        if session_key:
+            sessions.put(('gpa', session_key), (dict(transcript), points, creds))
+        results.put(key, result)
+        return result
+
+    # =========================================================================
+    # GỢI Ý KỲ TỚI
+    # =========================================================================
+    def suggest_next_semester(self, transcript, major_code, current_sem, planned_courses=[],
+                              session_key=None):
+        advisor, results, sessions = self._live
+        passed = frozenset(s for s, g in transcript.items() if g not in advisor.NOT_PASSED)
+        planned = frozenset(planned_courses)
+        retake = frozenset(s for s in passed if transcript[s] in advisor.rules.improvable_grades)
+        # Gợi ý chỉ phụ thuộc tập môn đã qua (và môn được học cải thiện), không phụ thuộc điểm cụ thể
+        key = state_key('suggest', major_code, current_sem, passed, planned, retake)
+        cached = self._lookup(results, key, 'suggest')
+        if cached is not None:
+            return _copies(cached)
+
+        prev = sessions.get(('suggest', session_key)) if session_key else None
+        if prev is not None and prev[0] == (major_code, current_sem):
+            _, old_passed, old_planned, old_retake, entries = prev
+            changed = (old_passed ^ passed) | (old_planned ^ planned) | (old_retake ^ retake)
+            # Chỉ môn bị đổi, các môn nhận nó làm tiên quyết trực tiếp
+            # và các môn nhận chúng làm song hành mới đổi trạng thái
+            affected = set(changed)
+            for sub_id in changed:
+                affected.update(advisor.graph.dependents.get(sub_id, ()))
+            for sub_id in list(affected):
+                affected.update(advisor.rules.coreq_dependents.get(sub_id, ()))
+            entries = [e for e in entries if e[1]['id'] not in affected]
+            entries += self._score_entries(advisor, major_code, current_sem, passed, planned, retake, affected)
+            self._bump('incremental')
+        else:
+            entries = self._score_entries(advisor, major_code, current_sem, passed, planned, retake, None)
+
+        # Sắp theo điểm giảm dần, giữ thứ tự lộ trình khi bằng điểm (như bản gốc)
+        entries.sort(key=lambda e: (-e[1]['score'], e[0]))
+        result = [candidate for _, candidate in entries]
+        if session_key:
+            sessions.put(('suggest', session_key),
+                         ((major_code, current_sem), passed, planned, retake, entries))
+        results.put(key, result)
+        return _copies(result)
+
+    def _score_entries(self, advisor, major_code, current_sem, passed, planned, retake, only):
+        can_take = advisor._open_checker(passed, planned, retake, current_sem)
+        entries = []
+        for pos, (sem, sub_id) in enumerate(advisor.graph.roadmap_entries[major_code]):
+            if only is not None and sub_id not in only:
+                continue
+            if sub_id not in advisor.subjects or not can_take(sub_id):
+                continue
+            entries.append((pos, advisor.score_candidate(sem, sub_id, current_sem, retake=sub_id in retake)))
+        return entries
+
+    # =========================================================================
+    # MÔN DỄ
+    # =========================================================================
+    def find_easiest_subjects(self, transcript, planned_ids, limit=4, **kwargs):
+        advisor, results, _ = self._live
+        # Mô hình điểm đổi sau mỗi lần nộp điểm: khóa theo phiên bản thay vì đối tượng
+        options = dict(kwargs)
+        model = options.pop('grade_model', None)
+        version = (id(model), model.version) if model is not None else None
+        key = state_key('easy', transcript, frozenset(planned_ids), limit, options, version)
+        cached = self._lookup(results, key, 'easy')
+        if cached is not None:
+            return _copies(cached)
+        result = advisor.find_easiest_subjects(transcript, planned_ids, limit, **kwargs)
+        results.put(key, result)
+        return _copies(result)
+
+
+def _copies(candidates):
+    """Bản sao danh sách môn gợi ý; dict trong cache không lộ ra ngoài"""
+    return [dict(c) for c in candidates]
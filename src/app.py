@@ -1,7 +1,17 @@
 import streamlit as st
 import os
+import uuid
+import numpy as np
 import pandas as pd
+import streamlit.components.v1 as components
 from decision_engine import AcademicAdvisor
+from advisor_cache import CachedAdvisor
+from instrumentation import PROFILER
+from storage import AdvisorStore
+from grade_model import GradeModel
+from hot_reload import CurriculumReloader
+import roadmap_graph
+import ui_cards
 
 # =============================================================================
 # 1. SETUP & STYLES
@@ -36,69 +46,20 @@ def render_custom_css():
 # 2. UI HELPER FUNCTIONS (Vẽ giao diện HTML)
 # =============================================================================
 
-def ui_render_plan_dashboard(planned_ids, advisor):
-    """Vẽ Dashboard thống kê bên phải"""
-    total_creds = 0
-    total_difficulty = 0
-    FEE_PER_CREDIT = 750000 
-    
-    for pid in planned_ids:
-        sub = advisor.subjects.get(pid, {})
-        total_creds += sub.get('credits', 0)
-        total_difficulty += sub.get('difficulty', 3)
-        
-    avg_diff = (total_difficulty / len(planned_ids)) if planned_ids else 0
-    est_fee = total_creds * FEE_PER_CREDIT
-    bar_width = min(avg_diff / 5 * 100, 100)
-    
-    cred_color = '#ff6b6b' if total_creds > 20 else '#51cf66'
-    
-    if avg_diff > 3.5: comment = "🔥 Khá căng thẳng"
-    elif avg_diff < 2.5: comment = "🌱 Vừa sức"
-    else: comment = "⚖️ Cân bằng"
-
-    html = f"""
-    <div class="plan-dashboard">
-        <div style="display:flex; justify-content:space-between; margin-bottom:10px;">
-            <div>
-                <div class="stat-label">Tổng tín chỉ</div>
-                <div class="stat-value" style="color:{cred_color}">{total_creds} <span style="font-size:0.6em; color:#8b949e">/ 20</span></div>
-            </div>
-            <div style="text-align:right;">
-                <div class="stat-label">Học phí (Ước tính)</div>
-                <div class="stat-value" style="color:#e0e0e0;">{est_fee:,.0f} đ</div>
-            </div>
-        </div>
-        <div style="display:flex; justify-content:space-between; align-items:end; margin-bottom:5px;">
-            <div class="stat-label">Độ khó trung bình</div>
-            <div style="font-weight:bold; color:#f0f6fc;">{avg_diff:.1f}/5.0</div>
-        </div>
-        <div style="height:8px; background:#21262d; border-radius:4px; overflow:hidden;">
-            <div style="height:100%; width:{bar_width}%; background: linear-gradient(90deg, #51cf66, #fcc419, #ff6b6b); transition: width 0.5s;"></div>
-        </div>
-        <div style="font-size:0.8em; color:#8b949e; margin-top:5px; text-align:right; font-style:italic;">{comment}</div>
-    </div>
-    """
+# HTML được ghi nhớ theo nội dung trong ui_cards (sống qua các lần chạy lại script)
+@PROFILER.timed('ui.plan_dashboard')
+def ui_render_plan_dashboard(report, credit_cap):
+    """Vẽ Dashboard thống kê bên phải (report: AcademicAdvisor.check_plan)"""
+    html = ui_cards.plan_dashboard(report['credits'], credit_cap, float(report['avg_difficulty']),
+                                   float(report['fee']), bool(report['over_cap']), report['comment'])
     st.markdown(html, unsafe_allow_html=True)
-    return total_creds
+    return report['credits']
 
+@PROFILER.timed('ui.recommendation_card')
 def ui_render_recommendation_card(item):
     """Vẽ thẻ gợi ý môn học"""
-    p_cls = f"p-{item['priority']}"
-    icon = "🔥" if item['priority']==3 else ("⚠️" if item['priority']==2 else "📘")
-    
-    html = f"""
-    <div class="rec-card {p_cls}">
-        <div style="display:flex; justify-content:space-between;">
-            <div style="font-weight:bold;">{icon} {item['name']}</div>
-            <span style="background:#21262d; padding:2px 8px; border-radius:4px; font-size:0.8em; border:1px solid #30363d;">
-                {item['credits']} TC
-            </span>
-        </div>
-        <div style="font-size:0.9em; color:#8b949e; margin-top:4px;">Độ khó: {"⭐"*item['difficulty']}</div>
-        <div style="font-size:0.9em; color:#c9d1d9; font-style:italic; margin-top:6px;">👉 {item['reason']}</div>
-    </div>
-    """
+    html = ui_cards.recommendation_card(item['priority'], item['name'], item['credits'],
+                                        item['difficulty'], item['reason'])
     st.markdown(html, unsafe_allow_html=True)
 
 # =============================================================================
@@ -108,36 +69,188 @@ def ui_render_recommendation_card(item):
 def load_advisor():
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(current_dir)
-    data_path = os.path.join(project_root, 'data', 'curriculum.json')
-    return AcademicAdvisor(data_path)
+    # Ưu tiên dữ liệu ETL (knowledge_base/, nạp qua snapshot nhị phân) nếu đã có
+    kb_dir = os.path.join(project_root, 'data', 'knowledge_base')
+    data_path = kb_dir if os.path.isdir(kb_dir) else os.path.join(project_root, 'data', 'curriculum.json')
+    # Bọc cache dùng chung cho mọi phiên: kết quả theo trạng thái bảng điểm
+    # Ngân sách bộ nhớ cho lộ trình các ngành (MB), chỉ giữ các ngành đang được dùng
+    budget_mb = os.environ.get('ADVISOR_MAJOR_BUDGET_MB')
+    budget = int(float(budget_mb) * 1024 * 1024) if budget_mb else None
+    # Luật nghiệp vụ riêng của trường (nếu có) ghi đè rules.DEFAULT_RULES
+    rules_path = os.path.join(project_root, 'data', 'rules.json')
+    rules = rules_path if os.path.exists(rules_path) else None
+    with PROFILER.section('load.advisor'):
+        engine = AcademicAdvisor(data_path, major_budget_bytes=budget, rules=rules)
+    # ADVISOR_PROFILE=1: đo từng hàm engine và lớp cache (tắt thì không bọc gì)
+    PROFILER.instrument(engine, 'advisor')
+    cached = CachedAdvisor(engine, maxsize=2048, ttl=900)
+    PROFILER.instrument(cached, 'cache', ['calculate_gpa', 'suggest_next_semester', 'find_easiest_subjects'])
+    PROFILER.add_gauge_source('cache', cached.stats)
+    return cached
+
+@st.cache_resource
+def start_reloader(_advisor):
+    # Nạp lại nóng khi data/ đổi (kiểm tra mỗi ADVISOR_RELOAD_SECONDS giây, 0 = tắt)
+    interval = float(os.environ.get('ADVISOR_RELOAD_SECONDS', '5'))
+    reloader = CurriculumReloader(_advisor, interval)
+    reloader.on_swap(lambda engine: PROFILER.instrument(engine, 'advisor'))
+    PROFILER.add_gauge_source('reload', reloader.status)
+    return reloader.start() if interval > 0 else reloader
+
+@st.cache_resource
+def load_store():
+    # Bảng điểm & giỏ môn lưu bền trong SQLite (đổi đường dẫn bằng ADVISOR_DB)
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return AdvisorStore(os.environ.get('ADVISOR_DB', os.path.join(project_root, 'data', 'advisor.db')))
+
+@st.cache_resource
+def load_grade_model(_store):
+    # Điểm kỳ vọng từng môn theo các khóa trước: đếm một lần trong SQLite, sau đó
+    # cập nhật trực tuyến mỗi lần sinh viên lưu bảng điểm
+    with PROFILER.section('load.grade_model'):
+        model = GradeModel.from_store(_store)
+    _store.on_grades_changed(model.observe)
+    PROFILER.add_gauge_source('grade_model', lambda: {'subjects': len(model.ids), 'version': model.version})
+    return model
+
+@st.cache_resource
+def load_layouts():
+    # Vị trí nút đồ thị lộ trình: tính một lần cho mỗi phiên bản chương trình, lưu ở data/.layout/
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return roadmap_graph.LayoutCache(os.path.join(project_root, 'data', '.layout'))
+
+def student_state():
+    return (
+        st.session_state['student_id'],
+        st.session_state['selected_major'],
+        st.session_state['current_sem'],
+        dict(st.session_state['transcript']),
+        list(st.session_state['planned_subjects']),
+    )
+
+def load_student(student_id):
+    """Nạp hồ sơ đã lưu của sinh viên vào phiên (SV mới: giữ cấu hình hiện tại)"""
+    profile = store.get_student(student_id)
+    if profile and profile['major_code'] in advisor.majors:
+        st.session_state['selected_major'] = profile['major_code']
+        st.session_state['current_sem'] = profile['current_sem']
+    st.session_state['student_id'] = student_id
+    st.session_state['transcript'] = advisor.compact_transcript(store.get_transcript(student_id))
+    st.session_state['planned_subjects'] = store.get_plan(student_id, st.session_state['current_sem'] + 1)
+    # Ô chọn điểm giữ giá trị theo key: xóa để hiển thị bảng điểm vừa nạp
+    for key in [k for k in st.session_state if str(k).startswith('g_')]:
+        del st.session_state[key]
+    st.session_state['saved_state'] = student_state()
+
+def open_student(student_id, token=None):
+    """
+    Mở hồ sơ nếu phiên có quyền: mã của chính phiên, mã chưa ai dùng (phiên nhận
+    quyền và được cấp mã truy cập), hoặc hồ sơ có sẵn với đúng mã truy cập.
+    Trả về False (không nạp gì) nếu không có quyền.
+    """
+    if student_id != st.session_state['session_id']:
+        if store.has_records(student_id):
+            if not store.check_token(student_id, token):
+                return False
+        else:
+            token = store.claim_student(student_id, st.session_state['selected_major'],
+                                        st.session_state['current_sem'])
+            if token is None:
+                return False
+        # Chỉ giữ mã SV trên URL; mã truy cập nằm trong session_state, không lọt vào
+        # lịch sử trình duyệt, link chia sẻ hay log proxy (tải lại trang thì nhập lại)
+        st.query_params['student'] = student_id
+    load_student(student_id)
+    st.session_state['owned_id'] = student_id
+    st.session_state['access_token'] = token if student_id != st.session_state['session_id'] else None
+    return True
+
+def save_student():
+    """Ghi thay đổi của phiên xuống store (bỏ qua nếu không đổi gì hoặc phiên không sở hữu hồ sơ)"""
+    state = student_state()
+    if state == st.session_state.get('saved_state') or state[0] != st.session_state.get('owned_id'):
+        return
+    student_id, major_code, current_sem, transcript, planned = state
+    # Phiên khách (mã SV = mã phiên) chỉ để thử kịch bản: lưu nhưng không đưa vào thống kê điểm
+    store.upsert_students([(student_id, major_code, current_sem)],
+                          anonymous=student_id == st.session_state['session_id'])
+    store.save_transcript(student_id, transcript)
+    store.save_plan(student_id, current_sem + 1, planned)
+    st.session_state['saved_state'] = state
+
+def add_to_basket(sub_id):
+    """Thêm môn vào giỏ; bỏ qua nếu đã có (thẻ ở tab khác có thể chưa kịp vẽ lại)"""
+    if sub_id not in st.session_state['planned_subjects']:
+        st.session_state['planned_subjects'].append(sub_id)
 
 render_custom_css()
 advisor = load_advisor()
+start_reloader(advisor)
+store = load_store()
+grade_model = load_grade_model(store)
 
 if 'selected_major' not in st.session_state: st.session_state['selected_major'] = list(advisor.majors.keys())[0]
-if 'transcript' not in st.session_state: st.session_state['transcript'] = {}
+# Bảng điểm giữ dạng gọn (transcript.CompactTranscript): nhẹ khi có nhiều phiên, dùng như dict
+if 'transcript' not in st.session_state: st.session_state['transcript'] = advisor.compact_transcript()
 if 'current_sem' not in st.session_state: st.session_state['current_sem'] = 1
 if 'planned_subjects' not in st.session_state: st.session_state['planned_subjects'] = [] 
+if 'session_id' not in st.session_state: st.session_state['session_id'] = uuid.uuid4().hex
+if 'student_id' not in st.session_state:
+    requested = st.query_params.get('student')
+    # Link cũ còn mang mã truy cập: xóa khỏi URL, không dùng
+    if 'token' in st.query_params:
+        del st.query_params['token']
+    if requested and not open_student(requested):
+        st.session_state['access_denied'] = requested
+        requested = None
+    if not requested:
+        open_student(st.session_state['session_id'])
+# Dữ liệu vừa được nạp lại: mã hóa lại bảng điểm theo phiên bản mới, bỏ ngành không còn
+if st.session_state['transcript'].codec is not advisor.codec:
+    st.session_state['transcript'] = advisor.compact_transcript(st.session_state['transcript'].to_dict())
+if st.session_state['selected_major'] not in advisor.majors:
+    st.session_state['selected_major'] = list(advisor.majors.keys())[0]
+PROFILER.bind_session(st.session_state['session_id'])
 
 # =============================================================================
 # 4. MAIN LAYOUT
 # =============================================================================
 
 # --- SIDEBAR ---
-with st.sidebar:
+with st.sidebar, PROFILER.section('ui.sidebar'):
     st.markdown("### ⚙️ Cấu hình")
-    new_major = st.selectbox("Ngành học", list(advisor.majors.keys()), format_func=lambda x: advisor.majors[x]['name'])
+    student_id = st.text_input("Mã sinh viên", value=st.session_state['student_id']).strip()
+    access_token = st.text_input("Mã truy cập", type="password", key="access_token_input",
+                                 help="Cần khi mở hồ sơ đã có. Mã mới được cấp khi bạn dùng một mã SV chưa ai dùng.")
+    if student_id and student_id != st.session_state['student_id']:
+        save_student()
+        if open_student(student_id, access_token.strip() or None):
+            st.rerun()
+        st.session_state['access_denied'] = student_id
+    denied = st.session_state.pop('access_denied', None)
+    if denied:
+        st.error(f"🔒 Hồ sơ {denied} đã tồn tại: nhập mã SV cùng mã truy cập để mở.")
+    if st.session_state.get('access_token'):
+        st.caption(f"🔑 Mã truy cập hồ sơ: `{st.session_state['access_token']}` (lưu lại để mở trên máy khác)")
+    
+    major_codes = list(advisor.majors.keys())
+    new_major = st.selectbox("Ngành học", major_codes, index=major_codes.index(st.session_state['selected_major']),
+                             format_func=lambda x: advisor.majors.names[x])
     if new_major != st.session_state['selected_major']:
         st.session_state['selected_major'] = new_major
-        st.session_state['transcript'] = {}
+        st.session_state['transcript'] = advisor.compact_transcript()
         st.session_state['planned_subjects'] = []
         st.rerun()
     
     st.divider()
-    st.session_state['current_sem'] = st.selectbox("Trạng thái hiện tại:", range(1, 10), index=0, format_func=lambda x: f"Đã học xong Kỳ {x}")
+    # Kỳ lưu trong store/CSV có thể ngoài 1..9 (SV mới nhập học = 0, SV học kéo dài): nới danh sách
+    cur_sem = st.session_state['current_sem']
+    sem_options = range(min(1, cur_sem), max(9, cur_sem) + 1)
+    st.session_state['current_sem'] = st.selectbox("Trạng thái hiện tại:", sem_options, index=cur_sem - sem_options[0],
+                                                   format_func=lambda x: f"Đã học xong Kỳ {x}" if x else "Mới nhập học")
     st.divider()
     
-    gpa, creds = advisor.calculate_gpa(st.session_state['transcript'])
+    gpa, creds = advisor.calculate_gpa(st.session_state['transcript'], session_key=st.session_state['session_id'])
     st.markdown(f"""
         <div style="background:#21262d; padding:15px; border-radius:10px; text-align:center; border:1px solid #30363d;">
             <div style="color:#8b949e; font-size:0.8em">GPA TÍCH LŨY</div>
@@ -147,15 +260,29 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     
     if st.button("🗑️ Xóa dữ liệu", use_container_width=True):
-        st.session_state['transcript'] = {}
+        st.session_state['transcript'] = advisor.compact_transcript()
         st.session_state['planned_subjects'] = []
         st.rerun()
 
-st.title(f"🎓 Dashboard: {advisor.majors[st.session_state['selected_major']]['name']}")
+st.title(f"🎓 Dashboard: {advisor.majors.names[st.session_state['selected_major']]}")
 tab1, tab2, tab3 = st.tabs(["📝 Nhập Điểm", "📅 Lập Kế Hoạch", "📈 Chiến Lược GPA"])
 
+# Đồ thị tiên quyết: layout lấy từ cache, mỗi lần chạy lại chỉ tô màu theo bảng điểm.
+# Fragment: bật/tắt đồ thị không chạy lại cả app
+@st.fragment
+def roadmap_graph_fragment():
+    if st.toggle("🕸️ Xem đồ thị tiên quyết", key="show_roadmap_graph"):
+        layout = load_layouts().get(advisor.graph, advisor.subjects, st.session_state['selected_major'])
+        overlay = roadmap_graph.student_overlay(
+            advisor.graph, st.session_state['transcript'], st.session_state['planned_subjects'], layout)
+        components.html(roadmap_graph.render_html(layout, overlay), height=540)
+        legend = " · ".join(
+            f"<span style='color:{roadmap_graph.STATUS_STYLES[k]['border']}'>■</span> {label}"
+            for k, label in roadmap_graph.STATUS_LABELS.items())
+        st.markdown(f"<div style='font-size:0.8em; color:#8b949e;'>{legend}</div>", unsafe_allow_html=True)
+
 # === TAB 1: NHẬP ĐIỂM ===
-with tab1:
+with tab1, PROFILER.section('ui.tab1'):
     roadmap = advisor.majors[st.session_state['selected_major']]['roadmap']
     for sem_idx in sorted([int(k) for k in roadmap.keys()]):
         if sem_idx > st.session_state['current_sem'] + 1: continue
@@ -170,17 +297,49 @@ with tab1:
                     if val != "Chưa học": st.session_state['transcript'][sub_id] = val
                     elif sub_id in st.session_state['transcript']: del st.session_state['transcript'][sub_id]
 
+    roadmap_graph_fragment()
+
 # === TAB 2: LẬP KẾ HOẠCH (Code chuẩn) ===
-with tab2:
+# Gợi ý + giỏ môn + dashboard là một fragment: thêm/bớt môn chỉ chạy lại phần này
+# (gợi ý loại môn đã vào giỏ nên phải vẽ lại cùng), không đụng sidebar, tab khác
+# hay lộ trình tốt nghiệp bên dưới (không phụ thuộc giỏ môn).
+# Nút dùng on_click: giỏ đổi trước khi fragment vẽ lại, chỉ một lượt chạy mỗi lần bấm
+def remove_from_basket(sub_id):
+    if sub_id in st.session_state['planned_subjects']:
+        st.session_state['planned_subjects'].remove(sub_id)
+
+def auto_fill(avoid_hard):
+    picked = advisor.auto_fill_basket(
+        st.session_state['transcript'],
+        st.session_state['selected_major'],
+        st.session_state['current_sem'],
+        planned_courses=st.session_state['planned_subjects'],
+        difficulty_penalty=5.0 if avoid_hard else 0.0
+    )
+    st.session_state['planned_subjects'].extend(item['id'] for item in picked)
+
+@st.fragment
+@PROFILER.timed('ui.fragment.basket')
+def planning_fragment():
     col_suggest, col_plan = st.columns([1.3, 1])
 
     # --- CỘT PHẢI: KẾ HOẠCH ---
     with col_plan:
         st.subheader("🎒 Giỏ môn học")
-        current_creds = ui_render_plan_dashboard(st.session_state['planned_subjects'], advisor)
-        
-        if current_creds > 20: st.error("⚠️ Quá tải! > 20 tín chỉ.")
+        plan_report = advisor.check_plan(
+            st.session_state['transcript'],
+            st.session_state['planned_subjects'],
+            st.session_state['current_sem']
+        )
+        ui_render_plan_dashboard(plan_report, advisor.rules.credit_cap)
         
+        # Vi phạm luật (rules.py): quá tải, kỳ mở lớp, môn song hành...
+        for msg in plan_report['violations']: st.error(msg)
+
+        # Tự động xếp giỏ: chọn tối ưu trong một lượt thay vì bấm từng môn
+        avoid_hard = st.checkbox("Ưu tiên môn nhẹ nhàng", value=False, key="autofill_easy")
+        st.button("🪄 Tự động xếp giỏ", use_container_width=True, on_click=auto_fill, args=(avoid_hard,))
+
         if not st.session_state['planned_subjects']:
             st.info("👈 Chọn môn từ bên trái")
         else:
@@ -190,9 +349,7 @@ with tab2:
                 c1, c2, c3 = st.columns([5, 2, 1])
                 c1.markdown(f"**{sub.get('name', pid)}**")
                 c2.caption(f"{sub.get('credits',0)} TC")
-                if c3.button("❌", key=f"del_{pid}"):
-                    st.session_state['planned_subjects'].remove(pid)
-                    st.rerun()
+                c3.button("❌", key=f"del_{pid}", on_click=remove_from_basket, args=(pid,))
                 st.divider()
 
     # --- CỘT TRÁI: GỢI Ý ---
@@ -203,7 +360,8 @@ with tab2:
             st.session_state['transcript'], 
             st.session_state['selected_major'], 
             st.session_state['current_sem'],
-            planned_courses=st.session_state['planned_subjects']
+            planned_courses=st.session_state['planned_subjects'],
+            session_key=st.session_state['session_id']
         )
         
         if not recs:
@@ -212,12 +370,66 @@ with tab2:
         for item in recs:
             ui_render_recommendation_card(item)
             c_btn, _ = st.columns([1, 2])
-            if c_btn.button("➕ Thêm", key=f"add_{item['id']}"):
-                st.session_state['planned_subjects'].append(item['id'])
-                st.rerun()
+            c_btn.button("➕ Thêm", key=f"add_{item['id']}", on_click=add_to_basket, args=(item['id'],))
+
+    # Chạy lại riêng fragment không tới cuối script: tự lưu giỏ môn
+    save_student()
+
+with tab2, PROFILER.section('ui.tab2'):
+    planning_fragment()
+
+    # --- LỘ TRÌNH TỚI TỐT NGHIỆP ---
+    st.divider()
+    with st.expander("🗺️ Lộ trình đề xuất tới khi tốt nghiệp", expanded=False):
+        grad_plan = advisor.plan_graduation(
+            st.session_state['transcript'],
+            st.session_state['selected_major'],
+            st.session_state['current_sem']
+        )
+        min_sems = advisor.min_semesters_remaining(
+            st.session_state['transcript'], st.session_state['selected_major']
+        )
+        if not grad_plan['semesters']:
+            st.success("🎓 Bạn đã hoàn thành toàn bộ chương trình!")
+        else:
+            st.caption(f"Tối thiểu còn {min_sems} kỳ (theo chuỗi tiên quyết dài nhất và trần {advisor.rules.credit_cap} TC) · Lộ trình dưới đây: {len(grad_plan['semesters'])} kỳ")
+        for sem_plan in grad_plan['semesters']:
+            names = [advisor.subjects[s]['name'] for s in sem_plan['subjects']]
+            st.markdown(f"**Kỳ {sem_plan['semester']}** · {sem_plan['credits']} TC — " + (", ".join(names) or "_(không có môn mở lớp)_"))
+        if grad_plan['unschedulable']:
+            st.warning(f"⚠️ Không xếp được: {', '.join(grad_plan['unschedulable'])} (thiếu dữ liệu hoặc tiên quyết)")
+
+    # --- RỦI RO RỚT MÔN: "nếu rớt X thì tốt nghiệp trễ bao lâu?" ---
+    with st.expander("⚠️ Rủi ro nếu rớt môn", expanded=False):
+        # Mỗi môn còn lại = một lần xếp lại lộ trình: chỉ chạy khi bấm, giữ kết quả theo trạng thái
+        impact_key = (st.session_state['selected_major'], st.session_state['current_sem'],
+                      tuple(sorted(st.session_state['transcript'].items())))
+        if st.button("🔍 Phân tích rủi ro", use_container_width=True):
+            st.session_state['failure_impact'] = (impact_key, advisor.failure_impact(
+                st.session_state['transcript'],
+                st.session_state['selected_major'],
+                st.session_state['current_sem']
+            ))
+        cached = st.session_state.get('failure_impact')
+        if cached is None or cached[0] != impact_key:
+            st.caption("Mô phỏng rớt từng môn còn lại và xếp lại lộ trình để xem môn nào rủi ro nhất.")
+        elif not cached[1]:
+            st.success("🎓 Không còn môn nào phải học!")
+        else:
+            st.dataframe(pd.DataFrame([{
+                'Môn': f"{row['id']} · {row['name']}",
+                'Kỳ dự kiến': row['semester'],
+                'Trễ tốt nghiệp (kỳ)': row['delay'],
+                'Tốt nghiệp kỳ': row['graduation_semester'],
+                'Môn bị chặn': ", ".join(row['blocked']) or "—",
+            } for row in cached[1]]), hide_index=True, use_container_width=True)
 
 # === TAB 3: CHIẾN LƯỢC (Simulator & Chart) ===
-with tab3:
+# Fragment: đổi mục tiêu, phong độ, nhóm môn chỉ chạy lại tab này
+@st.fragment
+@PROFILER.timed('ui.fragment.strategy')
+def strategy_fragment():
+    gpa, creds = advisor.calculate_gpa(st.session_state['transcript'])
     st.markdown("### 🎯 Mục tiêu & Mô phỏng")
     c_left, c_right = st.columns([1, 2])
     
@@ -272,7 +484,10 @@ with tab3:
             
         # Case 3: Tính toán bình thường
         else:
-            creds_needed = advisor.calculate_credits_needed(gpa, creds, target_gpa, perf_score)
+            # Một lần gọi NumPy cho cả số tín chỉ cần thêm lẫn đường GPA
+            horizons = np.arange(0, 151, 3)
+            grid = advisor.project_gpa_grid(gpa, creds, [target_gpa], [perf_score], horizons)
+            creds_needed = float(grid['credits_needed'][0, 0])
             
             # Hiển thị Metrics
             m1, m2, m3 = st.columns(3)
@@ -282,49 +497,91 @@ with tab3:
             
             st.info(f"💡 Với phong độ **{perf_score}**, bạn cần học khoảng **{int(creds_needed)}** tín chỉ nữa (tương đương ~{int(creds_needed/3)} môn) để đạt mục tiêu.")
             
-            # --- VẼ BIỂU ĐỒ (Đã fix lỗi chia cho 0) ---
-            chart_data = {"Tín chỉ": [], "GPA": []}
-            curr_c, curr_g = creds, gpa
-            
-            # Giới hạn steps để tránh vòng lặp vô tận nếu số quá lớn
-            steps = int(creds_needed / 3) + 2
-            if steps > 50: steps = 50 
-            
-            for i in range(steps + 1):
-                added = i * 3
-                total_new_credits = curr_c + added
-                
-                if total_new_credits == 0:
-                    new_g = 0.0
-                else:
-                    new_g = ((curr_g * curr_c) + (perf_score * added)) / total_new_credits
-                    
-                chart_data["Tín chỉ"].append(total_new_credits)
-                chart_data["GPA"].append(new_g)
-                
-            st.line_chart(pd.DataFrame(chart_data), x="Tín chỉ", y="GPA", color="#51cf66")
+            # --- VẼ BIỂU ĐỒ: giới hạn số mốc để biểu đồ không quá dài ---
+            steps = min(int(creds_needed / 3) + 2, 50)
+            chart_data = pd.DataFrame({
+                "Tín chỉ": creds + horizons[:steps + 1],
+                "GPA": grid['trajectory'][0, :steps + 1],
+            })
+            st.line_chart(chart_data, x="Tín chỉ", y="GPA", color="#51cf66")
+        
+        # --- MÔ PHỎNG MONTE CARLO: điểm từng môn còn lại rút theo độ khó hiệu chỉnh bằng điểm khóa trước ---
+        if gap > 0:
+            sim = advisor.simulate_gpa(
+                st.session_state['transcript'], st.session_state['selected_major'],
+                target_gpa, perf_score, n_sims=3000, seed=0, grade_model=grade_model
+            )
+            if len(sim['credits']):
+                st.markdown("##### 🎲 Mô phỏng theo điểm các khóa trước ở các môn còn lại")
+                st.metric("Xác suất đạt mục tiêu khi học hết lộ trình", f"{sim['final_p_reach'] * 100:.0f}%")
+                band_data = pd.DataFrame({
+                    "Tín chỉ": sim['credits'],
+                    "Bi quan (P10)": sim['bands'][10],
+                    "Trung vị": sim['bands'][50],
+                    "Lạc quan (P90)": sim['bands'][90],
+                })
+                st.line_chart(band_data, x="Tín chỉ", color=["#ff6b6b", "#51cf66", "#58a6ff"])
+
+        remaining = advisor.remaining_roadmap(st.session_state['transcript'], st.session_state['selected_major'])
+        if remaining:
+            with st.expander("📊 Điểm kỳ vọng các môn còn lại (theo khóa trước)"):
+                expected_df = advisor.expected_grades(remaining, grade_model)
+                st.dataframe(expected_df.rename(columns={
+                    'id': 'Mã', 'name': 'Tên môn', 'credits': 'TC', 'difficulty': 'Độ khó',
+                    'expected_points': 'Điểm kỳ vọng', 'samples': 'Số lượt điểm',
+                }), hide_index=True, use_container_width=True,
+                    column_config={'Điểm kỳ vọng': st.column_config.NumberColumn(format="%.2f")})
 
     st.divider()
     
     # --- GỢI Ý MÔN DỄ ---
     st.subheader("🥝 Gợi ý môn cải thiện điểm")
-    st.caption("Các môn chưa học có độ khó thấp nhất, giúp bạn dễ dàng đạt mức điểm phong độ đã chọn.")
+    st.caption("Các môn trong chương trình đã đủ tiên quyết và có điểm kỳ vọng (theo các khóa trước) cao nhất, giúp bạn dễ dàng đạt mức điểm phong độ đã chọn.")
     
-    easy_subjects = advisor.find_easiest_subjects(st.session_state['transcript'], st.session_state['planned_subjects'])
+    categories = sorted({sub['category'] for sub in advisor.subjects.values() if sub.get('category')})
+    easy_category = st.selectbox("Nhóm môn", ["Tất cả"] + categories, key="easy_category")
+    easy_subjects = advisor.find_easiest_subjects(
+        st.session_state['transcript'],
+        st.session_state['planned_subjects'],
+        major_code=st.session_state['selected_major'],
+        category=None if easy_category == "Tất cả" else easy_category,
+        current_sem=st.session_state['current_sem'],
+        grade_model=grade_model
+    )
     
     if easy_subjects:
         cols = st.columns(4)
         for idx, sub in enumerate(easy_subjects):
             with cols[idx % 4]:
-                st.markdown(f"""
-                <div style="background:#161b22; border:1px solid #30363d; border-radius:8px; padding:15px; text-align:center; height:140px; display:flex; flex-direction:column; justify-content:center;">
-                    <div style="font-size:2em;">🍀</div>
-                    <div style="font-weight:bold; color:#58a6ff; margin-top:5px;">{sub['name']}</div>
-                    <div style="font-size:0.8em; color:#8b949e;">{sub['credits']} TC | Khó: {sub['difficulty']}</div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(ui_cards.easy_win_card(sub['name'], sub['credits'], sub['difficulty'],
+                                                   sub.get('expected_points')), unsafe_allow_html=True)
                 if st.button("Chọn", key=f"boost_{sub['id']}", use_container_width=True):
-                    st.session_state['planned_subjects'].append(sub['id'])
+                    add_to_basket(sub['id'])
+                    # Giỏ môn nằm ở tab khác: phải chạy lại cả app để giỏ và gợi ý cập nhật
                     st.rerun()
     else:
-        st.info("Không tìm thấy môn gợi ý phù hợp.")
\ No newline at end of file
+        st.info("Không tìm thấy môn gợi ý phù hợp.")
+
+with tab3, PROFILER.section('ui.tab3'):
+    strategy_fragment()
+
+# Lưu bảng điểm / giỏ môn của phiên (chỉ ghi khi có thay đổi)
+save_student()
+
+# =============================================================================
+# 5. DEBUG PANEL (ẩn): chạy với ADVISOR_PROFILE=1 và mở ?debug=1
+# =============================================================================
+if PROFILER.enabled and st.query_params.get('debug') == '1':
+    with st.expander("🛠️ Profiling", expanded=True):
+        snap = PROFILER.snapshot()
+        if snap['timings']:
+            timing_df = pd.DataFrame.from_dict(snap['timings'], orient='index')
+            timing_df['avg_ms'] = timing_df['total_s'] / timing_df['calls'] * 1000
+            st.dataframe(timing_df.sort_values('total_s', ascending=False), use_container_width=True)
+        st.json({'counters': snap['counters'], 'gauges': snap['gauges'], 'top_sessions': snap['top_sessions']})
+        d1, d2, d3 = st.columns(3)
+        d1.download_button("⬇️ JSON", PROFILER.to_json(), file_name="profile.json", mime="application/json")
+        d2.download_button("⬇️ Prometheus", PROFILER.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        if d3.button("♻️ Reset"):
+            PROFILER.reset()
+            st.rerun()
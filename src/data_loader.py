@@ -0,0 +1,415 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+from graph_engine import CurriculumGraph
+
+# Tăng khi đổi cấu trúc snapshot để bản cũ tự bị bỏ qua
+SNAPSHOT_VERSION = 2
+SNAPSHOT_DIRNAME = '.snapshot'
+
+
+def load_curriculum(path, major_budget_bytes=None):
+    """
+    Đọc dữ liệu chương trình về dạng {'majors': MajorRegistry, 'subjects': dict}
+    (kèm 'snapshot': CurriculumSnapshot khi đọc qua snapshot, để dựng đồ thị từ mảng).
+    path là file curriculum.json, hoặc thư mục knowledge_base/ do
+    tools/convert_data.py sinh ra (khi đó dùng snapshot nhị phân nếu còn mới;
+    lộ trình từng ngành chỉ được đọc từ mmap khi ngành đó được dùng).
+
+    Với file JSON và có major_budget_bytes, lộ trình cũng được phục vụ từ
+    snapshot (.snapshot/<tên file>/ cạnh file JSON) để bản parse đầy đủ được
+    giải phóng và việc đẩy ngành ra khỏi bộ nhớ thực sự có tác dụng.
+    """
+    if os.path.isdir(path):
+        snapshot = load_knowledge_base(path)
+        return {
+            'majors': snapshot.major_registry(major_budget_bytes),
+            'subjects': snapshot.subjects(),
+            'snapshot': snapshot,
+        }
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw)
+    if major_budget_bytes is not None:
+        base = os.path.basename(path)
+        snapshot_dir = os.path.join(os.path.dirname(os.path.abspath(path)), SNAPSHOT_DIRNAME,
+                                    os.path.splitext(base)[0])
+        try:
+            snapshot = _open_or_compile(snapshot_dir, {base: hashlib.sha256(raw).hexdigest()}, lambda: data)
+        except OSError:
+            # Thư mục dữ liệu chỉ đọc: giữ toàn bộ trong bộ nhớ như khi không có ngân sách
+            snapshot = None
+        if snapshot is not None:
+            data['majors'] = snapshot.major_registry(major_budget_bytes)
+            data['snapshot'] = snapshot
+            return data
+    data['majors'] = MajorRegistry.from_dict(data['majors'], major_budget_bytes)
+    return data
+
+
+def load_knowledge_base(kb_dir, snapshot_dir=None):
+    """Trả về CurriculumSnapshot; biên dịch lại chỉ khi hash file nguồn thay đổi"""
+    snapshot_dir = snapshot_dir or os.path.join(kb_dir, SNAPSHOT_DIRNAME)
+    return _open_or_compile(snapshot_dir, source_hashes(kb_dir), lambda: read_knowledge_base(kb_dir))
+
+
+def _open_or_compile(snapshot_dir, hashes, read_data):
+    snapshot = CurriculumSnapshot.open(snapshot_dir)
+    if snapshot is not None and snapshot.manifest['sources'] == hashes:
+        return snapshot
+
+    compile_snapshot(read_data(), hashes, snapshot_dir)
+    return CurriculumSnapshot.open(snapshot_dir)
+
+
+def source_hashes(kb_dir):
+    """SHA-256 của từng file nguồn JSON (đường dẫn tương đối -> hash)"""
+    hashes = {}
+    for rel in source_files(kb_dir):
+        with open(os.path.join(kb_dir, rel), 'rb') as f:
+            hashes[rel] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def source_files(kb_dir):
+    """Các file nguồn JSON của knowledge_base/ (đường dẫn tương đối), đúng các file được đọc"""
+    files = ['subjects.json', 'relations.json']
+    majors_dir = os.path.join(kb_dir, 'majors')
+    if os.path.isdir(majors_dir):
+        files += sorted(f'majors/{name}' for name in os.listdir(majors_dir) if name.endswith('.json'))
+    return [rel for rel in files if os.path.exists(os.path.join(kb_dir, rel))]
+
+
+# =============================================================================
+# ĐỌC LAYOUT knowledge_base/ (subjects.json, relations.json, majors/*.json)
+# =============================================================================
+def read_knowledge_base(kb_dir):
+    """Ghép các file rời của ETL thành cùng dạng với curriculum.json"""
+    with open(os.path.join(kb_dir, 'subjects.json'), 'r', encoding='utf-8') as f:
+        subject_rows = json.load(f)
+    relations = []
+    if os.path.exists(os.path.join(kb_dir, 'relations.json')):
+        with open(os.path.join(kb_dir, 'relations.json'), 'r', encoding='utf-8') as f:
+            relations = json.load(f)
+
+    subjects = {}
+    for row in subject_rows:
+        sub = {k: v for k, v in row.items() if k != 'id'}
+        sub['prerequisites'] = []
+        subjects[row['id']] = sub
+    for rel in relations:
+        if rel.get('type', 'prerequisite') == 'prerequisite' and rel['target'] in subjects:
+            subjects[rel['target']]['prerequisites'].append(rel['source'])
+
+    majors = {}
+    for rel in source_files(kb_dir):
+        if not rel.startswith('majors/'):
+            continue
+        code = os.path.splitext(os.path.basename(rel))[0]
+        with open(os.path.join(kb_dir, rel), 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+        roadmap = {}
+        for row in rows:
+            roadmap.setdefault(str(row['suggested_semester']), []).append(row['subject_id'])
+        majors[code] = {'name': code, 'roadmap': roadmap}
+    return {'majors': majors, 'subjects': subjects}
+
+
+# =============================================================================
+# SNAPSHOT NHỊ PHÂN (mảng .npy đọc bằng mmap + manifest.json)
+# =============================================================================
+def compile_snapshot(data, hashes, snapshot_dir):
+    """
+    Ghi snapshot: bảng môn dạng mảng cột, tiên quyết & kỳ mở lớp dạng CSR,
+    lộ trình các ngành dạng CSR, cùng các mảng đồ thị đã biên dịch (đường găng,
+    bitset tiên quyết) để khởi động không phải tính lại. Ghi vào thư mục tạm rồi đổi tên nguyên tử
+    để nhiều worker khởi động cùng lúc không đọc phải snapshot dở dang.
+    """
+    subjects = data['subjects']
+    ids = list(subjects)
+    index = {sub_id: i for i, sub_id in enumerate(ids)}
+    # Mã môn được tham chiếu nhưng không có trong danh mục
+    extra = []
+    for sub in subjects.values():
+        for pr in CurriculumGraph.normalize_prereqs(sub):
+            if pr not in index:
+                index[pr] = len(ids) + len(extra)
+                extra.append(pr)
+
+    arrays = {
+        'names': np.array([subjects[s].get('name', s) for s in ids], dtype=str),
+        'categories': np.array([subjects[s].get('category', '') for s in ids], dtype=str),
+        'credits': np.array([subjects[s]['credits'] for s in ids], dtype=np.int16),
+        'theory_credits': np.array([subjects[s].get('theory_credits', 0) for s in ids], dtype=np.int16),
+        'practice_credits': np.array([subjects[s].get('practice_credits', 0) for s in ids], dtype=np.int16),
+        'difficulty': np.array([subjects[s].get('difficulty', 3) for s in ids], dtype=np.int8),
+        'has_difficulty': np.array(['difficulty' in subjects[s] for s in ids], dtype=bool),
+    }
+    arrays['prereq_indptr'], arrays['prereq_indices'] = _csr(
+        [[index[pr] for pr in CurriculumGraph.normalize_prereqs(subjects[s])] for s in ids], np.int32)
+    # Cùng thứ tự chỉ số với index ở trên (danh mục rồi môn tiên quyết ngoài danh mục)
+    graph = CurriculumGraph(subjects, {})
+    for name, arr in graph.compiled_arrays().items():
+        arrays[f'graph_{name}'] = arr
+    arrays['offered_indptr'], arrays['offered_terms'] = _csr(
+        [subjects[s].get('semesters_offered', []) for s in ids], np.int8)
+
+    codes = list(data['majors'])
+    major_rows, major_sems = [], []
+    for code in codes:
+        roadmap = data['majors'][code]['roadmap']
+        row, sems = [], []
+        for sem in sorted(int(k) for k in roadmap):
+            for sub_id in roadmap[str(sem)]:
+                if sub_id not in index:
+                    index[sub_id] = len(ids) + len(extra)
+                    extra.append(sub_id)
+                row.append(index[sub_id])
+                sems.append(sem)
+        major_rows.append(row)
+        major_sems.append(sems)
+    arrays['ids'] = np.array(ids + extra, dtype=str)
+    arrays['major_indptr'], arrays['major_subjects'] = _csr(major_rows, np.int32)
+    arrays['major_semesters'] = np.array([s for sems in major_sems for s in sems], dtype=np.int16)
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'sources': hashes,
+        'n_subjects': len(ids),
+        'n_graph': len(graph.ids),
+        'majors': [{'code': c, 'name': data['majors'][c].get('name', c)} for c in codes],
+        'arrays': sorted(arrays),
+    }
+
+    parent = os.path.dirname(os.path.abspath(snapshot_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.snapshot-', dir=parent)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), arr, allow_pickle=False)
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    old_dir = tempfile.mkdtemp(prefix='.snapshot-old-', dir=parent)
+    try:
+        if os.path.exists(snapshot_dir):
+            os.replace(snapshot_dir, os.path.join(old_dir, 'snap'))
+        os.replace(tmp_dir, snapshot_dir)
+    except OSError:
+        # Worker khác đang/vừa ghi snapshot: dùng bản của nó
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _csr(rows, dtype):
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(r) for r in rows])
+    data = np.array([v for r in rows for v in r], dtype=dtype)
+    return indptr, data
+
+
+class CurriculumSnapshot:
+    """Snapshot đã biên dịch; các mảng được ánh xạ bộ nhớ (mmap), chỉ đọc"""
+
+    def __init__(self, snapshot_dir, manifest, arrays):
+        self.snapshot_dir = snapshot_dir
+        self.manifest = manifest
+        self.arrays = arrays
+        self._major_pos = {info['code']: k for k, info in enumerate(manifest['majors'])}
+
+    @classmethod
+    def open(cls, snapshot_dir):
+        """Mở snapshot; trả về None nếu chưa có, hỏng hoặc khác phiên bản"""
+        manifest_path = os.path.join(snapshot_dir, 'manifest.json')
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != SNAPSHOT_VERSION:
+                return None
+            arrays = {
+                name: np.load(os.path.join(snapshot_dir, f'{name}.npy'), mmap_mode='r', allow_pickle=False)
+                for name in manifest['arrays']
+            }
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(snapshot_dir, manifest, arrays)
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def subject_ids(self):
+        return self['ids'][:self.manifest['n_subjects']].tolist()
+
+    def subjects(self):
+        """Bảng môn học dùng chung cho mọi ngành"""
+        a = self.arrays
+        all_ids = a['ids'].tolist()
+        n = self.manifest['n_subjects']
+        names = a['names'].tolist()
+        categories = a['categories'].tolist()
+        credits = a['credits'].tolist()
+        theory = a['theory_credits'].tolist()
+        practice = a['practice_credits'].tolist()
+        difficulty = a['difficulty'].tolist()
+        has_difficulty = a['has_difficulty'].tolist()
+        p_ptr, p_idx = a['prereq_indptr'].tolist(), a['prereq_indices'].tolist()
+        o_ptr, o_terms = a['offered_indptr'].tolist(), a['offered_terms'].tolist()
+
+        subjects = {}
+        for i in range(n):
+            sub = {
+                'name': names[i],
+                'credits': credits[i],
+                'theory_credits': theory[i],
+                'practice_credits': practice[i],
+                'semesters_offered': o_terms[o_ptr[i]:o_ptr[i + 1]],
+                'prerequisites': [all_ids[j] for j in p_idx[p_ptr[i]:p_ptr[i + 1]]],
+            }
+            if has_difficulty[i]:
+                sub['difficulty'] = difficulty[i]
+            if categories[i]:
+                sub['category'] = categories[i]
+            subjects[all_ids[i]] = sub
+        return subjects
+
+    def roadmap(self, code):
+        """Đọc lộ trình một ngành từ hàng CSR tương ứng (chỉ chạm vào trang mmap cần thiết)"""
+        k = self._major_pos[code]
+        a = self.arrays
+        start, end = int(a['major_indptr'][k]), int(a['major_indptr'][k + 1])
+        ids = a['ids']
+        roadmap = {}
+        for sub_idx, sem in zip(a['major_subjects'][start:end].tolist(),
+                                a['major_semesters'][start:end].tolist()):
+            roadmap.setdefault(str(sem), []).append(str(ids[sub_idx]))
+        return roadmap
+
+    def graph(self, majors):
+        """CurriculumGraph dựng thẳng từ mảng đã biên dịch (không qua dict môn học)"""
+        a = self.arrays
+        n = self.manifest['n_subjects']
+        ids = a['ids'][:self.manifest['n_graph']].tolist()
+        o_ptr, o_terms = a['offered_indptr'].tolist(), a['offered_terms'].tolist()
+        offered = {ids[i]: frozenset(o_terms[o_ptr[i]:o_ptr[i + 1]]) for i in range(n)}
+        compiled = {name[len('graph_'):]: arr for name, arr in a.items() if name.startswith('graph_')}
+        return CurriculumGraph.from_arrays(ids, n, a['credits'], a['difficulty'], a['prereq_indptr'],
+                                           a['prereq_indices'], offered, majors, compiled)
+
+    def major_registry(self, budget_bytes=None):
+        names = {info['code']: info['name'] for info in self.manifest['majors']}
+        return MajorRegistry(names, self.roadmap, budget_bytes)
+
+    def to_data(self):
+        """Dựng lại toàn bộ dict {'majors', 'subjects'} (nạp hết mọi ngành)"""
+        majors = {
+            info['code']: {'name': info['name'], 'roadmap': self.roadmap(info['code'])}
+            for info in self.manifest['majors']
+        }
+        return {'majors': majors, 'subjects': self.subjects()}
+
+
+# =============================================================================
+# REGISTRY NGÀNH: nạp lười + giải phóng theo ngân sách bộ nhớ
+# =============================================================================
+class MajorRegistry(Mapping):
+    """
+    Mapping mã ngành -> {'name', 'roadmap', 'subject_ids'}.
+    Tên ngành luôn có sẵn (registry.names); lộ trình chỉ được nạp khi truy cập
+    lần đầu và bị giải phóng theo LRU khi tổng dung lượng ước tính vượt
+    budget_bytes. Bảng môn học không nằm trong registry mà dùng chung.
+
+    Giải phóng chỉ tiết kiệm bộ nhớ khi load_roadmap đọc lại từ nguồn ngoài
+    (CurriculumSnapshot.roadmap); với from_dict mọi lộ trình vẫn nằm trong dict nguồn.
+    """
+
+    def __init__(self, names, load_roadmap, budget_bytes=None):
+        self.names = dict(names)
+        self.budget_bytes = budget_bytes
+        self.resident_bytes = 0
+        self.loads = 0
+        self.evictions = 0
+        self._load_roadmap = load_roadmap
+        self._loaded = OrderedDict()
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_dict(cls, majors, budget_bytes=None):
+        """Registry trên dict đã nạp sẵn: tiện cho dữ liệu nhỏ, budget_bytes không giảm bộ nhớ"""
+        names = {code: major.get('name', code) for code, major in majors.items()}
+        return cls(names, lambda code: majors[code]['roadmap'], budget_bytes)
+
+    def on_evict(self, callback):
+        """Đăng ký hàm callback(code) gọi khi một ngành bị giải phóng"""
+        self._listeners.append(callback)
+
+    def __getitem__(self, code):
+        if code not in self.names:
+            raise KeyError(code)
+        with self._lock:
+            if code in self._loaded:
+                self._loaded.move_to_end(code)
+                return self._loaded[code][0]
+
+            roadmap = self._load_roadmap(code)
+            major = {
+                'name': self.names[code],
+                'roadmap': roadmap,
+                'subject_ids': tuple(dict.fromkeys(s for sem in roadmap.values() for s in sem)),
+            }
+            size = _deep_size(major)
+            self._loaded[code] = (major, size)
+            self.resident_bytes += size
+            self.loads += 1
+            self._evict()
+            return major
+
+    def _evict(self):
+        # Luôn giữ lại ngành vừa nạp dù một mình nó vượt ngân sách
+        while (self.budget_bytes is not None and self.resident_bytes > self.budget_bytes
+               and len(self._loaded) > 1):
+            code, (_, size) = self._loaded.popitem(last=False)
+            self.resident_bytes -= size
+            self.evictions += 1
+            for callback in self._listeners:
+                callback(code)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, code):
+        return code in self.names
+
+    def loaded(self):
+        """Các ngành đang nằm trong bộ nhớ (cũ -> mới)"""
+        return list(self._loaded)
+
+    def stats(self):
+        return {
+            'majors': len(self.names),
+            'loaded': len(self._loaded),
+            'resident_bytes': self.resident_bytes,
+            'loads': self.loads,
+            'evictions': self.evictions,
+        }
+
+
+def _deep_size(obj):
+    """Ước lượng dung lượng (byte) của cấu trúc dict/list/str lồng nhau"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_size(v) for v in obj)
+    return size
@@ -1,126 +1,620 @@
-import json
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+import numpy as np
 import pandas as pd
+from graph_engine import CurriculumGraph, GraduationPlanner
+from data_loader import load_curriculum
+from rules import CompiledRules, load_rules
+from transcript import CompactTranscript, TranscriptCodec
+import gpa_projection
 
 class AcademicAdvisor:
-    def __init__(self, data_path):
-        with open(data_path, 'r', encoding='utf-8') as f:
-            self.data = json.load(f)
+    # Từ ngưỡng này trở lên, kiểm tra tiên quyết bằng mặt nạ bit NumPy
+    BITSET_MIN_SUBJECTS = 128
+
+    GRADE_POINTS = {
+        'A': 4.0, 'B+': 3.5, 'B': 3.0, 'C+': 2.5,
+        'C': 2.0, 'D+': 1.5, 'D': 1.0, 'F': 0.0
+    }
+    # Các điểm chưa được tính là "đã qua môn"
+    NOT_PASSED = ('F', 'Chưa học')
+
+    # Số sinh viên xử lý mỗi lô khi gợi ý hàng loạt (giới hạn bộ nhớ tạm)
+    COHORT_CHUNK = 2048
+
+    # Điểm ưu tiên của môn học cải thiện (thấp hơn mọi môn chưa qua)
+    RETAKE_SCORE = 5
+
+    # Phân tích "rớt môn X": từ số kịch bản này trở lên mới chia cho process pool
+    IMPACT_PARALLEL_MIN = 48
+
+    def __init__(self, data_path, eligibility_mode='auto', major_budget_bytes=None, rules=None,
+                 data=None, graph=None):
+        # data_path: file curriculum.json hoặc thư mục knowledge_base/ (dùng snapshot)
+        # major_budget_bytes: ngân sách bộ nhớ cho lộ trình các ngành đang nạp
+        # rules: ghi đè luật nghiệp vụ (dict hoặc file JSON), xem rules.DEFAULT_RULES
+        # data, graph: dữ liệu/đồ thị dựng sẵn (nạp lại nóng, xem hot_reload.py)
+        self.data_path = data_path
+        self._options = {'eligibility_mode': eligibility_mode,
+                         'major_budget_bytes': major_budget_bytes, 'rules': rules}
+        self.data = data if data is not None else load_curriculum(data_path, major_budget_bytes)
         self.majors = self.data['majors']
         self.subjects = self.data['subjects']
+        # Đồ thị tiên quyết biên dịch một lần, dùng lại cho mọi lượt gợi ý
+        # (có snapshot thì đọc thẳng mảng đã biên dịch sẵn)
+        snapshot = self.data.get('snapshot')
+        if graph is None:
+            graph = (snapshot.graph(self.majors) if snapshot is not None
+                     else CurriculumGraph(self.subjects, self.majors))
+        self.graph = graph
+        self.majors.on_evict(self.graph.forget_major)
+        # Luật nghiệp vụ biên dịch thành mảng theo chỉ số môn
+        self.rules = CompiledRules(load_rules(rules), self.graph, self.subjects)
+        # Bảng mã dùng chung cho bảng điểm dạng gọn (CompactTranscript)
+        self.codec = TranscriptCodec(self.graph, self.GRADE_POINTS)
+        # Thứ tự "môn dễ" theo mô hình điểm: mô hình -> {ngành: (phiên bản, thứ tự, điểm kỳ vọng)}
+        self._expected_order = weakref.WeakKeyDictionary()
+
+        # 'set': duyệt tập Python | 'bitset': AND vector hóa | 'auto': theo cỡ danh mục
+        if eligibility_mode == 'auto':
+            big = len(self.graph.ids) >= self.BITSET_MIN_SUBJECTS
+            eligibility_mode = 'bitset' if big else 'set'
+        if eligibility_mode not in ('set', 'bitset'):
+            raise ValueError(f"eligibility_mode không hợp lệ: {eligibility_mode}")
+        self.eligibility_mode = eligibility_mode
 
     def calculate_gpa(self, transcript):
         """Tính GPA hiện tại và tổng tín chỉ tích lũy"""
+        # Bảng điểm mã hóa theo phiên bản dữ liệu khác (trước khi nạp lại) thì tính như dict
+        if isinstance(transcript, CompactTranscript) and transcript.codec is self.codec:
+            return transcript.gpa()
         total_points = 0
         total_credits = 0
         
-        grade_map = {
-            'A': 4.0, 'B+': 3.5, 'B': 3.0, 'C+': 2.5,
-            'C': 2.0, 'D+': 1.5, 'D': 1.0, 'F': 0.0
-        }
-        
         for sub_id, grade in transcript.items():
-            if grade == 'Chưa học' or sub_id not in self.subjects:
-                continue
-            
-            creds = self.subjects[sub_id]['credits']
-            gpa_point = grade_map.get(grade, 0)
-            
-            # Chỉ tính vào GPA nếu không phải F (hoặc tùy quy chế trường)
-            # Ở đây giả định F vẫn tính vào mẫu số nhưng tử số là 0
-            total_points += gpa_point * creds
+            points, creds = self.grade_contribution(sub_id, grade)
+            total_points += points
             total_credits += creds
             
         gpa = total_points / total_credits if total_credits > 0 else 0.0
         return gpa, total_credits
 
+    def compact_transcript(self, transcript=None):
+        """Bảng điểm dạng gọn (dùng như dict) từ dict {mã môn: điểm}"""
+        return CompactTranscript.from_dict(self.codec, transcript or {})
+
+    def grade_contribution(self, sub_id, grade):
+        """Đóng góp (điểm x tín chỉ, tín chỉ) của một dòng bảng điểm vào GPA"""
+        if grade == 'Chưa học' or sub_id not in self.subjects:
+            return 0, 0
+        
+        creds = self.subjects[sub_id]['credits']
+        gpa_point = self.GRADE_POINTS.get(grade, 0)
+        
+        # Chỉ tính vào GPA nếu không phải F (hoặc tùy quy chế trường)
+        # Ở đây giả định F vẫn tính vào mẫu số nhưng tử số là 0
+        return gpa_point * creds, creds
+
     def suggest_next_semester(self, transcript, major_code, current_sem, planned_courses=[]):
         """
         Gợi ý môn học thông minh dựa trên Trọng số (Scoring System) - LEVEL 2
         """
-        roadmap = self.majors[major_code]['roadmap']
+        graph = self.graph
+        rules = self.rules
         candidates = []
+        planned_set = set(planned_courses)
         
         # 1. Xác định các môn đã qua (D trở lên)
         passed_subjects = {
             s: g for s, g in transcript.items() 
-            if g not in ['F', 'Chưa học']
+            if g not in self.NOT_PASSED
         }
+        # Môn đã qua nhưng quy chế cho học cải thiện
+        retake = {s for s, g in passed_subjects.items() if g in rules.improvable_grades}
         
-        # 2. Duyệt qua tất cả các môn trong chương trình
-        all_semesters = sorted([int(k) for k in roadmap.keys()])
+        # Chế độ bitset: tính đủ điều kiện cho các môn của ngành (và môn song hành)
+        # bằng một phép AND, rồi áp luật kỳ mở lớp / môn song hành trên cùng mảng
+        if self.eligibility_mode == 'bitset':
+            passed_bits = graph.encode(passed_subjects)
+            taken = graph.decode(graph.encode(passed_subjects.keys() - retake) | graph.encode(planned_set))
+            rows = np.union1d(graph.roadmap_idx[major_code], rules.coreq_cols)
+            available = np.zeros(len(graph.ids), dtype=bool)
+            available[rows] = (graph.eligible_mask(passed_bits, rows) & ~taken[rows]
+                               & rules.offered_mask(current_sem + 1)[rows])
+            if rules.has_coreqs:
+                available &= rules.coreq_ok(available | graph.decode(passed_bits | graph.encode(planned_set)))
+        else:
+            can_take = self._open_checker(passed_subjects, planned_set, retake, current_sem)
         
-        for sem in all_semesters:
-            sem_subjects = roadmap[str(sem)]
+        # 2. Duyệt qua tất cả các môn trong chương trình (đã sắp theo kỳ)
+        for sem, sub_id in graph.roadmap_entries[major_code]:
+            if sub_id not in self.subjects: continue
             
-            for sub_id in sem_subjects:
-                # Bỏ qua nếu đã học, đã chọn trong plan
-                if sub_id in passed_subjects or sub_id in planned_courses:
+            if self.eligibility_mode == 'bitset':
+                if not available[graph.index[sub_id]]:
                     continue
-                
-                subject = self.subjects.get(sub_id)
-                if not subject: continue
-                
-                # --- KIỂM TRA TIÊN QUYẾT ---
-                prereqs = subject.get('prerequisites', [])
-                is_eligible = True
-                
-                for pr in prereqs:
-                    if pr not in passed_subjects:
-                        is_eligible = False
-                        break
-                
-                if not is_eligible:
-                    continue 
-                
-                # --- TÍNH ĐIỂM ƯU TIÊN (SCORING) ---
-                priority_score = 0
-                reason = ""
-                priority_level = 1
-                
-                # Tiêu chí A: Trả nợ môn cũ (Quan trọng nhất)
-                if sem < current_sem:
-                    priority_score += 100
-                    reason = "🔥 Trả nợ môn các kỳ trước"
-                    priority_level = 3
-                
-                # Tiêu chí B: Môn đúng kỳ
-                elif sem == current_sem + 1:
-                    priority_score += 50
-                    reason = "📘 Theo đúng lộ trình chuẩn"
-                    priority_level = 1
-                
-                # Tiêu chí C: Học vượt
-                else:
-                    priority_score += 10
-                    reason = "🚀 Học vượt"
-                    priority_level = 1
-
-                # Tiêu chí D: Mở khóa môn khác (Critical Path)
-                unlock_power = 0
-                for other_id, other_sub in self.subjects.items():
-                    if sub_id in other_sub.get('prerequisites', []):
-                        unlock_power += 1
-                
-                if unlock_power > 0:
-                    priority_score += (unlock_power * 5)
-                    if "Trả nợ" not in reason:
-                        reason = f"🔑 Mở khóa cho {unlock_power} môn sau này"
-                        priority_level = 2
-
-                candidates.append({
-                    'id': sub_id,
-                    'name': subject['name'],
-                    'credits': subject['credits'],
-                    'difficulty': subject.get('difficulty', 3),
-                    'priority': priority_level, 
-                    'score': priority_score,
-                    'reason': reason
-                })
+            elif not can_take(sub_id):
+                continue
+            
+            candidates.append(self.score_candidate(sem, sub_id, current_sem, retake=sub_id in retake))
 
         # 3. Sắp xếp danh sách theo Điểm số (Cao xuống thấp)
         candidates.sort(key=lambda x: x['score'], reverse=True)
         return candidates
 
+    def _open_checker(self, passed_subjects, planned_set, retake, current_sem):
+        """
+        Hàm sub_id -> có gợi ý được ở kỳ tới không (chế độ 'set'): chưa học/được
+        học cải thiện, chưa trong giỏ, đủ tiên quyết, mở lớp, đủ môn song hành.
+        """
+        graph = self.graph
+        rules = self.rules
+        offered_now = rules.offered_mask(current_sem + 1)
+
+        def open_now(sub_id):
+            # Bỏ qua nếu đã học, đã chọn trong plan
+            if sub_id in planned_set or (sub_id in passed_subjects and sub_id not in retake):
+                return False
+            # --- KIỂM TRA TIÊN QUYẾT & KỲ MỞ LỚP ---
+            return graph.is_eligible(sub_id, passed_subjects) and offered_now[graph.index[sub_id]]
+
+        def ok(sub_id):
+            return sub_id in passed_subjects or sub_id in planned_set or open_now(sub_id)
+
+        return lambda sub_id: open_now(sub_id) and rules.coreq_satisfied(sub_id, ok)
+
+    def score_candidate(self, sem, sub_id, current_sem, retake=False):
+        """Chấm điểm ưu tiên một môn (đã đủ điều kiện) nằm ở kỳ sem của lộ trình"""
+        subject = self.subjects[sub_id]
+        
+        # --- TÍNH ĐIỂM ƯU TIÊN (SCORING) ---
+        priority_score = 0
+        reason = ""
+        priority_level = 1
+        
+        # Môn đã qua, đăng ký lại để cải thiện điểm (xếp sau mọi môn còn nợ)
+        if retake:
+            return {
+                'id': sub_id,
+                'name': subject['name'],
+                'credits': subject['credits'],
+                'difficulty': subject.get('difficulty', 3),
+                'priority': 1,
+                'score': self.RETAKE_SCORE,
+                'reason': "♻️ Học cải thiện điểm"
+            }
+        
+        # Tiêu chí A: Trả nợ môn cũ (Quan trọng nhất)
+        if sem < current_sem:
+            priority_score += 100
+            reason = "🔥 Trả nợ môn các kỳ trước"
+            priority_level = 3
+        
+        # Tiêu chí B: Môn đúng kỳ
+        elif sem == current_sem + 1:
+            priority_score += 50
+            reason = "📘 Theo đúng lộ trình chuẩn"
+            priority_level = 1
+        
+        # Tiêu chí C: Học vượt
+        else:
+            priority_score += 10
+            reason = "🚀 Học vượt"
+            priority_level = 1
+
+        # Tiêu chí D: Mở khóa môn khác (Critical Path, tính bắc cầu)
+        unlock_power, chain = self.graph.critical_path(sub_id)
+        
+        if unlock_power > 0:
+            priority_score += (unlock_power * 5) + (chain * 5)
+            if "Trả nợ" not in reason:
+                reason = f"🔑 Mở khóa cho {unlock_power} môn sau này"
+                priority_level = 2
+
+        return {
+            'id': sub_id,
+            'name': subject['name'],
+            'credits': subject['credits'],
+            'difficulty': subject.get('difficulty', 3),
+            'priority': priority_level, 
+            'score': priority_score,
+            'reason': reason
+        }
+
+    def critical_path(self, sub_id):
+        """Chỉ số đường găng tính sẵn: số môn mở khóa (bắc cầu) và chuỗi dài nhất phía sau"""
+        unlocks, chain = self.graph.critical_path(sub_id)
+        return {'unlocks': unlocks, 'chain': chain}
+
+    def min_semesters_remaining(self, transcript, major_code, credit_cap=None):
+        """
+        Cận dưới số kỳ còn phải học để tốt nghiệp:
+        max(chuỗi tiên quyết dài nhất còn lại, tổng tín chỉ còn lại / trần tín chỉ)
+        """
+        credit_cap = credit_cap or self.rules.credit_cap
+        passed = {s for s, g in transcript.items() if g not in self.NOT_PASSED}
+        todo = [s for s in self.graph.semester_of[major_code] if s not in passed]
+        if not todo:
+            return 0
+        credits = sum(self.subjects.get(s, {}).get('credits', 0) for s in todo)
+        by_credits = -(-credits // credit_cap)
+        return max(self.graph.remaining_chain(todo), by_credits)
+
+    def auto_fill_basket(self, transcript, major_code, current_sem, planned_courses=[],
+                         credit_cap=None, difficulty_penalty=0.0):
+        """
+        Chọn bộ môn tốt nhất cho kỳ tới trong một lượt (bài toán cái túi 0/1).
+        Tối đa hóa tổng score - difficulty_penalty * difficulty, với tổng tín chỉ
+        (kể cả các môn đã có trong giỏ) không vượt credit_cap (mặc định theo luật).
+        """
+        credit_cap = credit_cap or self.rules.credit_cap
+        candidates = self.suggest_next_semester(transcript, major_code, current_sem, planned_courses)
+        used = sum(self.subjects.get(pid, {}).get('credits', 0) for pid in planned_courses)
+        capacity = int(credit_cap - used)
+        items = [c for c in candidates
+                 if c['score'] - difficulty_penalty * c['difficulty'] > 0 and c['credits'] <= capacity]
+        if capacity <= 0 or not items:
+            return []
+        
+        # Quy hoạch động theo số tín chỉ: best[c] = giá trị lớn nhất dùng <= c tín chỉ
+        best = [0.0] * (capacity + 1)
+        keep = [[False] * (capacity + 1) for _ in items]
+        for i, item in enumerate(items):
+            w = item['credits']
+            value = item['score'] - difficulty_penalty * item['difficulty']
+            for c in range(capacity, w - 1, -1):
+                if best[c - w] + value > best[c]:
+                    best[c] = best[c - w] + value
+                    keep[i][c] = True
+        
+        # Truy vết lựa chọn
+        chosen = []
+        c = capacity
+        for i in range(len(items) - 1, -1, -1):
+            if keep[i][c]:
+                chosen.append(items[i])
+                c -= items[i]['credits']
+        chosen.reverse()
+        return chosen
+
+    def plan_graduation(self, transcript, major_code, current_sem, credit_cap=None, terms_per_year=None):
+        """
+        Lập lộ trình đầy đủ từng kỳ tới tốt nghiệp.
+        Trả về dict: semesters [{semester, subjects, credits}], unschedulable, search_complete.
+        """
+        credit_cap = credit_cap or self.rules.credit_cap
+        terms_per_year = terms_per_year or self.rules.terms_per_year
+        passed_subjects = [s for s, g in transcript.items() if g not in self.NOT_PASSED]
+        planner = GraduationPlanner(self.graph, major_code, credit_cap, terms_per_year, self.rules.coreqs)
+        return planner.plan(passed_subjects, current_sem)
+
+    def failure_impact(self, transcript, major_code, current_sem, credit_cap=None,
+                       terms_per_year=None, workers=None):
+        """
+        "Nếu rớt môn X thì sao?" cho mọi môn còn lại trong lộ trình.
+        Kịch bản X: học theo lộ trình đề xuất tới kỳ có X, rớt X ở kỳ đó, xếp lại
+        phần còn lại. Trả về list (xếp theo rủi ro) các dict: id, name, semester
+        (kỳ dự kiến học X), delay (số kỳ tốt nghiệp muộn thêm), graduation_semester,
+        blocked (các môn phía sau bị X chặn, bắc cầu).
+        workers: None = tự chọn (song song khi nhiều kịch bản), 0/1 = chạy tuần tự.
+        """
+        credit_cap = credit_cap or self.rules.credit_cap
+        terms_per_year = terms_per_year or self.rules.terms_per_year
+        passed = [s for s, g in transcript.items() if g not in self.NOT_PASSED]
+        planner = GraduationPlanner(self.graph, major_code, credit_cap, terms_per_year, self.rules.coreqs)
+        baseline = planner.plan(passed, current_sem)['semesters']
+        if not baseline:
+            return []
+        todo = {sub_id for sem in baseline for sub_id in sem['subjects']}
+        last_sem = baseline[-1]['semester']
+
+        # --- 1. CẮT TỈA: môn không chặn môn nào và còn chỗ ở kỳ sau -> không trễ ---
+        results = []
+        pending = []
+        for offset, sem in enumerate(baseline):
+            for sub_id in sem['subjects']:
+                blocked = self._blocked_by(sub_id, todo)
+                if not blocked and self._has_room(baseline, offset, sub_id, planner):
+                    results.append(self._impact_row(sub_id, sem['semester'], 0, last_sem, blocked))
+                else:
+                    pending.append(sub_id)
+
+        # --- 2. XẾP LẠI CÁC KỊCH BẢN CÒN LẠI (tuần tự hoặc chia cho process pool) ---
+        job = (passed, major_code, current_sem, credit_cap, terms_per_year, baseline)
+        if workers is None:
+            workers = os.cpu_count() if len(pending) >= self.IMPACT_PARALLEL_MIN else 1
+        workers = min(workers or 1, len(pending))
+        if workers <= 1:
+            results.extend(self._failure_scenarios(*job, pending))
+        else:
+            # Gửi phần đồ thị đã biên dịch của engine đang chạy (không đọc lại file dữ liệu)
+            context = _ImpactContext(self, major_code)
+            chunks = [pending[k::workers] for k in range(workers)]
+            try:
+                for part in _impact_pool().map(_impact_worker, [(context, job + (chunk,)) for chunk in chunks]):
+                    results.extend(part)
+            except BrokenProcessPool:
+                _reset_impact_pool()
+                results.extend(self._failure_scenarios(*job, pending))
+
+        results.sort(key=lambda r: (-r['delay'], -len(r['blocked']), r['semester'], r['id']))
+        return results
+
+    def _failure_scenarios(self, passed, major_code, current_sem, credit_cap, terms_per_year,
+                           baseline, sub_ids):
+        """Xếp lại lộ trình cho từng kịch bản rớt môn (phần sau kỳ rớt)"""
+        planner = GraduationPlanner(self.graph, major_code, credit_cap, terms_per_year, self.rules.coreqs)
+        where = {sub_id: k for k, sem in enumerate(baseline) for sub_id in sem['subjects']}
+        todo = set(where)
+        rows = []
+        for sub_id in sub_ids:
+            offset = where[sub_id]
+            # Các kỳ trước giữ nguyên; ở kỳ rớt, chỉ X chưa qua
+            done = set(passed)
+            for sem in baseline[:offset + 1]:
+                done.update(sem['subjects'])
+            done.discard(sub_id)
+            fail_sem = baseline[offset]['semester']
+            replan = planner.plan(done, fail_sem)['semesters']
+            grad_sem = replan[-1]['semester'] if replan else fail_sem
+            delay = max(0, grad_sem - baseline[-1]['semester'])
+            rows.append(self._impact_row(sub_id, fail_sem, delay, baseline[-1]['semester'] + delay,
+                                         self._blocked_by(sub_id, todo)))
+        return rows
+
+    def _blocked_by(self, sub_id, todo):
+        """Các môn còn phải học nhận sub_id làm tiên quyết (trực tiếp hoặc bắc cầu)"""
+        blocked = []
+        seen = {sub_id}
+        stack = [sub_id]
+        while stack:
+            for dep in self.graph.dependents.get(stack.pop(), ()):
+                if dep not in seen:
+                    seen.add(dep)
+                    stack.append(dep)
+                    if dep in todo:
+                        blocked.append(dep)
+        return blocked
+
+    def _has_room(self, baseline, offset, sub_id, planner):
+        """Có kỳ nào sau kỳ rớt (trong lộ trình cũ) còn đủ tín chỉ và mở lớp X không"""
+        credits = self.subjects[sub_id]['credits']
+        terms = planner._valid_terms(self.graph.offered.get(sub_id, ()))
+        return any(sem['credits'] + credits <= planner.credit_cap
+                   and (terms is None or planner.term_of(sem['semester']) in terms)
+                   for sem in baseline[offset + 1:])
+
+    def _impact_row(self, sub_id, semester, delay, graduation_semester, blocked):
+        return {
+            'id': sub_id,
+            'name': self.subjects[sub_id]['name'],
+            'semester': semester,
+            'delay': delay,
+            'graduation_semester': graduation_semester,
+            'blocked': blocked,
+        }
+
+    def advise_cohort(self, records, major_code, current_sem=None, top_k=None, roster=None):
+        """
+        Gợi ý hàng loạt cho cả khóa sinh viên (vector hóa, không lặp từng SV).
+
+        records: DataFrame hoặc đường dẫn CSV/Parquet với các cột
+                 (student, subject, grade).
+        current_sem: số kỳ đã học xong, chung cho cả khóa hoặc dict/Series
+                     theo từng sinh viên (None: lấy cột current_sem của roster).
+        roster: danh sách mã SV, hoặc DataFrame (student[, current_sem]), để SV
+                chưa có dòng điểm nào (khóa mới nhập học) vẫn được gợi ý.
+        Trả về (summary, suggestions):
+            summary     - mỗi SV một dòng: gpa, credits
+            suggestions - các môn gợi ý đã xếp hạng theo score (cột rank)
+        """
+        df = self._read_cohort(records)
+        graph = self.graph
+        rules = self.rules
+        if isinstance(roster, pd.DataFrame):
+            if current_sem is None:
+                current_sem = roster.set_index('student')['current_sem']
+            roster = roster['student']
+        
+        # 1. Mã hóa sinh viên và môn học thành chỉ số nguyên
+        students = pd.Index(df['student'].unique())
+        students = students.union(pd.Index(roster)) if roster is not None else students.sort_values()
+        student_codes = students.get_indexer(df['student'])
+        n_students = len(students)
+        sub_idx = df['subject'].map(graph.index).fillna(-1).to_numpy(dtype=np.int64)
+        known = (sub_idx >= 0) & df['subject'].isin(self.subjects.keys()).to_numpy()
+        
+        # 2. GPA & tín chỉ: cộng dồn theo sinh viên bằng bincount
+        creds = np.where(known, graph.credits[np.maximum(sub_idx, 0)], 0.0)
+        points = df['grade'].map(self.GRADE_POINTS).fillna(0.0).to_numpy() * creds
+        total_credits = np.bincount(student_codes, weights=creds, minlength=n_students)
+        total_points = np.bincount(student_codes, weights=points, minlength=n_students)
+        gpa = np.divide(total_points, total_credits,
+                        out=np.zeros(n_students), where=total_credits > 0)
+        summary = pd.DataFrame({'gpa': gpa, 'credits': total_credits},
+                               index=pd.Index(students, name='student'))
+        
+        # 3. Ma trận "đã qua môn" (S, N); taken = đã qua và không được học cải thiện
+        passed = np.zeros((n_students, len(graph.ids)), dtype=bool)
+        ok = (sub_idx >= 0) & ~df['grade'].isin(self.NOT_PASSED).to_numpy()
+        passed[student_codes[ok], sub_idx[ok]] = True
+        taken = passed.copy()
+        improvable = ok & df['grade'].isin(rules.improvable_grades).to_numpy()
+        taken[student_codes[improvable], sub_idx[improvable]] = False
+        
+        # 4. Bảng điểm ưu tiên theo từng môn trong lộ trình ngành
+        entries = [(sem, sub_id) for sem, sub_id in graph.roadmap_entries[major_code]
+                   if sub_id in self.subjects]
+        entry_sem = np.array([sem for sem, _ in entries], dtype=np.int64)
+        entry_idx = np.array([graph.index[sub_id] for _, sub_id in entries], dtype=np.int64)
+        unlock = graph.descendant_count[entry_idx]
+        chain = graph.chain_depth[entry_idx]
+        
+        if isinstance(current_sem, (dict, pd.Series)):
+            cur = pd.Series(students).map(current_sem).to_numpy(dtype=np.int64)
+        else:
+            cur = np.full(n_students, int(current_sem), dtype=np.int64)
+        
+        # 5. Đủ điều kiện & chưa học & mở lớp kỳ tới: AND bitset theo từng lô sinh viên.
+        # Xét cả các môn song hành của lộ trình để kiểm tra luật song hành.
+        cols = np.union1d(entry_idx, rules.coreq_cols)
+        packed = np.packbits(
+            np.pad(passed, ((0, 0), (0, graph.n_words * 64 - passed.shape[1]))),
+            axis=1, bitorder='little').view('<u8')
+        prereq_bits = graph.prereq_bits[cols]
+        offered = rules.offered[cols][:, rules.term_of(cur + 1)].T
+        open_cols = np.empty((n_students, len(cols)), dtype=bool)
+        for start in range(0, n_students, self.COHORT_CHUNK):
+            chunk = slice(start, start + self.COHORT_CHUNK)
+            missing = prereq_bits[None, :, :] & ~packed[chunk, None, :]
+            open_cols[chunk] = ~missing.any(axis=-1) & ~taken[chunk][:, cols] & offered[chunk]
+        if rules.has_coreqs:
+            can_have = passed.copy()
+            can_have[:, cols] |= open_cols
+            open_cols &= rules.coreq_ok(can_have)[:, cols]
+        open_mask = open_cols[:, np.searchsorted(cols, entry_idx)]
+        
+        # 6. Chấm điểm vector hóa (cùng tiêu chí với suggest_next_semester)
+        sem_grid = entry_sem[None, :]
+        cur_grid = cur[:, None]
+        debt = sem_grid < cur_grid
+        on_time = sem_grid == cur_grid + 1
+        score = np.where(debt, 100, np.where(on_time, 50, 10)) + (unlock * 5 + chain * 5)[None, :]
+        unlocking = (unlock > 0)[None, :] & ~debt
+        priority = np.where(debt, 3, np.where(unlocking, 2, 1))
+        retake = passed[:, entry_idx]
+        score = np.where(retake, self.RETAKE_SCORE, score)
+        priority = np.where(retake, 1, priority)
+        
+        s_idx, e_idx = np.nonzero(open_mask)
+        entry_score = score[s_idx, e_idx]
+        order = np.lexsort((-entry_score, s_idx))
+        s_idx, e_idx, entry_score = s_idx[order], e_idx[order], entry_score[order]
+        
+        unlock_reason = np.array([f"🔑 Mở khóa cho {n} môn sau này" for n in unlock], dtype=object)
+        reason = np.where(retake[s_idx, e_idx], "♻️ Học cải thiện điểm",
+                 np.where(debt[s_idx, e_idx], "🔥 Trả nợ môn các kỳ trước",
+                 np.where(unlocking[s_idx, e_idx], unlock_reason[e_idx],
+                 np.where(on_time[s_idx, e_idx], "📘 Theo đúng lộ trình chuẩn", "🚀 Học vượt"))))
+        
+        ids = np.array([sub_id for _, sub_id in entries], dtype=object)
+        names = np.array([self.subjects[sub_id]['name'] for _, sub_id in entries], dtype=object)
+        suggestions = pd.DataFrame({
+            'student': students[s_idx],
+            'id': ids[e_idx],
+            'name': names[e_idx],
+            'credits': graph.credits[entry_idx[e_idx]].astype(int),
+            'difficulty': graph.difficulty[entry_idx[e_idx]].astype(int),
+            'priority': priority[s_idx, e_idx],
+            'score': entry_score,
+            'reason': reason,
+        })
+        suggestions['rank'] = suggestions.groupby('student').cumcount() + 1
+        if top_k is not None:
+            suggestions = suggestions[suggestions['rank'] <= top_k].reset_index(drop=True)
+        return summary, suggestions
+
+    def check_plan(self, transcript, planned_courses, current_sem):
+        """
+        Đối chiếu giỏ môn kỳ tới với luật nghiệp vụ (rules.py).
+        Trả về dict: credits, fee, avg_difficulty, difficulty_load, comment,
+        over_cap, over_load, not_offered, coreq_missing {môn: [song hành thiếu]}, violations.
+        """
+        graph = self.graph
+        rules = self.rules
+        passed = np.zeros((1, len(graph.ids)), dtype=bool)
+        planned = np.zeros((1, len(graph.ids)), dtype=bool)
+        passed[0, [graph.index[s] for s, g in transcript.items()
+                   if g not in self.NOT_PASSED and s in graph.index]] = True
+        planned[0, [graph.index[s] for s in planned_courses if s in graph.index]] = True
+        result = rules.evaluate_plans(planned, passed, current_sem + 1)
+
+        not_offered = [graph.ids[i] for i in np.flatnonzero(result['not_offered'][0])]
+        have = planned[0] | passed[0]
+        coreq_missing = {
+            graph.ids[i]: [c for c in rules.coreqs[graph.ids[i]] if not have[graph.index[c]]]
+            for i in np.flatnonzero(result['coreq_missing'][0])
+        }
+        report = {key: result[key][0].item() for key in
+                  ('credits', 'fee', 'avg_difficulty', 'difficulty_load', 'over_cap', 'over_load')}
+        report['credits'] = int(report['credits'])
+        report['comment'] = rules.difficulty_comment(report['avg_difficulty'])
+        report['not_offered'] = not_offered
+        report['coreq_missing'] = coreq_missing
+
+        violations = []
+        if report['over_cap']:
+            violations.append(f"⚠️ Quá tải! > {rules.credit_cap} tín chỉ.")
+        if report['over_load']:
+            violations.append(f"⚠️ Tổng độ khó quá cao ({report['difficulty_load']:.0f} > {rules.max_difficulty_load}).")
+        for sub_id in not_offered:
+            violations.append(f"📅 {self.subjects.get(sub_id, {}).get('name', sub_id)} không mở lớp kỳ {current_sem + 1}.")
+        for sub_id, missing in coreq_missing.items():
+            violations.append(f"🔗 {self.subjects.get(sub_id, {}).get('name', sub_id)} phải học cùng: {', '.join(missing)}.")
+        report['violations'] = violations
+        return report
+
+    def check_cohort_plans(self, records, plans, current_sem):
+        """
+        Kiểm tra giỏ môn của cả khóa trong một lượt (vector hóa theo luật đã biên dịch).
+
+        records: bảng điểm (student, subject, grade) như advise_cohort.
+        plans:   DataFrame hoặc CSV (student, subject) các môn dự định học kỳ tới.
+        Trả về DataFrame mỗi SV một dòng: credits, fee, avg_difficulty,
+        difficulty_load, over_cap, over_load, not_offered, coreq_missing (số môn), valid.
+        """
+        graph = self.graph
+        df = self._read_cohort(records)
+        if isinstance(plans, (str, os.PathLike)):
+            plans = pd.read_csv(plans, dtype={'student': str, 'subject': str})
+        plans = plans[['student', 'subject']]
+
+        students = pd.Index(pd.concat([df['student'], plans['student']]).unique()).sort_values()
+        passed = np.zeros((len(students), len(graph.ids)), dtype=bool)
+        planned = np.zeros_like(passed)
+        ok = ~df['grade'].isin(self.NOT_PASSED)
+        for matrix, frame in ((passed, df[ok]), (planned, plans)):
+            sub_idx = frame['subject'].map(graph.index).fillna(-1).to_numpy(dtype=np.int64)
+            known = sub_idx >= 0
+            matrix[students.get_indexer(frame['student'])[known], sub_idx[known]] = True
+
+        if isinstance(current_sem, (dict, pd.Series)):
+            cur = pd.Series(students).map(current_sem).to_numpy(dtype=np.int64)
+        else:
+            cur = np.full(len(students), int(current_sem), dtype=np.int64)
+        result = self.rules.evaluate_plans(planned, passed, cur + 1)
+
+        summary = pd.DataFrame({
+            'credits': result['credits'],
+            'fee': result['fee'],
+            'avg_difficulty': result['avg_difficulty'],
+            'difficulty_load': result['difficulty_load'],
+            'over_cap': result['over_cap'],
+            'over_load': result['over_load'],
+            'not_offered': result['not_offered'].sum(axis=1),
+            'coreq_missing': result['coreq_missing'].sum(axis=1),
+        }, index=pd.Index(students, name='student'))
+        summary['valid'] = ~(summary['over_cap'] | summary['over_load']) & \
+            (summary['not_offered'] == 0) & (summary['coreq_missing'] == 0)
+        return summary
+
+    def _read_cohort(self, records):
+        """Đọc bảng điểm cả khóa, bỏ dòng 'Chưa học' và dòng trùng (giữ dòng cuối)"""
+        if isinstance(records, (str, os.PathLike)):
+            path = str(records)
+            if path.endswith('.parquet'):
+                records = pd.read_parquet(path)
+            else:
+                records = pd.read_csv(path, dtype={'student': str, 'subject': str, 'grade': str})
+        df = records[['student', 'subject', 'grade']]
+        df = df[df['grade'] != 'Chưa học']
+        return df.drop_duplicates(['student', 'subject'], keep='last')
+
     def optimize_gpa(self, transcript, target_gpa):
         """Hàm cũ (ROI cơ bản) - Giữ lại để tránh lỗi nếu code cũ gọi"""
         pass 
@@ -136,13 +630,95 @@ class AcademicAdvisor:
         needed_credits = current_credits * (target_gpa - current_gpa) / (performance_gpa - target_gpa)
         return max(0, needed_credits)
 
-    def find_easiest_subjects(self, transcript, planned_ids, limit=4):
-        """Tìm các môn chưa học có độ khó thấp nhất (Easy Wins)"""
-        candidates = []
-        passed_subjects = set(transcript.keys())
+    def project_gpa_grid(self, current_gpa, current_credits, targets, performances, horizons):
+        """
+        Tính cả lưới trong một lần gọi NumPy:
+            credits_needed - (mục tiêu x phong độ) tín chỉ cần thêm
+            trajectory     - (phong độ x số tín chỉ học thêm) GPA dự kiến
+        """
+        return {
+            'credits_needed': gpa_projection.credits_needed_grid(
+                current_gpa, current_credits, targets, performances),
+            'trajectory': gpa_projection.gpa_trajectory(
+                current_gpa, current_credits, performances, horizons),
+        }
+
+    def simulate_gpa(self, transcript, major_code, target_gpa, performance_gpa, n_sims=2000, seed=None,
+                     grade_model=None):
+        """
+        Mô phỏng Monte Carlo GPA qua các môn còn lại của lộ trình (theo thứ tự kỳ),
+        điểm từng môn được rút theo độ khó. Xem gpa_projection.simulate_gpa.
+        grade_model: độ khó hiệu chỉnh theo điểm các khóa trước (grade_model.GradeModel).
+        """
+        gpa, creds = self.calculate_gpa(transcript)
+        remaining = self.remaining_roadmap(transcript, major_code)
+        difficulty = [self.subjects[s].get('difficulty', 3) for s in remaining]
+        if grade_model is not None:
+            difficulty = grade_model.effective_difficulty(remaining, difficulty)
+        return gpa_projection.simulate_gpa(
+            gpa, creds,
+            [self.subjects[s]['credits'] for s in remaining],
+            difficulty,
+            performance_gpa, target_gpa, n_sims, seed,
+        )
+
+    def remaining_roadmap(self, transcript, major_code):
+        """Các môn của lộ trình chưa qua, theo thứ tự kỳ (mỗi môn một lần)"""
+        passed = {s for s, g in transcript.items() if g not in self.NOT_PASSED}
+        return [s for s in dict.fromkeys(sub_id for _, sub_id in self.graph.roadmap_entries[major_code])
+                if s in self.subjects and s not in passed]
+
+    def expected_grades(self, sub_ids, grade_model):
+        """Bảng điểm kỳ vọng theo khóa trước: DataFrame (id, name, credits, difficulty, expected_points, samples)"""
+        sub_ids = list(sub_ids)
+        difficulty = [self.subjects[s].get('difficulty', 3) for s in sub_ids]
+        return pd.DataFrame({
+            'id': sub_ids,
+            'name': [self.subjects[s]['name'] for s in sub_ids],
+            'credits': [self.subjects[s]['credits'] for s in sub_ids],
+            'difficulty': difficulty,
+            'expected_points': grade_model.expected_points(sub_ids, difficulty),
+            'samples': grade_model.sample_sizes(sub_ids).astype(int),
+        })
+
+    def find_easiest_subjects(self, transcript, planned_ids, limit=4, major_code=None,
+                              category=None, current_sem=None, grade_model=None):
+        """
+        Tìm các môn có độ khó thấp nhất còn học được (Easy Wins).
+        Duyệt chỉ mục sắp sẵn (độ khó tăng dần -> tín chỉ giảm dần) của ngành
+        (hoặc cả danh mục nếu không có major_code), bỏ môn đã qua/đã chọn, chưa đủ
+        tiên quyết, khác category, không mở lớp kỳ tới (nếu có current_sem);
+        dừng ngay khi đủ limit môn.
+        Có grade_model: xếp theo điểm kỳ vọng của khóa trước (giảm dần) thay cho độ khó.
+        """
+        graph = self.graph
+        passed_subjects = {s for s, g in transcript.items() if g not in self.NOT_PASSED}
+        skip = passed_subjects | set(planned_ids)
+        categories = {category} if isinstance(category, str) else (set(category) if category else None)
+        offered_now = self.rules.offered_mask(current_sem + 1) if current_sem is not None else None
+        if self.eligibility_mode == 'bitset':
+            missing_bits = ~graph.encode(passed_subjects)
         
-        for sub_id, sub in self.subjects.items():
-            if sub_id in passed_subjects or sub_id in planned_ids:
+        candidates = []
+        order = graph.easy_order[major_code] if major_code else graph.easy_order_all
+        expected = None
+        if grade_model is not None:
+            order, expected = self._order_by_expected(major_code, order, grade_model)
+        for i in order:
+            if len(candidates) >= limit:
+                break
+            sub_id = graph.ids[i]
+            sub = self.subjects[sub_id]
+            if sub_id in skip:
+                continue
+            if categories is not None and sub.get('category') not in categories:
+                continue
+            if offered_now is not None and not offered_now[i]:
+                continue
+            if self.eligibility_mode == 'bitset':
+                if (graph.prereq_bits[i] & missing_bits).any():
+                    continue
+            elif not graph.is_eligible(sub_id, passed_subjects):
                 continue
             candidates.append({
                 'id': sub_id,
@@ -150,7 +726,79 @@ class AcademicAdvisor:
                 'credits': sub['credits'],
                 'difficulty': sub.get('difficulty', 3)
             })
-            
-        # Sắp xếp: Độ khó tăng dần -> Tín chỉ giảm dần
-        candidates.sort(key=lambda x: (x['difficulty'], -x['credits']))
-        return candidates[:limit]
\ No newline at end of file
+            if expected is not None:
+                candidates[-1]['expected_points'] = round(expected[i], 2)
+        return candidates
+
+
+    def _order_by_expected(self, major_code, order, grade_model):
+        """
+        Thứ tự môn theo điểm kỳ vọng giảm dần (rồi tín chỉ giảm dần), ghi nhớ tới khi
+        mô hình đổi phiên bản: giữa hai lần nộp điểm, vòng lọc vẫn dừng sau limit môn.
+        """
+        by_major = self._expected_order.setdefault(grade_model, {})
+        cached = by_major.get(major_code)
+        if cached is not None and cached[0] == grade_model.version:
+            return cached[1], cached[2]
+        version = grade_model.version
+        graph = self.graph
+        points = grade_model.expected_points([graph.ids[i] for i in order], graph.difficulty[order])
+        rank = np.lexsort((-graph.credits[order], -points))
+        ranked = order[rank]
+        expected = dict(zip(ranked.tolist(), points[rank].tolist()))
+        # Gán một lần cả bộ: luồng khác đọc được bản cũ hoặc mới, không lẫn
+        by_major[major_code] = (version, ranked, expected)
+        return ranked, expected
+
+
+# =============================================================================
+# PROCESS POOL CHO failure_impact (một pool dùng chung cho cả tiến trình)
+# =============================================================================
+class _ImpactContext:
+    """
+    Phần engine mà _failure_scenarios dùng, cho một ngành: đồ thị rút gọn, môn
+    song hành, tên môn. Pickle được nên gửi thẳng sang worker, kể cả engine
+    dựng từ data= trong bộ nhớ hay bản đang chạy sau một lần nạp lại bị từ chối.
+    """
+
+    _failure_scenarios = AcademicAdvisor._failure_scenarios
+    _blocked_by = AcademicAdvisor._blocked_by
+    _impact_row = AcademicAdvisor._impact_row
+
+    def __init__(self, advisor, major_code):
+        graph = advisor.graph
+        self.graph = SimpleNamespace(
+            prereqs=graph.prereqs, credits=graph.credits, index=graph.index,
+            offered=graph.offered, dependents=graph.dependents,
+            roadmap_entries={major_code: graph.roadmap_entries[major_code]},
+            semester_of={major_code: graph.semester_of[major_code]})
+        self.rules = SimpleNamespace(coreqs=advisor.rules.coreqs)
+        self.subjects = {sub_id: {'name': advisor.subjects[sub_id]['name']}
+                         for _, sub_id in graph.roadmap_entries[major_code] if sub_id in advisor.subjects}
+
+
+_IMPACT_POOL = None
+_IMPACT_POOL_LOCK = threading.Lock()
+
+
+def _impact_pool():
+    """Pool tạo một lần; 'spawn' vì fork trong server nhiều luồng (Streamlit) dễ treo"""
+    global _IMPACT_POOL
+    with _IMPACT_POOL_LOCK:
+        if _IMPACT_POOL is None:
+            _IMPACT_POOL = ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                               mp_context=multiprocessing.get_context('spawn'))
+        return _IMPACT_POOL
+
+
+def _reset_impact_pool():
+    global _IMPACT_POOL
+    with _IMPACT_POOL_LOCK:
+        if _IMPACT_POOL is not None:
+            _IMPACT_POOL.shutdown(wait=False)
+        _IMPACT_POOL = None
+
+
+def _impact_worker(args):
+    context, job = args
+    return context._failure_scenarios(*job)
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Thang điểm chữ -> hệ 4 (thứ tự giảm dần), trùng với AcademicAdvisor.GRADE_POINTS
+GRADE_LEVELS = np.array([4.0, 3.5, 3.0, 2.5, 2.0, 1.5, 1.0, 0.0])
+
+# Mô hình điểm theo độ khó: mỗi bậc khó hơn mức 3 kéo kỳ vọng xuống DIFFICULTY_SHIFT
+DIFFICULTY_SHIFT = 0.35
+GRADE_SPREAD = 0.7
+
+
+def credits_needed_grid(current_gpa, current_credits, targets, performances):
+    """
+    Bản vector hóa của calculate_credits_needed cho cả lưới mục tiêu x phong độ.
+    Trả về mảng (len(targets), len(performances)); inf = không khả thi, 0 = đã đạt.
+    """
+    t = np.asarray(targets, dtype=float)[:, None]
+    p = np.asarray(performances, dtype=float)[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        needed = current_credits * (t - current_gpa) / (p - t)
+    needed = np.where(p <= t, np.inf, np.maximum(needed, 0.0))
+    return np.where(t <= current_gpa, 0.0, needed)
+
+
+def gpa_trajectory(current_gpa, current_credits, performances, horizons):
+    """
+    GPA dự kiến sau khi học thêm h tín chỉ với phong độ p, cho mọi (p, h).
+    Trả về mảng (len(performances), len(horizons)).
+    """
+    p = np.asarray(performances, dtype=float)[:, None]
+    h = np.asarray(horizons, dtype=float)[None, :]
+    total = current_credits + h
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gpa = (current_gpa * current_credits + p * h) / total
+    return np.where(total > 0, gpa, 0.0)
+
+
+def grade_distribution(performance, difficulty):
+    """
+    Xác suất nhận từng mức điểm (GRADE_LEVELS) của môn có độ khó difficulty,
+    khi phong độ trung bình là performance. difficulty: mảng bất kỳ -> (..., 8).
+    """
+    mean = performance - DIFFICULTY_SHIFT * (np.asarray(difficulty, dtype=float) - 3)
+    logits = -((GRADE_LEVELS - mean[..., None]) ** 2) / (2 * GRADE_SPREAD ** 2)
+    probs = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return probs / probs.sum(axis=-1, keepdims=True)
+
+
+def simulate_gpa(current_gpa, current_credits, course_credits, course_difficulty,
+                 performance, target_gpa=None, n_sims=2000, seed=None,
+                 percentiles=(10, 50, 90)):
+    """
+    Mô phỏng Monte Carlo GPA khi học lần lượt các môn (theo thứ tự truyền vào).
+    Mỗi môn được rút điểm độc lập theo grade_distribution(performance, độ khó).
+    Trả về dict:
+        credits      - tổng tín chỉ tích lũy sau mỗi môn (C,)
+        bands        - {percentile: GPA tại mỗi mốc tín chỉ (C,)}
+        mean         - GPA trung bình tại mỗi mốc (C,)
+        p_reach      - xác suất GPA >= target tại mỗi mốc (C,) (nếu có target)
+        final_p_reach- xác suất đạt target sau môn cuối cùng
+    """
+    credits = np.asarray(course_credits, dtype=float)
+    difficulty = np.asarray(course_difficulty, dtype=float)
+    rng = np.random.default_rng(seed)
+
+    # Lấy mẫu theo CDF: một phép so sánh cho cả (mô phỏng, môn, mức điểm)
+    cdf = np.cumsum(grade_distribution(performance, difficulty), axis=-1)
+    u = rng.random((n_sims, len(credits)))
+    level = (u[..., None] > cdf[None, :, :]).sum(axis=-1)
+    points = GRADE_LEVELS[np.minimum(level, len(GRADE_LEVELS) - 1)]
+
+    cum_credits = current_credits + np.cumsum(credits)
+    cum_points = current_gpa * current_credits + np.cumsum(points * credits, axis=1)
+    gpa = np.divide(cum_points, cum_credits, out=np.zeros_like(cum_points), where=cum_credits > 0)
+
+    result = {
+        'credits': cum_credits,
+        'bands': {q: np.percentile(gpa, q, axis=0) for q in percentiles} if len(credits) else {},
+        'mean': gpa.mean(axis=0),
+    }
+    if target_gpa is not None:
+        reach = (gpa >= target_gpa).mean(axis=0)
+        result['p_reach'] = reach
+        result['final_p_reach'] = float(reach[-1]) if len(reach) else float(current_gpa >= target_gpa)
+    return result
@@ -0,0 +1,137 @@
+"""
+Mô hình điểm kỳ vọng từng môn học từ bảng điểm các khóa trước.
+
+Mỗi môn giữ một hàng đếm số lượt đạt từng mức điểm (A ... F). Nạp lịch sử là
+một lần cộng dồn vector hóa (np.add.at) trên bảng đếm đã GROUP BY sẵn trong
+SQLite (AdvisorStore.subject_grade_counts); sau đó mỗi lần sinh viên nộp/sửa
+điểm chỉ cộng/trừ vài ô (observe), không quét lại lịch sử.
+
+Môn ít dữ liệu được kéo về phân phối tiên nghiệm suy từ độ khó nhập tay
+(gpa_projection.grade_distribution) với trọng số PRIOR_WEIGHT lượt ảo.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+import gpa_projection
+from transcript import GRADES, NOT_TAKEN
+
+# Cột của bảng đếm = các mức điểm chữ, cùng thứ tự với gpa_projection.GRADE_LEVELS
+LETTERS = GRADES[NOT_TAKEN + 1:]
+COLUMN = {grade: col for col, grade in enumerate(LETTERS)}
+
+# Phân phối tiên nghiệm: một sinh viên "trung bình" (phong độ 3.0) học môn có độ khó d,
+# tính như PRIOR_WEIGHT lượt điểm ảo
+PRIOR_PERFORMANCE = 3.0
+PRIOR_WEIGHT = 8.0
+
+
+class GradeModel:
+    """Bảng đếm (môn x mức điểm) cập nhật trực tuyến; an toàn khi gọi từ nhiều luồng"""
+
+    def __init__(self, capacity=256):
+        self.ids = []
+        self.index = {}
+        self.counts = np.zeros((capacity, len(LETTERS)))
+        # Tăng sau mỗi lần dữ liệu đổi: dùng làm một phần khóa cache kết quả
+        self.version = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store, major_code=None):
+        """Dựng từ số lượt từng điểm của từng môn, đếm sẵn trong SQLite"""
+        model = cls()
+        model.add(store.subject_grade_counts(major_code))
+        return model
+
+    def _rows(self, sub_ids):
+        """Chỉ số hàng của các môn, cấp hàng mới cho môn chưa gặp (gọi khi đang giữ khóa)"""
+        rows = []
+        for sub_id in sub_ids:
+            row = self.index.get(sub_id)
+            if row is None:
+                row = self.index[sub_id] = len(self.ids)
+                self.ids.append(sub_id)
+            rows.append(row)
+        if len(self.ids) > len(self.counts):
+            grown = np.zeros((max(len(self.ids), 2 * len(self.counts)), len(LETTERS)))
+            grown[:len(self.counts)] = self.counts
+            self.counts = grown
+        return rows
+
+    # =========================================================================
+    # CẬP NHẬT
+    # =========================================================================
+    def add(self, frame):
+        """
+        Cộng dồn cả bảng một lần: DataFrame (subject, grade[, n]), mỗi dòng là n lượt
+        (không có cột n: mỗi dòng một lượt, ví dụ lô grades của AdvisorStore.iter_cohort).
+        Điểm không phải điểm chữ ('Chưa học', lỗi nhập) bị bỏ qua.
+        """
+        cols = frame['grade'].map(COLUMN)
+        keep = cols.notna().to_numpy()
+        if not keep.any():
+            return 0
+        weights = frame['n'].to_numpy(dtype=float)[keep] if 'n' in frame else np.ones(int(keep.sum()))
+        codes, uniques = pd.factorize(frame['subject'].astype(str)[keep])
+        with self._lock:
+            rows = np.asarray(self._rows(uniques), dtype=np.intp)
+            np.add.at(self.counts, (rows[codes], cols[keep].to_numpy(dtype=np.intp)), weights)
+            self.version += 1
+        return int(weights.sum())
+
+    def observe(self, changes):
+        """
+        Cập nhật trực tuyến từ các dòng bảng điểm vừa đổi: iterable (môn, điểm cũ, điểm mới),
+        điểm cũ/mới là None khi thêm/xóa dòng. Chỉ chạm vài ô, không quét lại lịch sử.
+        """
+        with self._lock:
+            for sub_id, old, new in changes:
+                old_col, new_col = COLUMN.get(old), COLUMN.get(new)
+                if old_col == new_col:
+                    continue
+                row = self._rows([sub_id])[0]
+                if old_col is not None:
+                    self.counts[row, old_col] = max(0.0, self.counts[row, old_col] - 1)
+                if new_col is not None:
+                    self.counts[row, new_col] += 1
+                self.version += 1
+
+    # =========================================================================
+    # TRA CỨU (vector hóa theo danh sách môn)
+    # =========================================================================
+    def _counts_of(self, sub_ids):
+        counts = np.zeros((len(sub_ids), len(LETTERS)))
+        with self._lock:
+            rows = np.array([self.index.get(s, -1) for s in sub_ids], dtype=np.intp)
+            known = rows >= 0
+            counts[known] = self.counts[rows[known]]
+        return counts
+
+    def sample_sizes(self, sub_ids):
+        """Số lượt điểm đã ghi nhận của từng môn"""
+        return self._counts_of(list(sub_ids)).sum(axis=1)
+
+    def distribution(self, sub_ids, difficulty):
+        """Xác suất từng mức điểm (len(sub_ids), 8): lịch sử + tiên nghiệm theo độ khó"""
+        counts = self._counts_of(list(sub_ids))
+        prior = gpa_projection.grade_distribution(PRIOR_PERFORMANCE, np.asarray(difficulty, dtype=float))
+        merged = counts + PRIOR_WEIGHT * prior
+        return merged / merged.sum(axis=1, keepdims=True)
+
+    def expected_points(self, sub_ids, difficulty):
+        """Điểm hệ 4 kỳ vọng của từng môn"""
+        return self.distribution(sub_ids, difficulty) @ gpa_projection.GRADE_LEVELS
+
+    def effective_difficulty(self, sub_ids, difficulty):
+        """
+        Độ khó hiệu chỉnh theo lịch sử, cùng thang với gpa_projection.grade_distribution:
+        độ khó nhập tay cộng độ lệch giữa điểm tiên nghiệm và điểm kỳ vọng (môn chưa
+        có dữ liệu giữ nguyên độ khó nhập tay).
+        """
+        sub_ids = list(sub_ids)
+        difficulty = np.asarray(difficulty, dtype=float)
+        prior = gpa_projection.grade_distribution(PRIOR_PERFORMANCE, difficulty) @ gpa_projection.GRADE_LEVELS
+        expected = self.expected_points(sub_ids, difficulty)
+        return difficulty + (prior - expected) / gpa_projection.DIFFICULTY_SHIFT
@@ -0,0 +1,579 @@
+import numpy as np
+
+
+class _LazyMajorMap(dict):
+    """dict tự dựng giá trị cho ngành chưa có bằng hàm build"""
+
+    def __init__(self, build):
+        super().__init__()
+        self.build = build
+
+    def __missing__(self, code):
+        return self.build(code)
+
+
+class CurriculumGraph:
+    """
+    Đồ thị tiên quyết đã "biên dịch" sẵn cho toàn bộ chương trình.
+    Xây một lần khi nạp dữ liệu, các hàm gợi ý chỉ việc tra cứu.
+    """
+
+    # Dữ liệu gốc dùng 'prereq', ETL/engine cũ dùng 'prerequisites'
+    PREREQ_KEYS = ('prerequisites', 'prereq')
+
+    def __init__(self, subjects, majors):
+        # --- 1. CHUẨN HÓA DANH SÁCH TIÊN QUYẾT ---
+        self.prereqs = {
+            sub_id: self.normalize_prereqs(sub)
+            for sub_id, sub in subjects.items()
+        }
+
+        # --- 2. CHỈ SỐ NGUYÊN CHO TỪNG MÔN ---
+        # Môn được tham chiếu làm tiên quyết nhưng không có trong danh mục
+        # vẫn được cấp chỉ số để tra cứu không bị hụt.
+        self.ids = list(subjects.keys())
+        self.index = {sub_id: i for i, sub_id in enumerate(self.ids)}
+        for prereqs in self.prereqs.values():
+            for pr in prereqs:
+                self._ensure_index(pr)
+        self.n_known = len(subjects)
+
+        # Bảng thuộc tính dạng mảng (môn ngoài danh mục: 0 tín chỉ)
+        self.credits = np.zeros(len(self.ids), dtype=np.float64)
+        self.difficulty = np.full(len(self.ids), 3, dtype=np.int8)
+        for sub_id, sub in subjects.items():
+            self.credits[self.index[sub_id]] = sub['credits']
+            self.difficulty[self.index[sub_id]] = sub.get('difficulty', 3)
+
+        # Kỳ mở lớp trong năm (từ ETL 'semesters_offered'); rỗng = kỳ nào cũng mở
+        self.offered = {
+            sub_id: frozenset(sub.get('semesters_offered') or ())
+            for sub_id, sub in subjects.items()
+        }
+
+        self.prereq_idx = [
+            tuple(self.index[pr] for pr in self.prereqs.get(sub_id, ()))
+            for sub_id in self.ids
+        ]
+
+        # --- 3. DANH SÁCH KỀ NGƯỢC (môn -> các môn cần nó) ---
+        self.dependents = {sub_id: [] for sub_id in self.ids}
+        for sub_id, prereqs in self.prereqs.items():
+            for pr in prereqs:
+                self.dependents[pr].append(sub_id)
+
+        # --- 4. TRA CỨU HỌC KỲ THEO NGÀNH (dựng khi ngành được dùng lần đầu) ---
+        self.majors = majors
+        self._init_major_maps()
+
+        # --- 5. ĐƯỜNG GĂNG: thứ tự tô-pô + quy hoạch động ngược ---
+        self.dependents_idx = [[] for _ in self.ids]
+        for i, prereqs in enumerate(self.prereq_idx):
+            for j in prereqs:
+                self.dependents_idx[j].append(i)
+        self.topo_order = self._topological_order()
+        self.has_cycle = len(self.topo_order) < len(self.ids)
+
+        # descendant_count: số môn bị "khóa" phía sau (bắc cầu)
+        # chain_depth: số môn trên chuỗi tiên quyết dài nhất phía sau
+        self.descendant_count = np.zeros(len(self.ids), dtype=np.int64)
+        self.chain_depth = np.zeros(len(self.ids), dtype=np.int64)
+        self._fill_critical_path(self.topo_order)
+
+        # --- 6. MẶT NẠ BIT TIÊN QUYẾT (mỗi môn = 1 bit trên chỉ số) ---
+        self.n_words = (len(self.ids) + 63) // 64
+        self.prereq_bits = np.zeros((len(self.ids), self.n_words), dtype=np.uint64)
+        rows = np.repeat(np.arange(len(self.ids)), [len(p) for p in self.prereq_idx])
+        cols = np.fromiter((j for p in self.prereq_idx for j in p), dtype=np.int64, count=len(rows))
+        np.bitwise_or.at(self.prereq_bits, (rows, cols >> 6),
+                         np.left_shift(np.uint64(1), (cols & 63).astype(np.uint64)))
+
+        # --- 7. CHỈ MỤC "MÔN DỄ" CHO CẢ DANH MỤC (sắp ổn định, giữ thứ tự danh mục khi bằng nhau) ---
+        self.easy_order_all = self._easy_sorted(np.arange(self.n_known))
+
+    @classmethod
+    def from_arrays(cls, ids, n_known, credits, difficulty, prereq_ptr, prereq_cols, offered, majors, compiled):
+        """
+        Dựng lại từ mảng đã biên dịch (snapshot, xem data_loader.compile_snapshot), không
+        tính lại đường găng / bitset. ids gồm cả môn ngoài danh mục; tiên quyết dạng CSR
+        trên n_known môn đầu; offered: {mã môn: frozenset kỳ}; compiled: compiled_arrays().
+        """
+        g = object.__new__(cls)
+        g.ids = list(ids)
+        g.index = {sub_id: i for i, sub_id in enumerate(g.ids)}
+        g.n_known = n_known
+        n = len(g.ids)
+        ptr, cols = prereq_ptr.tolist(), prereq_cols.tolist()
+        g.prereq_idx = [tuple(cols[ptr[i]:ptr[i + 1]]) for i in range(n_known)] + [()] * (n - n_known)
+        g.prereqs = {g.ids[i]: tuple(g.ids[j] for j in g.prereq_idx[i]) for i in range(n_known)}
+        g.credits = np.zeros(n, dtype=np.float64)
+        g.credits[:n_known] = credits
+        g.difficulty = np.full(n, 3, dtype=np.int8)
+        g.difficulty[:n_known] = difficulty
+        g.offered = offered
+
+        g.dependents_idx = [[] for _ in range(n)]
+        for i, prereqs in enumerate(g.prereq_idx):
+            for j in prereqs:
+                g.dependents_idx[j].append(i)
+        g.dependents = {sub_id: [g.ids[i] for i in deps] for sub_id, deps in zip(g.ids, g.dependents_idx)}
+        g.majors = majors
+        g._init_major_maps()
+
+        g.topo_order = compiled['topo_order'].tolist()
+        g.has_cycle = len(g.topo_order) < n
+        g.descendant_count = np.array(compiled['descendant_count'], dtype=np.int64)
+        g.chain_depth = np.array(compiled['chain_depth'], dtype=np.int64)
+        g.n_words = (n + 63) // 64
+        # Chỉ đọc (mmap); updated() sao chép trước khi vá
+        g.prereq_bits = compiled['prereq_bits']
+        g.easy_order_all = np.array(compiled['easy_order_all'], dtype=np.int64)
+        return g
+
+    def compiled_arrays(self):
+        """Các mảng dẫn xuất tốn công tính, lưu vào snapshot để from_arrays dùng lại"""
+        return {
+            'topo_order': np.array(self.topo_order, dtype=np.int32),
+            'descendant_count': self.descendant_count,
+            'chain_depth': self.chain_depth,
+            'prereq_bits': self.prereq_bits,
+            'easy_order_all': self.easy_order_all,
+        }
+
+    def _init_major_maps(self):
+        self.roadmap_entries = _LazyMajorMap(lambda code: self._compile_major(code)[0])
+        self.semester_of = _LazyMajorMap(lambda code: self._compile_major(code)[1])
+        # roadmap_idx: chỉ số (tăng dần) các môn của ngành có trong danh mục
+        # easy_order: cùng các môn đó, sắp sẵn theo (độ khó, -tín chỉ)
+        self.roadmap_idx = _LazyMajorMap(lambda code: self._compile_major(code)[2])
+        self.easy_order = _LazyMajorMap(lambda code: self._compile_major(code)[3])
+
+    def _fill_critical_path(self, order):
+        """
+        Quy hoạch động ngược cho các môn trong order (thứ tự tô-pô, phải chứa
+        mọi con cháu của chúng); môn ngoài order giữ nguyên giá trị.
+        """
+        below = {}  # tập con cháu dạng bitset số nguyên
+        for i in reversed(order):
+            bits = 0
+            depth = 0
+            for c in self.dependents_idx[i]:
+                bits |= below.get(c, 0) | (1 << c)
+                depth = max(depth, self.chain_depth[c] + 1)
+            below[i] = bits
+            self.descendant_count[i] = bin(bits).count('1')
+            self.chain_depth[i] = depth
+
+    def _compile_major(self, code):
+        """
+        (danh sách (kỳ, mã môn) theo thứ tự lộ trình, mã môn -> kỳ đầu tiên,
+        chỉ số các môn trong danh mục, chỉ mục môn dễ)
+        """
+        entries = []
+        sem_lookup = {}
+        roadmap = self.majors[code]['roadmap']
+        for sem in sorted(int(k) for k in roadmap.keys()):
+            for sub_id in roadmap[str(sem)]:
+                entries.append((sem, sub_id))
+                sem_lookup.setdefault(sub_id, sem)
+        idx = np.unique(np.fromiter(
+            (self.index[s] for s in sem_lookup if self.index.get(s, self.n_known) < self.n_known),
+            dtype=np.int64))
+        easy = self._easy_sorted(idx)
+        self.roadmap_entries[code] = entries
+        self.semester_of[code] = sem_lookup
+        self.roadmap_idx[code] = idx
+        self.easy_order[code] = easy
+        return entries, sem_lookup, idx, easy
+
+    def _easy_sorted(self, idx):
+        """Sắp chỉ số môn theo độ khó tăng dần, tín chỉ giảm dần"""
+        return idx[np.lexsort((-self.credits[idx], self.difficulty[idx]))]
+
+    def forget_major(self, code):
+        """Bỏ tra cứu của một ngành (khi registry giải phóng ngành đó)"""
+        for lookup in (self.roadmap_entries, self.semester_of, self.roadmap_idx, self.easy_order):
+            lookup.pop(code, None)
+
+    @classmethod
+    def normalize_prereqs(cls, subject):
+        """Lấy danh sách tiên quyết bất kể tên khóa, bỏ trùng lặp"""
+        for key in cls.PREREQ_KEYS:
+            if subject.get(key):
+                return tuple(dict.fromkeys(subject[key]))
+        return ()
+
+    def _ensure_index(self, sub_id):
+        if sub_id not in self.index:
+            self.index[sub_id] = len(self.ids)
+            self.ids.append(sub_id)
+
+    def _topological_order(self):
+        """Thuật toán Kahn; môn nằm trong chu trình sẽ không xuất hiện"""
+        indegree = [len(p) for p in self.prereq_idx]
+        queue = [i for i, d in enumerate(indegree) if d == 0]
+        order = []
+        while queue:
+            i = queue.pop()
+            order.append(i)
+            for c in self.dependents_idx[i]:
+                indegree[c] -= 1
+                if indegree[c] == 0:
+                    queue.append(c)
+        return order
+
+    def unlock_count(self, sub_id):
+        """Số môn nhận môn này làm tiên quyết trực tiếp"""
+        return len(self.dependents.get(sub_id, ()))
+
+    def critical_path(self, sub_id):
+        """(số môn mở khóa bắc cầu, độ dài chuỗi tiên quyết dài nhất phía sau)"""
+        i = self.index.get(sub_id)
+        if i is None:
+            return 0, 0
+        return int(self.descendant_count[i]), int(self.chain_depth[i])
+
+    def remaining_chain(self, open_subjects):
+        """Chuỗi tiên quyết dài nhất (tính bằng số môn) chỉ trong tập môn còn phải học"""
+        todo = np.zeros(len(self.ids), dtype=bool)
+        todo[[self.index[s] for s in open_subjects if s in self.index]] = True
+        depth = [0] * len(self.ids)
+        for i in reversed(self.topo_order):
+            if todo[i]:
+                depth[i] = 1 + max((depth[c] for c in self.dependents_idx[i]), default=0)
+        return max(depth, default=0)
+
+    def is_eligible(self, sub_id, passed_subjects):
+        """Đã qua hết các môn tiên quyết hay chưa"""
+        return all(pr in passed_subjects for pr in self.prereqs.get(sub_id, ()))
+
+    # =========================================================================
+    # BITSET: mã hóa bảng điểm thành mặt nạ bit cố định độ rộng
+    # =========================================================================
+    def encode(self, sub_ids):
+        """Chuyển tập mã môn thành mảng uint64 (bit i = môn có chỉ số i)"""
+        idx = [self.index[s] for s in sub_ids if s in self.index]
+        bools = np.zeros(self.n_words * 64, dtype=bool)
+        bools[idx] = True
+        return np.packbits(bools, bitorder='little').view('<u8')
+
+    def decode(self, bits):
+        """Mặt nạ bit -> mảng bool theo chỉ số môn"""
+        bits = np.ascontiguousarray(bits, dtype='<u8')
+        unpacked = np.unpackbits(bits.view(np.uint8), axis=-1, bitorder='little')
+        return unpacked[..., :len(self.ids)].astype(bool)
+
+    def eligible_mask(self, passed_bits, rows=None):
+        """
+        Môn nào đã đủ tiên quyết: một phép AND/so sánh cho toàn bộ danh mục.
+        passed_bits có thể là 1 bảng điểm (W,) hoặc nhiều bảng điểm (S, W).
+        rows: chỉ xét các môn có chỉ số này (không dựng mảng (N, W) cho cả danh mục).
+        """
+        passed_bits = np.asarray(passed_bits, dtype=np.uint64)
+        prereq_bits = self.prereq_bits if rows is None else self.prereq_bits[rows]
+        missing = prereq_bits & ~passed_bits[..., None, :]
+        return ~missing.any(axis=-1)
+
+
+    # =========================================================================
+    # CẬP NHẬT GIA TĂNG (nạp lại nóng, xem hot_reload.py)
+    # =========================================================================
+    def updated(self, subjects, majors, changed):
+        """
+        Đồ thị cho phiên bản dữ liệu mới, chỉ dựng lại phần bị ảnh hưởng bởi các
+        môn trong changed (mã môn có dữ liệu khác bản cũ). Đồ thị hiện tại không bị
+        sửa nên các phiên đang chạy vẫn dùng tiếp được. Thêm/bớt môn (đổi chỉ số)
+        thì dựng lại toàn bộ.
+        """
+        new_prereqs = {s: self.normalize_prereqs(subjects[s]) for s in changed}
+        same_index = (self.n_known == len(self.ids) and len(subjects) == self.n_known
+                      and all(a == b for a, b in zip(subjects, self.ids))
+                      and all(pr in subjects for p in new_prereqs.values() for pr in p))
+        if not same_index:
+            return CurriculumGraph(subjects, majors)
+
+        # Dùng chung mọi thứ không đổi, sao chép rồi vá phần đổi
+        g = object.__new__(CurriculumGraph)
+        g.__dict__.update(self.__dict__)
+        g.prereqs = {**self.prereqs, **new_prereqs}
+        g.credits = self.credits.copy()
+        g.difficulty = self.difficulty.copy()
+        g.offered = dict(self.offered)
+        g.prereq_idx = list(self.prereq_idx)
+        index = self.index
+        for sub_id in changed:
+            i = index[sub_id]
+            g.credits[i] = subjects[sub_id]['credits']
+            g.difficulty[i] = subjects[sub_id].get('difficulty', 3)
+            g.offered[sub_id] = frozenset(subjects[sub_id].get('semesters_offered') or ())
+            g.prereq_idx[i] = tuple(index[pr] for pr in new_prereqs[sub_id])
+        rescored = [s for s in changed
+                    if (g.credits[index[s]], g.difficulty[index[s]]) !=
+                    (self.credits[index[s]], self.difficulty[index[s]])]
+        if rescored:
+            g.easy_order_all = g._easy_sorted(np.arange(g.n_known))
+
+        # --- 1. CHỈ VÁ DANH SÁCH KỀ NGƯỢC CỦA CÁC MÔN CÓ CẠNH ĐỔI ---
+        rewired = [s for s in changed if new_prereqs[s] != self.prereqs[s]]
+        g.dependents = dict(self.dependents)
+        g.dependents_idx = list(self.dependents_idx)
+        g.prereq_bits = self.prereq_bits
+        if rewired:
+            touched = {pr for s in rewired for pr in self.prereqs[s] + new_prereqs[s]}
+            for pr in touched:
+                deps = {d for d in self.dependents[pr] if d not in rewired}
+                deps.update(s for s in rewired if pr in new_prereqs[s])
+                g.dependents[pr] = sorted(deps, key=index.__getitem__)
+                g.dependents_idx[index[pr]] = [index[d] for d in g.dependents[pr]]
+            g.prereq_bits = self.prereq_bits.copy()
+            for sub_id in rewired:
+                i = index[sub_id]
+                g.prereq_bits[i] = 0
+                for j in g.prereq_idx[i]:
+                    g.prereq_bits[i, j >> 6] |= np.uint64(1) << np.uint64(j & 63)
+
+            # --- 2. ĐƯỜNG GĂNG: chỉ tính lại tổ tiên (cũ và mới) của môn đổi cạnh và con cháu của chúng ---
+            g.topo_order = g._topological_order()
+            g.has_cycle = len(g.topo_order) < len(g.ids)
+            start = [index[s] for s in rewired]
+            affected = self._reach(start, self.prereq_idx) | g._reach(start, g.prereq_idx)
+            region = g._reach(affected, g.dependents_idx)
+            g.descendant_count = self.descendant_count.copy()
+            g.chain_depth = self.chain_depth.copy()
+            rows = np.fromiter(region, dtype=np.int64, count=len(region))
+            g.descendant_count[rows] = 0
+            g.chain_depth[rows] = 0
+            g._fill_critical_path([i for i in g.topo_order if i in region])
+
+        # --- 3. TRA CỨU THEO NGÀNH: giữ ngành đã dựng nếu lộ trình và các môn của nó không đổi ---
+        g.majors = majors
+        g._init_major_maps()
+        rescored_idx = np.array(sorted(index[s] for s in rescored), dtype=np.int64)
+        for code in list(self.semester_of):
+            if code not in majors or majors[code]['roadmap'] != self.majors[code]['roadmap']:
+                continue
+            idx = self.roadmap_idx[code]
+            g.roadmap_entries[code] = self.roadmap_entries[code]
+            g.semester_of[code] = self.semester_of[code]
+            g.roadmap_idx[code] = idx
+            touched = np.intersect1d(idx, rescored_idx, assume_unique=True).size
+            g.easy_order[code] = g._easy_sorted(idx) if touched else self.easy_order[code]
+        return g
+
+    @staticmethod
+    def _reach(start, edges):
+        """Tập chỉ số đi tới được từ start theo danh sách kề edges (kể cả start)"""
+        seen = set(start)
+        stack = list(seen)
+        while stack:
+            for j in edges[stack.pop()]:
+                if j not in seen:
+                    seen.add(j)
+                    stack.append(j)
+        return seen
+
+class GraduationPlanner:
+    """
+    Xếp lộ trình từng kỳ tới khi tốt nghiệp cho một ngành.
+
+    Tôn trọng tiên quyết, môn song hành, trần tín chỉ mỗi kỳ và kỳ mở lớp. Dùng nhánh cận
+    (branch-and-bound) có ghi nhớ trạng thái, khởi đầu từ lời giải tham lam
+    theo đường găng; hết ngân sách nút thì trả về lời giải tốt nhất đã có.
+    """
+
+    # Số giỏ môn tối đa thử ở mỗi kỳ và tổng số nút được duyệt
+    BRANCH_LIMIT = 6
+    NODE_BUDGET = 5000
+
+    def __init__(self, graph, major_code, credit_cap=20, terms_per_year=2, coreqs=None):
+        self.graph = graph
+        self.major_code = major_code
+        self.credit_cap = credit_cap
+        self.terms_per_year = terms_per_year
+        # {môn: các môn phải học cùng kỳ hoặc đã qua}, xem CompiledRules.coreqs
+        self.coreqs = coreqs or {}
+
+    def term_of(self, semester):
+        """Kỳ thứ mấy trong năm học (1..terms_per_year)"""
+        return (semester - 1) % self.terms_per_year + 1
+
+    def plan(self, passed_subjects, current_sem):
+        """
+        passed_subjects: các môn đã qua. current_sem: số kỳ đã học xong.
+        Trả về dict: semesters (list các kỳ), unschedulable (kể cả môn không xếp
+        được vì xung đột kỳ mở lớp / song hành), search_complete (False nếu dừng
+        vì hết ngân sách nút, lời giải có thể chưa tối ưu).
+        """
+        graph = self.graph
+        passed = set(passed_subjects)
+        roadmap = [sub_id for sub_id in dict.fromkeys(
+            sub_id for _, sub_id in graph.roadmap_entries[self.major_code])
+            if sub_id not in passed]
+
+        # --- 1. LOẠI MÔN KHÔNG THỂ XẾP (thiếu dữ liệu, tiên quyết ngoài lộ trình, chu trình) ---
+        schedulable = {}
+        pending = list(roadmap)
+        progress = True
+        while pending and progress:
+            progress = False
+            for sub_id in list(pending):
+                if sub_id not in graph.prereqs:
+                    continue
+                prereqs = graph.prereqs[sub_id]
+                if all(pr in passed or pr in schedulable for pr in prereqs):
+                    schedulable[sub_id] = True
+                    pending.remove(sub_id)
+                    progress = True
+        # Môn song hành không có trong lộ trình còn lại kéo theo môn đó (và các môn phía sau)
+        dropped = True
+        while dropped:
+            dropped = [s for s in schedulable
+                       if any(c not in passed and c not in schedulable for c in self.coreqs.get(s, ()))
+                       or any(pr not in passed and pr not in schedulable for pr in graph.prereqs[s])]
+            for sub_id in dropped:
+                del schedulable[sub_id]
+        items = list(schedulable)
+        unschedulable = [s for s in roadmap if s not in schedulable]
+
+        # --- 2. MÃ HÓA CỤC BỘ: mỗi môn còn lại = 1 bit trong số nguyên Python ---
+        local = {sub_id: k for k, sub_id in enumerate(items)}
+        self._items = items
+        self._credits = [int(graph.credits[graph.index[s]]) for s in items]
+        self._need = [sum(1 << local[pr] for pr in graph.prereqs[s] if pr in local) for s in items]
+        self._with = [sum(1 << local[c] for c in self.coreqs.get(s, ()) if c in local) for s in items]
+        self._terms = [self._valid_terms(graph.offered.get(s, ())) for s in items]
+
+        # Chiều cao đường găng phía dưới mỗi môn (kể cả chính nó)
+        children = {k: [] for k in range(len(items))}
+        for k, need in enumerate(self._need):
+            for j in range(len(items)):
+                if need >> j & 1:
+                    children[j].append(k)
+        height = [0] * len(items)
+        for k in reversed(range(len(items))):
+            height[k] = 1 + max((height[c] for c in children[k]), default=0)
+        self._height = height
+        roadmap_sem = graph.semester_of[self.major_code]
+        self._order = sorted(range(len(items)), key=lambda k: (
+            -height[k], -len(children[k]), roadmap_sem.get(items[k], 0), k))
+
+        full = (1 << len(items)) - 1
+        greedy, left = self._greedy(full, current_sem + 1)
+        # Tham lam bị kẹt (xung đột kỳ mở lớp / song hành): chưa có cận trên cho nhánh cận
+        self._best = greedy if not left else None
+        self._seen = {}
+        self._nodes = 0
+        self._search(full, current_sem + 1, [])
+        best = self._best
+        if best is None:
+            # Không lời giải nào xếp hết: giữ phần tham lam xếp được, phần còn lại báo không xếp được
+            best = greedy
+            unschedulable += [items[k] for k in range(len(items)) if left >> k & 1]
+            while best and not best[-1]:
+                best.pop()
+
+        semesters = []
+        for offset, basket in enumerate(best):
+            ids = [items[k] for k in basket]
+            semesters.append({
+                'semester': current_sem + 1 + offset,
+                'subjects': ids,
+                'credits': sum(self._credits[k] for k in basket),
+            })
+        return {
+            'semesters': semesters,
+            'unschedulable': unschedulable,
+            'search_complete': self._nodes < self.NODE_BUDGET,
+        }
+
+    def _valid_terms(self, offered):
+        terms = frozenset(t for t in offered if 1 <= t <= self.terms_per_year)
+        # Dữ liệu kỳ mở lớp không khớp số kỳ/năm: coi như kỳ nào cũng mở
+        return terms or None
+
+    def _available(self, remaining, semester):
+        """Các môn đủ tiên quyết và mở lớp trong kỳ này, theo thứ tự ưu tiên"""
+        term = self.term_of(semester)
+        done = ~remaining
+        return [k for k in self._order
+                if remaining >> k & 1
+                and self._need[k] & done == self._need[k]
+                and (self._terms[k] is None or term in self._terms[k])]
+
+    def _baskets(self, available, remaining):
+        """Sinh các giỏ môn tối đại (không thêm được môn nào) dưới trần tín chỉ, đủ môn song hành"""
+        cap = self.credit_cap
+        credits = self._credits
+        need_with = self._with
+        done = ~remaining
+        found = []
+        steps = [0]
+
+        def walk(i, chosen, total):
+            # Giới hạn số bước để kỳ có rất nhiều môn không nổ tổ hợp
+            steps[0] += 1
+            if len(found) >= self.BRANCH_LIMIT or steps[0] > self.BRANCH_LIMIT * 64:
+                return
+            if i == len(available):
+                have = done | sum(1 << k for k in chosen)
+                if any(need_with[k] & have != need_with[k] for k in chosen):
+                    return
+                # Chỉ nhận giỏ tối đại: mọi môn bị bỏ qua đều không còn vừa (hoặc thiếu song hành)
+                if all(k in chosen or total + credits[k] > cap or need_with[k] & have != need_with[k]
+                       for k in available):
+                    found.append(list(chosen))
+                return
+            k = available[i]
+            if total + credits[k] <= cap or not chosen:
+                chosen.append(k)
+                walk(i + 1, chosen, total + credits[k])
+                chosen.pop()
+            walk(i + 1, chosen, total)
+
+        walk(0, [], 0)
+        return [b for b in found if b]
+
+    def _lower_bound(self, remaining):
+        total = sum(self._credits[k] for k in range(len(self._items)) if remaining >> k & 1)
+        by_credits = -(-total // self.credit_cap)
+        by_chain = max((self._height[k] for k in range(len(self._items)) if remaining >> k & 1), default=0)
+        return max(by_credits, by_chain)
+
+    def _greedy(self, remaining, semester):
+        """Lời giải tham lam; trả về (các kỳ, bitmask các môn chưa xếp được)"""
+        plan = []
+        idle = 0
+        while remaining and idle < self.terms_per_year:
+            baskets = self._baskets(self._available(remaining, semester), remaining)
+            basket = baskets[0] if baskets else []
+            plan.append(basket)
+            idle = 0 if basket else idle + 1
+            for k in basket:
+                remaining &= ~(1 << k)
+            semester += 1
+        return plan, remaining
+
+    def _search(self, remaining, semester, path):
+        if not remaining:
+            if self._best is None or len(path) < len(self._best):
+                self._best = [list(b) for b in path]
+            return
+        self._nodes += 1
+        if self._nodes >= self.NODE_BUDGET:
+            return
+        if self._best is not None and len(path) + self._lower_bound(remaining) >= len(self._best):
+            return
+        # Ghi nhớ: cùng tập môn còn lại + cùng kỳ trong năm mà đến muộn hơn thì bỏ
+        key = (remaining, self.term_of(semester))
+        if self._seen.get(key, float('inf')) <= len(path):
+            return
+        self._seen[key] = len(path)
+
+        baskets = self._baskets(self._available(remaining, semester), remaining) or [[]]
+        for basket in baskets:
+            mask = remaining
+            for k in basket:
+                mask &= ~(1 << k)
+            path.append(basket)
+            self._search(mask, semester + 1, path)
+            path.pop()
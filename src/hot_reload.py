@@ -0,0 +1,162 @@
+"""
+Nạp lại nóng chương trình đào tạo: sửa data/curriculum.json (hoặc xuất lại
+knowledge_base/) là phiên Streamlit đang chạy dùng dữ liệu mới, không cần
+khởi động lại container.
+
+CurriculumReloader theo dõi chữ ký file (mtime, kích thước). Khi đổi: đọc dữ
+liệu mới, so từng môn với bản đang chạy, dựng lại chỉ phần chỉ mục bị ảnh hưởng
+(CurriculumGraph.updated), kiểm tra hợp lệ (chu trình, mã tiên quyết không tồn
+tại) rồi đổi engine trong CachedAdvisor bằng một phép gán. Phiên đang giữa
+chừng vẫn chạy hết trên bản cũ; dữ liệu lỗi thì bị từ chối, bản cũ giữ nguyên.
+"""
+import os
+import threading
+import time
+
+from data_loader import load_curriculum, source_files
+from decision_engine import AcademicAdvisor
+
+
+def source_signature(path, rules=None):
+    """
+    Chữ ký rẻ (không đọc nội dung) của đúng các file rebuild đọc: [(đường dẫn, mtime_ns, cỡ)].
+    path là curriculum.json hoặc knowledge_base/ (chỉ các file nguồn, không tính
+    snapshot hay .etl_state.json); rules là file luật nếu luật được nạp từ file.
+    """
+    if os.path.isdir(path):
+        files = [os.path.join(path, rel) for rel in source_files(path)]
+    else:
+        files = [path]
+    if isinstance(rules, (str, os.PathLike)):
+        files.append(os.fspath(rules))
+    signature = []
+    for name in files:
+        st = os.stat(name)
+        signature.append((name, st.st_mtime_ns, st.st_size))
+    return signature
+
+
+def changed_subjects(old, new):
+    """Mã các môn có dữ liệu khác nhau (kể cả môn thêm mới hoặc bị xóa)"""
+    return {s for s in old.keys() | new.keys() if old.get(s) != new.get(s)}
+
+
+def validate(graph, previous=None):
+    """
+    Lỗi dữ liệu của đồ thị mới: chu trình tiên quyết, mã tiên quyết không có
+    trong danh mục. Có previous thì chỉ báo lỗi mới phát sinh so với bản đó.
+    """
+    def problems(g):
+        in_order = set(g.topo_order)
+        cycle = {g.ids[i] for i in range(len(g.ids)) if i not in in_order}
+        return cycle, set(g.ids[g.n_known:])
+
+    cycle, dangling = problems(graph)
+    if previous is not None:
+        old_cycle, old_dangling = problems(previous)
+        cycle -= old_cycle
+        dangling -= old_dangling
+    errors = []
+    if cycle:
+        errors.append(f"Chu trình tiên quyết: {', '.join(sorted(cycle))}")
+    if dangling:
+        users = sorted(s for s, prereqs in graph.prereqs.items() if dangling & set(prereqs))
+        errors.append(f"Tiên quyết không tồn tại: {', '.join(sorted(dangling))} (trong {', '.join(users)})")
+    return errors
+
+
+def rebuild(advisor, data):
+    """
+    Engine mới từ data, dùng lại chỉ mục của advisor cho phần không đổi.
+    Trả về (engine mới hoặc None nếu dữ liệu lỗi, báo cáo).
+    """
+    start = time.perf_counter()
+    changed = changed_subjects(advisor.subjects, data['subjects'])
+    graph = advisor.graph.updated(data['subjects'], data['majors'], changed)
+    report = {
+        'changed_subjects': sorted(changed),
+        'incremental': graph.ids is advisor.graph.ids,
+        'errors': validate(graph, advisor.graph),
+    }
+    engine = None
+    if not report['errors']:
+        options = advisor._options
+        engine = AcademicAdvisor(advisor.data_path, options['eligibility_mode'], options['major_budget_bytes'],
+                                 options['rules'], data=data, graph=graph)
+    report['seconds'] = time.perf_counter() - start
+    return engine, report
+
+
+class CurriculumReloader:
+    """Theo dõi file dữ liệu của một CachedAdvisor và đổi engine khi dữ liệu đổi"""
+
+    def __init__(self, cached, interval=5.0):
+        self.cached = cached
+        self.interval = interval
+        self.path = cached.advisor.data_path
+        self.rules = cached.advisor._options['rules']
+        self.signature = source_signature(self.path, self.rules)
+        self.reloads = 0
+        self.rejected = 0
+        self.last_report = None
+        self.last_error = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def on_swap(self, callback):
+        """Đăng ký hàm callback(engine) gọi sau khi engine mới được đưa vào dùng"""
+        self._listeners.append(callback)
+
+    def check(self):
+        """Kiểm tra một lần; dữ liệu đổi thì nạp lại. Trả về báo cáo, hoặc None nếu không đổi"""
+        with self._lock:
+            try:
+                signature = source_signature(self.path, self.rules)
+            except OSError:
+                return None  # file đang được thay, lần sau xem lại
+            if signature == self.signature:
+                return None
+            old = self.cached.advisor
+            try:
+                data = load_curriculum(self.path, old._options['major_budget_bytes'])
+                engine, report = rebuild(old, data)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # File ghi dở hoặc sai cấu trúc: giữ bản cũ, thử lại khi file đổi tiếp
+                self.last_error = f"{type(e).__name__}: {e}"
+                self.rejected += 1
+                self.signature = signature
+                return {'errors': [self.last_error]}
+            self.signature = signature
+            self.last_report = report
+            if engine is None:
+                self.last_error = "; ".join(report['errors'])
+                self.rejected += 1
+                return report
+            # Lộ trình ngành có thể đổi mà không môn nào đổi: luôn đổi engine
+            for callback in self._listeners:
+                callback(engine)
+            self.cached.swap(engine)
+            self.reloads += 1
+            self.last_error = None
+            return report
+
+    def start(self):
+        """Chạy check() định kỳ trên luồng nền (daemon)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='curriculum-reloader', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+    def status(self):
+        """Số liệu cho bảng debug/Prometheus"""
+        return {
+            'reloads': self.reloads,
+            'rejected': self.rejected,
+            'last_seconds': self.last_report['seconds'] if self.last_report else 0.0,
+        }
@@ -0,0 +1,155 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+# Context rỗng dùng chung: section() khi tắt không cấp phát gì
+_NULL_CONTEXT = nullcontext()
+
+
+class Profiler:
+    """
+    Đo thời gian theo tên (hàm engine, khối UI), đếm số lần gọi và bộ đếm tùy ý,
+    cộng dồn theo phiên. Bật bằng biến môi trường ADVISOR_PROFILE=1; khi tắt,
+    timed()/instrument() trả nguyên hàm gốc và section() là context rỗng.
+    """
+
+    # Số phiên giữ lại để xem phiên nào tốn kém nhất
+    MAX_SESSIONS = 500
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.timings = {}
+            self.counters = {}
+            self.sessions = OrderedDict()
+            self._gauges = getattr(self, '_gauges', {})
+
+    # =========================================================================
+    # GHI NHẬN
+    # =========================================================================
+    def record(self, name, seconds):
+        session = getattr(self._local, 'session', None)
+        with self._lock:
+            stat = self.timings.get(name)
+            if stat is None:
+                stat = self.timings[name] = {'calls': 0, 'total_s': 0.0, 'max_s': 0.0}
+            stat['calls'] += 1
+            stat['total_s'] += seconds
+            stat['max_s'] = max(stat['max_s'], seconds)
+            if session is not None and getattr(self._local, 'depth', 0) == 0:
+                self.sessions[session] = self.sessions.get(session, 0.0) + seconds
+                self.sessions.move_to_end(session)
+                while len(self.sessions) > self.MAX_SESSIONS:
+                    self.sessions.popitem(last=False)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_gauge_source(self, name, fn):
+        """fn() -> dict số liệu (vd. CachedAdvisor.stats), đọc lúc xuất báo cáo"""
+        self._gauges[name] = fn
+
+    def bind_session(self, session_id):
+        """Gắn luồng hiện tại với một phiên để cộng dồn thời gian theo phiên"""
+        if self.enabled:
+            self._local.session = session_id
+
+    @contextmanager
+    def _timing(self, name):
+        # Chỉ khối ngoài cùng được cộng vào tổng thời gian của phiên
+        self._local.depth = getattr(self._local, 'depth', 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.depth -= 1
+            self.record(name, time.perf_counter() - start)
+
+    def section(self, name):
+        """with PROFILER.section('ui.tab1'): ..."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timing(name)
+
+    def timed(self, name):
+        """Decorator đo một hàm; khi tắt trả nguyên hàm gốc (không bọc)"""
+        def decorate(fn):
+            if not self.enabled:
+                return fn
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self._timing(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def instrument(self, obj, prefix, methods=None):
+        """Bọc các method public của một instance bằng timed(); khi tắt không làm gì"""
+        if not self.enabled:
+            return obj
+        names = methods or [n for n in dir(type(obj))
+                            if not n.startswith('_') and callable(getattr(type(obj), n, None))]
+        for name in names:
+            setattr(obj, name, self.timed(f'{prefix}.{name}')(getattr(obj, name)))
+        return obj
+
+    # =========================================================================
+    # XUẤT BÁO CÁO
+    # =========================================================================
+    def snapshot(self, top_sessions=20):
+        with self._lock:
+            timings = {k: dict(v) for k, v in self.timings.items()}
+            counters = dict(self.counters)
+            sessions = sorted(self.sessions.items(), key=lambda kv: -kv[1])[:top_sessions]
+        gauges = {name: fn() for name, fn in self._gauges.items()}
+        return {
+            'enabled': self.enabled,
+            'timings': timings,
+            'counters': counters,
+            'gauges': gauges,
+            'top_sessions': [{'session': s, 'total_s': t} for s, t in sessions],
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Định dạng text của Prometheus"""
+        snap = self.snapshot()
+        timings = [(_label(n), s) for n, s in snap['timings'].items()]
+        lines = [
+            '# TYPE advisor_calls_total counter',
+            *(f'advisor_calls_total{{name="{n}"}} {s["calls"]}' for n, s in timings),
+            '# TYPE advisor_seconds_total counter',
+            *(f'advisor_seconds_total{{name="{n}"}} {s["total_s"]:.6f}' for n, s in timings),
+            '# TYPE advisor_seconds_max gauge',
+            *(f'advisor_seconds_max{{name="{n}"}} {s["max_s"]:.6f}' for n, s in timings),
+            '# TYPE advisor_events_total counter',
+            *(f'advisor_events_total{{name="{_label(n)}"}} {v}' for n, v in snap['counters'].items()),
+            '# TYPE advisor_gauge gauge',
+        ]
+        for source, values in snap['gauges'].items():
+            for key, value in values.items():
+                lines.append(f'advisor_gauge{{source="{_label(source)}",name="{_label(key)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    """Giá trị nhãn Prometheus: thoát \\, " và xuống dòng theo đặc tả định dạng text"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+PROFILER = Profiler(enabled=os.environ.get('ADVISOR_PROFILE') == '1')
@@ -0,0 +1,216 @@
+"""
+Đồ thị tiên quyết theo lộ trình từng ngành (vis-network trong lib/vis-9.1.2).
+
+Vị trí các nút tính một lần cho mỗi phiên bản chương trình (xếp lớp theo học
+kỳ, trong lớp sắp theo trọng tâm các môn tiên quyết) và lưu xuống đĩa. Trạng
+thái của từng sinh viên (đã qua, rớt, đủ điều kiện, trong giỏ) chỉ là lớp màu
+phủ lên layout có sẵn; trình duyệt vẽ với physics tắt nên không phải mô phỏng
+lại mỗi lần Streamlit chạy lại.
+"""
+import functools
+import hashlib
+import json
+import os
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VIS_DIR = os.path.join(ROOT_DIR, 'lib', 'vis-9.1.2')
+
+# Tăng khi đổi thuật toán xếp layout để cache cũ tự bị bỏ qua
+LAYOUT_VERSION = 1
+
+# Khoảng cách giữa các cột (học kỳ) và giữa các nút trong một cột (pixel)
+X_GAP = 220
+Y_GAP = 70
+# Số lượt quét trọng tâm để giảm cạnh cắt nhau
+SWEEPS = 4
+
+STATUS_STYLES = {
+    'passed':   {'background': '#238636', 'border': '#2ea043'},
+    'failed':   {'background': '#f85149', 'border': '#ff7b72'},
+    'planned':  {'background': '#d29922', 'border': '#e3b341'},
+    'eligible': {'background': '#1f6feb', 'border': '#58a6ff'},
+    'locked':   {'background': '#21262d', 'border': '#30363d'},
+}
+STATUS_LABELS = {
+    'passed': 'Đã qua', 'failed': 'Rớt', 'planned': 'Trong giỏ',
+    'eligible': 'Đủ điều kiện', 'locked': 'Chưa đủ tiên quyết',
+}
+
+
+def curriculum_version(graph, subjects, major_code):
+    """Hash những gì quyết định layout: lộ trình, tên/tín chỉ và tiên quyết của các môn trong đó"""
+    entries = graph.roadmap_entries[major_code]
+    ids = sorted({sub_id for _, sub_id in entries})
+    payload = {
+        'layout': LAYOUT_VERSION,
+        'roadmap': [[sem, sub_id] for sem, sub_id in entries],
+        'subjects': {
+            sub_id: [subjects.get(sub_id, {}).get('name', sub_id),
+                     subjects.get(sub_id, {}).get('credits', 0),
+                     list(graph.prereqs.get(sub_id, ()))]
+            for sub_id in ids
+        },
+    }
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()
+
+
+def compute_layout(graph, subjects, major_code):
+    """
+    Layout phân lớp: cột = học kỳ đầu tiên của môn trong lộ trình, thứ tự trong
+    cột theo trọng tâm (barycenter) các môn nối với nó ở cột bên cạnh.
+    Chỉ vẽ cạnh giữa các môn cùng lộ trình.
+    Trả về {'nodes': [{id, label, title, x, y, level}], 'edges': [[từ, tới], ...]}.
+    """
+    semester_of = graph.semester_of[major_code]
+    layers = {}
+    for sub_id, sem in semester_of.items():
+        layers.setdefault(sem, []).append(sub_id)
+    edges = [[pr, sub_id] for sub_id in semester_of
+             for pr in graph.prereqs.get(sub_id, ()) if pr in semester_of]
+    parents = {sub_id: [] for sub_id in semester_of}
+    children = {sub_id: [] for sub_id in semester_of}
+    for pr, sub_id in edges:
+        parents[sub_id].append(pr)
+        children[pr].append(sub_id)
+
+    # --- 1. SẮP THỨ TỰ TRONG TỪNG CỘT (quét xuôi theo tiên quyết, ngược theo môn phía sau) ---
+    order = sorted(layers)
+    rank = {sub_id: k for sem in order for k, sub_id in enumerate(layers[sem])}
+
+    def reorder(sem, neighbours):
+        def key(sub_id):
+            near = [rank[n] for n in neighbours[sub_id]]
+            # Không có láng giềng: giữ nguyên vị trí hiện tại
+            return (sum(near) / len(near) if near else rank[sub_id], rank[sub_id])
+        layers[sem].sort(key=key)
+        for k, sub_id in enumerate(layers[sem]):
+            rank[sub_id] = k
+
+    for _ in range(SWEEPS):
+        for sem in order[1:]:
+            reorder(sem, parents)
+        for sem in reversed(order[:-1]):
+            reorder(sem, children)
+
+    # --- 2. TỌA ĐỘ: cột theo kỳ, mỗi cột căn giữa theo chiều dọc ---
+    nodes = []
+    for col, sem in enumerate(order):
+        offset = (len(layers[sem]) - 1) / 2
+        for k, sub_id in enumerate(layers[sem]):
+            sub = subjects.get(sub_id, {})
+            nodes.append({
+                'id': sub_id,
+                'label': sub_id,
+                'title': f"{sub.get('name', sub_id)} · {sub.get('credits', 0)} TC · Kỳ {sem}",
+                'x': col * X_GAP,
+                'y': round((k - offset) * Y_GAP),
+                'level': sem,
+            })
+    return {'nodes': nodes, 'edges': edges}
+
+
+class LayoutCache:
+    """Layout theo (ngành, phiên bản chương trình): giữ trong bộ nhớ và lưu JSON xuống đĩa"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._memory = {}
+        self.computed = 0
+
+    def _path(self, major_code, version):
+        return os.path.join(self.cache_dir, f'{major_code}-{version[:16]}.json')
+
+    def get(self, graph, subjects, major_code):
+        version = curriculum_version(graph, subjects, major_code)
+        key = (major_code, version)
+        if key in self._memory:
+            return self._memory[key]
+        path = self._path(major_code, version)
+        layout = None
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    layout = json.load(f)
+            except (OSError, ValueError):
+                layout = None
+        if layout is None:
+            layout = compute_layout(graph, subjects, major_code)
+            self.computed += 1
+            self._write(path, layout)
+        self._memory[key] = layout
+        return layout
+
+    def _write(self, path, layout):
+        # Ghi file tạm rồi os.replace: phiên khác không bao giờ đọc phải file ghi dở
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix='.layout-', suffix='.json', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(layout, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def student_overlay(graph, transcript, planned_courses, layout, not_passed=('F', 'Chưa học')):
+    """Trạng thái từng nút cho một sinh viên: {mã môn: passed|failed|planned|eligible|locked}"""
+    passed = {s for s, g in transcript.items() if g not in not_passed}
+    planned = set(planned_courses)
+    overlay = {}
+    for node in layout['nodes']:
+        sub_id = node['id']
+        if sub_id in passed:
+            status = 'passed'
+        elif sub_id in planned:
+            status = 'planned'
+        elif transcript.get(sub_id) == 'F':
+            status = 'failed'
+        elif graph.is_eligible(sub_id, passed):
+            status = 'eligible'
+        else:
+            status = 'locked'
+        overlay[sub_id] = status
+    return overlay
+
+
+@functools.lru_cache(maxsize=None)
+def _vis_assets():
+    with open(os.path.join(VIS_DIR, 'vis-network.min.js'), 'r', encoding='utf-8') as f:
+        js = f.read()
+    with open(os.path.join(VIS_DIR, 'vis-network.css'), 'r', encoding='utf-8') as f:
+        css = f.read()
+    return js, css
+
+
+def render_html(layout, overlay, height=520):
+    """Trang HTML độc lập (nhúng vis-network nội bộ, không cần mạng), vị trí cố định, physics tắt"""
+    nodes = []
+    for node in layout['nodes']:
+        style = STATUS_STYLES[overlay.get(node['id'], 'locked')]
+        title = f"{node['title']} · {STATUS_LABELS[overlay.get(node['id'], 'locked')]}"
+        nodes.append({**node, 'title': title, 'color': style})
+    edges = [{'from': a, 'to': b} for a, b in layout['edges']]
+    options = {
+        'physics': {'enabled': False},
+        'layout': {'improvedLayout': False},
+        'interaction': {'dragNodes': False, 'hover': True},
+        'nodes': {'shape': 'box', 'font': {'color': '#ffffff', 'face': 'monospace'}, 'fixed': True},
+        'edges': {'arrows': 'to', 'color': {'color': '#484f58'}, 'smooth': False},
+    }
+    js, css = _vis_assets()
+    data = json.dumps({'nodes': nodes, 'edges': edges, 'options': options}, ensure_ascii=False)
+    # Chặn chuỗi "</script>" trong dữ liệu đóng nhầm thẻ script
+    data = data.replace('</', '<\\/')
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><style>{css}
+html, body {{ margin: 0; background: #0d1117; }}
+#roadmap {{ width: 100%; height: {height}px; }}</style>
+<script>{js}</script></head>
+<body><div id="roadmap"></div><script>
+var data = {data};
+new vis.Network(document.getElementById('roadmap'),
+    {{nodes: new vis.DataSet(data.nodes), edges: new vis.DataSet(data.edges)}}, data.options);
+</script></body></html>"""
@@ -0,0 +1,169 @@
+import json
+import os
+
+import numpy as np
+
+# =============================================================================
+# LUẬT NGHIỆP VỤ (khai báo). Ghi đè bằng dict hoặc file JSON cùng khóa.
+# =============================================================================
+DEFAULT_RULES = {
+    # Trần tín chỉ mỗi kỳ, vượt là quá tải
+    'credit_cap': 20,
+    # Học phí ước tính cho 1 tín chỉ (đồng)
+    'fee_per_credit': 750000,
+    # Tải độ khó tối đa của giỏ: tổng (tín chỉ x độ khó)
+    'max_difficulty_load': 70,
+    # Nhận xét giỏ theo độ khó trung bình
+    'difficulty_bands': {'hard_above': 3.5, 'easy_below': 2.5},
+    # Số kỳ chính trong một năm học (kỳ mở lớp 'semesters_offered' đánh số 1..n)
+    'terms_per_year': 2,
+    # Chỉ gợi ý môn có mở lớp ở kỳ tới
+    'enforce_offering': True,
+    # Môn song hành {môn: [môn phải học cùng kỳ hoặc đã qua]};
+    # gộp với khóa 'corequisites' trong dữ liệu môn
+    'corequisites': {},
+    # Học cải thiện: môn đã qua với các điểm này vẫn được gợi ý học lại
+    'improvable_grades': [],
+}
+
+DIFFICULTY_COMMENTS = {
+    'hard': "🔥 Khá căng thẳng",
+    'easy': "🌱 Vừa sức",
+    'balanced': "⚖️ Cân bằng",
+}
+
+
+def load_rules(source=None):
+    """
+    Luật mặc định ghi đè bởi source: None, dict hoặc đường dẫn file JSON.
+    Khóa lạ bị từ chối để tránh gõ nhầm tên luật mà không hay biết.
+    """
+    overrides = {}
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+    elif source is not None:
+        overrides = dict(source)
+    unknown = set(overrides) - set(DEFAULT_RULES)
+    if unknown:
+        raise ValueError(f"Luật không hợp lệ: {', '.join(sorted(unknown))}")
+    return {**DEFAULT_RULES, **overrides}
+
+
+class CompiledRules:
+    """
+    Luật đã biên dịch thành mảng theo chỉ số môn của CurriculumGraph, để
+    kiểm tra cả danh mục / cả khóa sinh viên bằng vài phép NumPy.
+    """
+
+    COREQ_KEYS = ('corequisites', 'coreq')
+
+    def __init__(self, rules, graph, subjects):
+        self.rules = rules
+        self.graph = graph
+        self.credit_cap = rules['credit_cap']
+        self.fee_per_credit = rules['fee_per_credit']
+        self.max_difficulty_load = rules['max_difficulty_load']
+        self.terms_per_year = rules['terms_per_year']
+        self.improvable_grades = frozenset(rules['improvable_grades'])
+        n = len(graph.ids)
+
+        # --- 1. KỲ MỞ LỚP: offered[i, t] (cột 0 không dùng) ---
+        self.offered = np.ones((n, self.terms_per_year + 1), dtype=bool)
+        if rules['enforce_offering']:
+            for sub_id, terms in graph.offered.items():
+                valid = [t for t in terms if 1 <= t <= self.terms_per_year]
+                # Như GraduationPlanner: dữ liệu không khớp số kỳ/năm thì coi như kỳ nào cũng mở
+                if valid:
+                    row = self.offered[graph.index[sub_id]]
+                    row[:] = False
+                    row[valid] = True
+
+        # --- 2. MÔN SONG HÀNH: dạng CSR (môn có song hành -> chỉ số các môn đi kèm) ---
+        coreqs = {}
+        for sub_id, sub in subjects.items():
+            for key in self.COREQ_KEYS:
+                if sub.get(key):
+                    coreqs.setdefault(sub_id, []).extend(sub[key])
+                    break
+        for sub_id, extra in rules['corequisites'].items():
+            coreqs.setdefault(sub_id, []).extend(extra)
+        # Chỉ giữ môn có trong danh mục
+        self.coreqs = {
+            sub_id: tuple(c for c in dict.fromkeys(cs) if c in graph.index and c != sub_id)
+            for sub_id, cs in coreqs.items() if sub_id in graph.index
+        }
+        self.coreqs = {sub_id: cs for sub_id, cs in self.coreqs.items() if cs}
+        self.coreq_dependents = {}
+        for sub_id, cs in self.coreqs.items():
+            for c in cs:
+                self.coreq_dependents.setdefault(c, []).append(sub_id)
+
+        self.coreq_rows = np.array([graph.index[s] for s in self.coreqs], dtype=np.int64)
+        self.coreq_ptr = np.cumsum([0] + [len(cs) for cs in self.coreqs.values()]).astype(np.int64)
+        self.coreq_cols = np.array([graph.index[c] for cs in self.coreqs.values() for c in cs],
+                                   dtype=np.int64)
+
+        # Tải độ khó từng môn
+        self.load = graph.credits * graph.difficulty
+
+    @property
+    def has_coreqs(self):
+        return len(self.coreq_rows) > 0
+
+    def term_of(self, semester):
+        """Kỳ thứ mấy trong năm học (1..terms_per_year)"""
+        return (np.asarray(semester) - 1) % self.terms_per_year + 1
+
+    def offered_mask(self, semester):
+        """Môn nào mở lớp ở kỳ semester: (N,) hoặc (S, N) nếu semester là mảng"""
+        return self.offered[:, self.term_of(semester)].T
+
+    def coreq_ok(self, ok):
+        """
+        ok: mảng bool (..., N) các môn đã qua / có trong giỏ / có thể học kỳ này.
+        Trả về (..., N): môn nào có đủ môn song hành trong ok (môn không có song hành: True).
+        """
+        result = np.ones(ok.shape, dtype=bool)
+        if self.has_coreqs:
+            missing = np.logical_or.reduceat(~ok[..., self.coreq_cols], self.coreq_ptr[:-1], axis=-1)
+            result[..., self.coreq_rows] = ~missing
+        return result
+
+    def coreq_satisfied(self, sub_id, is_ok):
+        """Bản từng môn: is_ok(mã môn) -> bool cho mỗi môn song hành"""
+        return all(is_ok(c) for c in self.coreqs.get(sub_id, ()))
+
+    def difficulty_comment(self, avg_difficulty):
+        bands = self.rules['difficulty_bands']
+        if avg_difficulty > bands['hard_above']:
+            return DIFFICULTY_COMMENTS['hard']
+        if avg_difficulty < bands['easy_below']:
+            return DIFFICULTY_COMMENTS['easy']
+        return DIFFICULTY_COMMENTS['balanced']
+
+    def evaluate_plans(self, planned, passed, semester):
+        """
+        Kiểm tra hàng loạt giỏ môn của S sinh viên.
+        planned, passed: bool (S, N). semester: kỳ sẽ học (số hoặc mảng (S,)).
+        Trả về dict mảng: credits, fee, avg_difficulty, difficulty_load (S,),
+        over_cap, over_load (S,), not_offered, coreq_missing (S, N).
+        """
+        graph = self.graph
+        n_planned = planned.sum(axis=1)
+        credits = planned @ graph.credits
+        load = planned @ self.load
+        avg = np.divide(planned @ graph.difficulty.astype(np.float64), n_planned,
+                        out=np.zeros(len(planned)), where=n_planned > 0)
+        not_offered = planned & ~self.offered_mask(np.broadcast_to(semester, (len(planned),)))
+        coreq_missing = planned & ~self.coreq_ok(planned | passed)
+        return {
+            'credits': credits,
+            'fee': credits * self.fee_per_credit,
+            'avg_difficulty': avg,
+            'difficulty_load': load,
+            'over_cap': credits > self.credit_cap,
+            'over_load': load > self.max_difficulty_load,
+            'not_offered': not_offered,
+            'coreq_missing': coreq_missing,
+        }
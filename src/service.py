@@ -0,0 +1,291 @@
+"""
+Dịch vụ HTTP cho engine tư vấn, gọi trực tiếp không cần phiên Streamlit.
+
+    python src/service.py --port 8600 --workers 4
+
+POST JSON tới:
+    /gpa               {"transcript": {...}}
+    /suggestions       {"transcript": {...}, "major_code": "CNTT", "current_sem": 2, "planned": [...]}
+    /credits-needed    {"current_gpa": 2.8, "current_credits": 60, "target_gpa": 3.2, "performance_gpa": 3.6}
+    /easiest-subjects  {"transcript": {...}, "planned": [...], "limit": 4,
+                        "major_code": "CNTT", "category": "Core", "current_sem": 2}
+    /batch             {"requests": [{"op": "gpa", "transcript": {...}}, ...]}
+GET /health, /metrics (định dạng Prometheus).
+
+Front end asyncio (tornado) chỉ nhận/trả JSON; engine chạy trong process pool,
+mỗi worker nạp chương trình đào tạo một lần. Các yêu cầu đến gần nhau được gom
+thành một lượt gửi sang worker (micro-batching) để giảm chi phí IPC.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from tornado.web import Application, HTTPError, RequestHandler
+
+from advisor_cache import CachedAdvisor
+from decision_engine import AcademicAdvisor
+from instrumentation import Profiler
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def default_data_path():
+    """Như app.py: ưu tiên knowledge_base/ của ETL, không có thì curriculum.json"""
+    kb_dir = os.path.join(ROOT_DIR, 'data', 'knowledge_base')
+    return kb_dir if os.path.isdir(kb_dir) else os.path.join(ROOT_DIR, 'data', 'curriculum.json')
+
+
+# =============================================================================
+# PHÍA WORKER (chạy trong process pool)
+# =============================================================================
+_ADVISOR = None
+
+
+def _init_worker(data_path, rules):
+    """Mỗi worker nạp chương trình đào tạo đúng một lần"""
+    global _ADVISOR
+    _ADVISOR = CachedAdvisor(AcademicAdvisor(data_path, rules=rules), maxsize=4096, ttl=900)
+
+
+def _gpa(advisor, p):
+    gpa, credits = advisor.calculate_gpa(p['transcript'])
+    return {'gpa': gpa, 'credits': credits}
+
+
+def _suggestions(advisor, p):
+    return advisor.suggest_next_semester(
+        p.get('transcript', {}), p['major_code'], int(p['current_sem']), p.get('planned', []))
+
+
+def _credits_needed(advisor, p):
+    needed = advisor.calculate_credits_needed(
+        float(p['current_gpa']), float(p['current_credits']),
+        float(p['target_gpa']), float(p.get('performance_gpa', 4.0)))
+    # JSON không có Infinity: trả None kèm cờ khả thi
+    feasible = needed != float('inf')
+    return {'credits_needed': needed if feasible else None, 'feasible': feasible}
+
+
+def _easiest_subjects(advisor, p):
+    current_sem = p.get('current_sem')
+    return advisor.find_easiest_subjects(
+        p.get('transcript', {}), p.get('planned', []), int(p.get('limit', 4)),
+        major_code=p.get('major_code'), category=p.get('category'),
+        current_sem=int(current_sem) if current_sem is not None else None)
+
+
+OPS = {
+    'gpa': _gpa,
+    'suggestions': _suggestions,
+    'credits-needed': _credits_needed,
+    'easiest-subjects': _easiest_subjects,
+}
+
+
+# Lỗi do dữ liệu gửi lên (trả 400); lỗi khác coi là lỗi nội bộ (500)
+CLIENT_ERRORS = (KeyError, TypeError, ValueError, AttributeError)
+
+
+def run_batch(requests):
+    """[(op, payload)] -> [{'result': ...} | {'error': ...}], lỗi từng yêu cầu không làm hỏng cả lô"""
+    out = []
+    for op, payload in requests:
+        try:
+            out.append({'result': OPS[op](_ADVISOR, payload)})
+        except CLIENT_ERRORS as e:
+            out.append({'error': f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            # Bất kỳ lỗi nào khác (OverflowError, RecursionError...) cũng chỉ hỏng yêu cầu này
+            out.append({'error': f"{type(e).__name__}: {e}", 'internal': True})
+    return out
+
+
+def _ping(delay):
+    time.sleep(delay)
+    return os.getpid()
+
+
+# =============================================================================
+# PHÍA FRONT END (event loop)
+# =============================================================================
+class MicroBatcher:
+    """Gom các yêu cầu đến trong cùng cửa sổ thời gian thành một lần gửi sang pool"""
+
+    def __init__(self, executor, max_batch=64, window=0.002):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.window = window
+        self.pending = []
+        self._timer = None
+        self.batches = 0
+
+    def submit(self, op, payload):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((op, payload, future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return future
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        self.batches += 1
+        task = asyncio.get_running_loop().run_in_executor(
+            self.executor, run_batch, [(op, payload) for op, payload, _ in batch])
+
+        def done(task):
+            if task.cancelled() or task.exception() is not None:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(task.exception() or asyncio.CancelledError())
+                return
+            for (_, _, future), result in zip(batch, task.result()):
+                if not future.done():
+                    future.set_result(result)
+        task.add_done_callback(done)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Không chuyển được sang JSON: {type(value).__name__}")
+
+
+class BaseHandler(RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def write_json(self, data, status=200):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/json; charset=utf-8')
+        self.finish(json.dumps(data, ensure_ascii=False, default=_json_default))
+
+    def read_json(self):
+        try:
+            data = json.loads(self.request.body or b'{}')
+        except ValueError:
+            raise HTTPError(400, "Body không phải JSON hợp lệ")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body phải là một object JSON")
+        return data
+
+    def write_error(self, status_code, **kwargs):
+        # Thông điệp tiếng Việt để trong body, dòng trạng thái HTTP chỉ nhận latin-1
+        error = kwargs.get('exc_info', (None, None, None))[1]
+        self.write_json({'error': getattr(error, 'log_message', None) or self._reason}, status_code)
+
+
+class OpHandler(BaseHandler):
+    def initialize(self, service, op):
+        super().initialize(service)
+        self.op = op
+
+    async def post(self):
+        payload = self.read_json()
+        with self.service.metrics.section(f'http.{self.op}'):
+            outcome = await self.service.batcher.submit(self.op, payload)
+        if 'error' in outcome:
+            self.service.metrics.count(f'http.{self.op}.error')
+            self.write_json({'error': outcome['error']}, 500 if outcome.get('internal') else 400)
+        else:
+            self.write_json(outcome['result'])
+
+
+class BatchHandler(BaseHandler):
+    async def post(self):
+        requests = self.read_json().get('requests')
+        if not isinstance(requests, list) or not all(isinstance(r, dict) for r in requests):
+            raise HTTPError(400, "'requests' phải là danh sách object")
+        ops = [(r.get('op'), {k: v for k, v in r.items() if k != 'op'}) for r in requests]
+        unknown = sorted({op for op, _ in ops if op not in OPS}, key=str)
+        if unknown:
+            raise HTTPError(400, f"op không hợp lệ: {', '.join(map(str, unknown))}")
+        loop = asyncio.get_running_loop()
+        with self.service.metrics.section('http.batch'):
+            results = await loop.run_in_executor(self.service.executor, run_batch, ops)
+        self.write_json({'results': results})
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write_json({'status': 'ok', 'workers': self.service.workers})
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4')
+        self.finish(self.service.metrics.to_prometheus())
+
+
+class AdvisorService:
+    """Process pool + micro-batcher + ứng dụng tornado"""
+
+    def __init__(self, data_path=None, workers=None, rules=None, max_batch=64, batch_window=0.002):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(data_path or default_data_path(), rules))
+        self.batcher = MicroBatcher(self.executor, max_batch, batch_window)
+        # Số liệu của front end (luôn bật, chi phí chỉ vài phép cộng mỗi request)
+        self.metrics = Profiler(enabled=True)
+        self.metrics.add_gauge_source('batcher', lambda: {'batches': self.batcher.batches})
+
+    def warm_up(self):
+        """Khởi động đủ worker (mỗi worker nạp dữ liệu) trước khi nhận tải"""
+        futures = [self.executor.submit(_ping, 0.05) for _ in range(self.workers)]
+        return {f.result() for f in futures}
+
+    def make_app(self):
+        routes = [(rf'/{op}', OpHandler, {'service': self, 'op': op}) for op in OPS]
+        routes += [
+            (r'/batch', BatchHandler, {'service': self}),
+            (r'/health', HealthHandler, {'service': self}),
+            (r'/metrics', MetricsHandler, {'service': self}),
+        ]
+        return Application(routes)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+async def serve(service, port, address):
+    service.make_app().listen(port, address)
+    print(f"🚀 Dịch vụ tư vấn chạy tại http://{address}:{port} ({service.workers} worker)")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--address', default='127.0.0.1')
+    parser.add_argument('--workers', type=int, default=None, help="Số process (mặc định = số CPU)")
+    parser.add_argument('--data', default=None, help="curriculum.json hoặc thư mục knowledge_base/")
+    parser.add_argument('--rules', default=None, help="File JSON ghi đè luật nghiệp vụ")
+    parser.add_argument('--batch-window-ms', type=float, default=2.0)
+    parser.add_argument('--max-batch', type=int, default=64)
+    args = parser.parse_args()
+
+    service = AdvisorService(args.data, args.workers, args.rules,
+                             args.max_batch, args.batch_window_ms / 1000)
+    service.warm_up()
+    # SIGTERM (docker stop, load_test --spawn) cũng đi qua finally để đóng pool
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        asyncio.run(serve(service, args.port, args.address))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,462 @@
+"""
+Lưu bảng điểm và giỏ môn của sinh viên vào SQLite.
+
+    python src/storage.py --db data/advisor.db --import-csv grades.csv --major CNTT
+    python src/storage.py --db data/advisor.db --major CNTT --output suggestions.csv
+    python src/storage.py --db data/advisor.db --issue-token SV001   # cấp mã truy cập hồ sơ
+
+CSV nhập vào có các cột (student, subject, grade) và tùy chọn (major, current_sem).
+Chạy gợi ý cho cả ngành theo từng lô sinh viên, không nạp cả khoa vào bộ nhớ.
+"""
+import argparse
+import hashlib
+import hmac
+import os
+import queue
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Mỗi phần tử là một bước nâng cấp schema; PRAGMA user_version = số bước đã chạy
+MIGRATIONS = [
+    # 1. Bảng gốc
+    """
+    CREATE TABLE students (
+        student_id  TEXT PRIMARY KEY,
+        major_code  TEXT,
+        current_sem INTEGER NOT NULL DEFAULT 1,
+        updated_at  REAL NOT NULL
+    );
+    CREATE TABLE grades (
+        student_id  TEXT NOT NULL,
+        subject_id  TEXT NOT NULL,
+        grade       TEXT NOT NULL,
+        updated_at  REAL NOT NULL,
+        PRIMARY KEY (student_id, subject_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE plans (
+        student_id  TEXT NOT NULL,
+        semester    INTEGER NOT NULL,
+        position    INTEGER NOT NULL,
+        subject_id  TEXT NOT NULL,
+        PRIMARY KEY (student_id, semester, subject_id)
+    ) WITHOUT ROWID;
+    """,
+    # 2. Chỉ mục tra cứu theo ngành/kỳ và theo môn
+    """
+    CREATE INDEX idx_students_major_sem ON students (major_code, current_sem, student_id);
+    CREATE INDEX idx_grades_subject ON grades (subject_id, grade);
+    """,
+    # 3. Phiên ẩn danh (thử "nếu... thì") không được dùng làm dữ liệu thống kê điểm
+    """
+    ALTER TABLE students ADD COLUMN anonymous INTEGER NOT NULL DEFAULT 0;
+    """,
+    # 4. Mã truy cập hồ sơ (chỉ lưu băm SHA-256)
+    """
+    ALTER TABLE students ADD COLUMN token_hash TEXT;
+    """,
+]
+
+# Số dòng mỗi lần executemany khi ghi hàng loạt
+BULK_CHUNK = 10000
+
+
+class ConnectionPool:
+    """Hàng đợi kết nối SQLite dùng chung giữa các luồng (Streamlit chạy mỗi phiên một luồng)"""
+
+    def __init__(self, path, size=4, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.size = size
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._connect()
+        return self._idle.get(timeout=self.timeout)
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Mượn một kết nối; tự commit khi thoát bình thường, rollback khi lỗi"""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class AdvisorStore:
+    """Kho bảng điểm / giỏ môn; mọi hàm an toàn khi gọi từ nhiều luồng"""
+
+    def __init__(self, path, pool_size=4):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # ':memory:' mỗi kết nối là một DB riêng nên chỉ dùng 1 kết nối
+        self.pool = ConnectionPool(path, size=1 if path == ':memory:' else pool_size)
+        self._grade_listeners = []
+        self.migrate()
+
+    def migrate(self):
+        """Chạy các bước MIGRATIONS chưa áp dụng; trả về phiên bản schema"""
+        with self.pool.connection() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for step, script in enumerate(MIGRATIONS[version:], start=version + 1):
+                # Giữ khóa ghi rồi mới đọc lại phiên bản: hai tiến trình mở cùng một DB mới
+                # (app và advisor-api khởi động cùng lúc) không chạy trùng một bước
+                conn.execute('BEGIN IMMEDIATE')
+                if conn.execute('PRAGMA user_version').fetchone()[0] < step:
+                    for statement in script.split(';'):
+                        if statement.strip():
+                            conn.execute(statement)
+                    conn.execute(f'PRAGMA user_version = {step}')
+                conn.commit()
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+
+    def close(self):
+        self.pool.close()
+
+    def on_grades_changed(self, callback):
+        """
+        Đăng ký callback([(môn, điểm cũ, điểm mới), ...]) gọi sau mỗi save_transcript có thay đổi.
+        Chỉ báo cho SV có hồ sơ và không ẩn danh, khớp với tập mà subject_grade_counts đếm.
+        """
+        self._grade_listeners.append(callback)
+
+    # =========================================================================
+    # GHI
+    # =========================================================================
+    def upsert_students(self, rows, anonymous=False, overwrite=True):
+        """
+        rows: iterable (student, major_code, current_sem) hoặc DataFrame cùng thứ tự cột.
+        anonymous: phiên thử của khách (không định danh) - bị loại khỏi thống kê điểm.
+        overwrite=False: chỉ thêm SV chưa có, giữ nguyên hồ sơ đã có.
+        """
+        conflict = """DO UPDATE SET
+                major_code = excluded.major_code,
+                current_sem = excluded.current_sem,
+                updated_at = excluded.updated_at""" if overwrite else 'DO NOTHING'
+        sql = f"""
+            INSERT INTO students (student_id, major_code, current_sem, updated_at, anonymous)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (student_id) {conflict}
+        """
+        now = time.time()
+        flag = int(bool(anonymous))
+        return self._bulk(sql, ((str(s), m, int(c), now, flag) for s, m, c in _rows(rows)))
+
+    def upsert_grades(self, rows):
+        """rows: iterable (student, subject, grade) hoặc DataFrame; ghi theo lô trong một transaction"""
+        sql = """
+            INSERT INTO grades (student_id, subject_id, grade, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (student_id, subject_id) DO UPDATE SET
+                grade = excluded.grade,
+                updated_at = excluded.updated_at
+            WHERE grade IS NOT excluded.grade
+        """
+        now = time.time()
+        return self._bulk(sql, ((str(s), str(sub), g, now) for s, sub, g in _rows(rows)))
+
+    def _bulk(self, sql, rows):
+        count = 0
+        with self.pool.connection() as conn:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= BULK_CHUNK:
+                    conn.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany(sql, batch)
+                count += len(batch)
+        return count
+
+    # =========================================================================
+    # QUYỀN TRUY CẬP HỒ SƠ
+    # =========================================================================
+    def claim_student(self, student_id, major_code=None, current_sem=1):
+        """
+        Nhận một mã SV chưa có dữ liệu: tạo hồ sơ kèm mã truy cập mới và trả về mã đó.
+        Trả về None nếu mã đã có người dùng (kể cả khi vừa bị phiên khác nhận trước).
+        """
+        if self.has_records(student_id):
+            return None
+        token = secrets.token_urlsafe(16)
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                'INSERT INTO students (student_id, major_code, current_sem, updated_at, token_hash) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT (student_id) DO NOTHING',
+                (student_id, major_code, int(current_sem), time.time(), _token_hash(token)))
+        return token if cursor.rowcount == 1 else None
+
+    def issue_token(self, student_id):
+        """Cấp (hoặc cấp lại) mã truy cập cho SV, vd. SV nạp từ CSV; mã cũ hết hiệu lực"""
+        token = secrets.token_urlsafe(16)
+        with self.pool.connection() as conn:
+            conn.execute(
+                'INSERT INTO students (student_id, updated_at, token_hash) VALUES (?, ?, ?) '
+                'ON CONFLICT (student_id) DO UPDATE SET token_hash = excluded.token_hash',
+                (student_id, time.time(), _token_hash(token)))
+        return token
+
+    def check_token(self, student_id, token):
+        """Mã truy cập có đúng với hồ sơ không (hồ sơ chưa được cấp mã: luôn sai)"""
+        if not token:
+            return False
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT token_hash FROM students WHERE student_id = ?', (student_id,)).fetchone()
+        return bool(row and row[0]) and hmac.compare_digest(row[0], _token_hash(token))
+
+    def has_records(self, student_id):
+        """Mã SV đã có hồ sơ, điểm hoặc giỏ môn nào chưa"""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                'SELECT EXISTS (SELECT 1 FROM students WHERE student_id = ?) '
+                'OR EXISTS (SELECT 1 FROM grades WHERE student_id = ?) '
+                'OR EXISTS (SELECT 1 FROM plans WHERE student_id = ?)',
+                (student_id, student_id, student_id)).fetchone()[0] == 1
+
+    # =========================================================================
+    # GHI BẢNG ĐIỂM / GIỎ MÔN
+    # =========================================================================
+    def save_transcript(self, student_id, transcript):
+        """Đồng bộ bảng điểm một SV: ghi điểm mới/đổi, xóa môn không còn trong transcript"""
+        now = time.time()
+        with self.pool.connection() as conn:
+            stored = dict(conn.execute(
+                'SELECT subject_id, grade FROM grades WHERE student_id = ?', (student_id,)))
+            counted = self._grade_listeners and conn.execute(
+                'SELECT 1 FROM students WHERE student_id = ? AND anonymous = 0', (student_id,)).fetchone()
+            removed = [(student_id, s) for s in stored if s not in transcript]
+            changed = [(student_id, s, g, now) for s, g in transcript.items() if stored.get(s) != g]
+            conn.executemany('DELETE FROM grades WHERE student_id = ? AND subject_id = ?', removed)
+            conn.executemany("""
+                INSERT INTO grades (student_id, subject_id, grade, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (student_id, subject_id) DO UPDATE SET
+                    grade = excluded.grade, updated_at = excluded.updated_at
+            """, changed)
+        # Báo phần chênh lệch (đã commit) cho thống kê trực tuyến, vd. grade_model.GradeModel.observe
+        if counted and (removed or changed):
+            delta = [(s, stored[s], None) for _, s in removed] + \
+                    [(s, stored.get(s), g) for _, s, g, _ in changed]
+            for callback in self._grade_listeners:
+                callback(delta)
+        return len(removed) + len(changed)
+
+    def save_plan(self, student_id, semester, subject_ids):
+        """Thay giỏ môn của SV cho một kỳ (giữ thứ tự)"""
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM plans WHERE student_id = ? AND semester = ?', (student_id, semester))
+            conn.executemany(
+                'INSERT OR IGNORE INTO plans (student_id, semester, position, subject_id) VALUES (?, ?, ?, ?)',
+                [(student_id, semester, pos, sub_id) for pos, sub_id in enumerate(subject_ids)])
+
+    # =========================================================================
+    # ĐỌC
+    # =========================================================================
+    def get_student(self, student_id):
+        """{'major_code', 'current_sem'} hoặc None nếu chưa có"""
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT major_code, current_sem FROM students WHERE student_id = ?',
+                               (student_id,)).fetchone()
+        return {'major_code': row[0], 'current_sem': row[1]} if row else None
+
+    def get_transcript(self, student_id):
+        with self.pool.connection() as conn:
+            return dict(conn.execute(
+                'SELECT subject_id, grade FROM grades WHERE student_id = ?', (student_id,)))
+
+    def get_plan(self, student_id, semester):
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute(
+                'SELECT subject_id FROM plans WHERE student_id = ? AND semester = ? ORDER BY position',
+                (student_id, semester))]
+
+    def students(self, major_code=None, current_sem=None):
+        """DataFrame (student, major_code, current_sem), lọc theo ngành/kỳ qua chỉ mục"""
+        sql, params = _student_filter(major_code, current_sem)
+        with self.pool.connection() as conn:
+            return pd.read_sql_query(
+                f'SELECT student_id AS student, major_code, current_sem FROM students s {sql} '
+                'ORDER BY student_id', conn, params=params)
+
+    def subject_grade_counts(self, major_code=None):
+        """Thống kê số lượt từng điểm của từng môn (subject, grade, n), tính trong SQLite; bỏ phiên ẩn danh"""
+        sql, params = _student_filter(major_code, None, prefix='AND')
+        with self.pool.connection() as conn:
+            return pd.read_sql_query(
+                f'SELECT g.subject_id AS subject, g.grade, COUNT(*) AS n FROM grades g '
+                f'JOIN students s ON s.student_id = g.student_id WHERE s.anonymous = 0 {sql} '
+                'GROUP BY g.subject_id, g.grade ORDER BY g.subject_id, g.grade', conn, params=params)
+
+    def iter_cohort(self, major_code=None, current_sem=None, chunk_students=2048, fetch_rows=5000):
+        """
+        Duyệt tuần tự theo lô tối đa chunk_students sinh viên (không nạp cả khoa).
+        Mỗi lô: (students, grades, plans) dạng DataFrame, với
+            students - (student, major_code, current_sem)
+            grades   - (student, subject, grade)
+            plans    - (student, subject) giỏ môn của kỳ current_sem + 1
+        """
+        sql, params = _student_filter(major_code, current_sem)
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                f'SELECT student_id, major_code, current_sem FROM students s {sql} ORDER BY student_id',
+                params)
+            while True:
+                batch = cursor.fetchmany(chunk_students)
+                if not batch:
+                    break
+                students = pd.DataFrame(batch, columns=['student', 'major_code', 'current_sem'])
+                # Quét khoảng khóa chính (student_id, ...) của lô: đọc tuần tự trên B-tree,
+                # SV khác ngành/kỳ nằm xen trong khoảng bị lọc ngay trong SQLite
+                in_range, _ = _student_filter(major_code, current_sem, prefix='AND')
+                bounds = (batch[0][0], batch[-1][0], *params)
+                grades = self._range_frame(
+                    conn, 'SELECT g.student_id, g.subject_id, g.grade FROM grades g '
+                    'JOIN students s ON s.student_id = g.student_id '
+                    f'WHERE g.student_id BETWEEN ? AND ? {in_range}',
+                    bounds, ['student', 'subject', 'grade'], fetch_rows)
+                plans = self._range_frame(
+                    conn, 'SELECT p.student_id, p.subject_id FROM plans p '
+                    'JOIN students s ON s.student_id = p.student_id AND p.semester = s.current_sem + 1 '
+                    f'WHERE p.student_id BETWEEN ? AND ? {in_range} ORDER BY p.student_id, p.position',
+                    bounds, ['student', 'subject'], fetch_rows)
+                yield students, grades, plans
+
+    @staticmethod
+    def _range_frame(conn, sql, params, columns, fetch_rows):
+        cursor = conn.execute(sql, params)
+        rows = []
+        while True:
+            part = cursor.fetchmany(fetch_rows)
+            if not part:
+                break
+            rows.extend(part)
+        return pd.DataFrame(rows, columns=columns)
+
+    def import_csv(self, path, major_code=None, current_sem=1, chunksize=50000):
+        """
+        Nạp CSV (student, subject, grade[, major, current_sem]) theo từng khúc.
+        File không có cột current_sem: chỉ tạo hồ sơ cho SV mới (kỳ = current_sem),
+        SV đã có giữ nguyên ngành/kỳ.
+        """
+        n = 0
+        for chunk in pd.read_csv(path, dtype=str, chunksize=chunksize):
+            if 'major' in chunk or major_code:
+                has_sem = 'current_sem' in chunk
+                students = pd.DataFrame({
+                    'student': chunk['student'],
+                    'major': chunk['major'] if 'major' in chunk else major_code,
+                    'current_sem': pd.to_numeric(chunk['current_sem']) if has_sem else current_sem,
+                }).drop_duplicates('student', keep='last')
+                self.upsert_students(students, overwrite=has_sem)
+            n += self.upsert_grades(chunk[['student', 'subject', 'grade']])
+        return n
+
+
+def _token_hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _rows(rows):
+    if isinstance(rows, pd.DataFrame):
+        return rows.itertuples(index=False, name=None)
+    return rows
+
+
+def _student_filter(major_code, current_sem, prefix='WHERE'):
+    """Điều kiện lọc SV (bí danh bảng s) -> (chuỗi SQL, tham số)"""
+    clauses, params = [], []
+    if major_code is not None:
+        clauses.append('s.major_code = ?')
+        params.append(major_code)
+    if current_sem is not None:
+        clauses.append('s.current_sem = ?')
+        params.append(int(current_sem))
+    return (f'{prefix} ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+# =============================================================================
+# CHẠY HÀNG LOẠT CHO CẢ NGÀNH
+# =============================================================================
+def advise_department(advisor, store, major_code, top_k=None, chunk_students=2048):
+    """
+    Gợi ý cho mọi SV của ngành theo từng lô (AcademicAdvisor.advise_cohort),
+    dùng kỳ hiện tại của từng SV. Sinh ra (summary, suggestions) cho mỗi lô.
+    """
+    for students, grades, _ in store.iter_cohort(major_code, chunk_students=chunk_students):
+        # Truyền cả danh sách SV: SV chưa có điểm nào vẫn được gợi ý
+        yield advisor.advise_cohort(grades, major_code, top_k=top_k, roster=students)
+
+
+def check_department_plans(advisor, store, major_code, chunk_students=2048):
+    """Kiểm tra giỏ môn kỳ tới của mọi SV trong ngành theo luật, từng lô"""
+    for students, grades, plans in store.iter_cohort(major_code, chunk_students=chunk_students):
+        current_sem = students.set_index('student')['current_sem']
+        yield advisor.check_cohort_plans(grades, plans, current_sem)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from decision_engine import AcademicAdvisor
+
+    ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=os.path.join(ROOT_DIR, 'data', 'advisor.db'))
+    parser.add_argument('--data', default=os.path.join(ROOT_DIR, 'data', 'curriculum.json'))
+    parser.add_argument('--import-csv', help="Nạp bảng điểm từ CSV trước khi chạy")
+    parser.add_argument('--major')
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--output', help="Ghi gợi ý cả ngành ra CSV")
+    parser.add_argument('--issue-token', metavar='STUDENT', help="Cấp mã truy cập hồ sơ cho SV (mở trên app)")
+    args = parser.parse_args()
+    if args.output and not args.major:
+        parser.error("--output cần --major")
+
+    store = AdvisorStore(args.db)
+    if args.issue_token:
+        print(f"🔑 Mã truy cập của {args.issue_token}: {store.issue_token(args.issue_token)}")
+    if args.import_csv:
+        print(f"📥 Đã nạp {store.import_csv(args.import_csv, args.major)} dòng điểm.")
+    if args.output:
+        advisor = AcademicAdvisor(args.data)
+        header = True
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            for _, suggestions in advise_department(advisor, store, args.major, args.top_k):
+                suggestions.to_csv(f, header=header, index=False)
+                header = False
+        print(f"✅ Đã ghi gợi ý ra {args.output}")
@@ -0,0 +1,172 @@
+"""
+Bảng điểm dạng gọn cho khi có hàng nghìn phiên cùng lúc.
+
+Mỗi bảng điểm chỉ giữ hai mảng song song: chỉ số môn (theo CurriculumGraph.index,
+tăng dần) và mã điểm uint8. Vector tín chỉ và bảng điểm hệ 4 nằm ở TranscriptCodec,
+dùng chung cho mọi phiên, nên GPA/tổng tín chỉ là một phép nhân vô hướng.
+CompactTranscript cư xử như dict {mã môn: điểm} nên code cũ (app.py) vẫn chạy.
+"""
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Mã điểm = vị trí trong tuple; 0 = chưa học (không tính tín chỉ)
+GRADES = ('Chưa học', 'A', 'B+', 'B', 'C+', 'C', 'D+', 'D', 'F')
+NOT_TAKEN = 0
+
+
+class TranscriptCodec:
+    """Bảng mã dùng chung của một chương trình: chỉ số môn, tín chỉ, điểm theo mã"""
+
+    def __init__(self, graph, grade_points):
+        self.ids = graph.ids
+        self.index = graph.index
+        # Môn ngoài danh mục có tín chỉ 0 nên tự động không ảnh hưởng GPA
+        self.credits = graph.credits
+        self.code_of = {grade: code for code, grade in enumerate(GRADES)}
+        self.points = np.array([0.0] + [grade_points[g] for g in GRADES[1:]])
+        self.counted = (np.arange(len(GRADES)) != NOT_TAKEN).astype(np.float64)
+
+    def encode(self, sub_id, grade):
+        """(chỉ số môn, mã điểm), hoặc None nếu không mã hóa được (môn/điểm lạ)"""
+        i = self.index.get(sub_id)
+        code = self.code_of.get(grade)
+        if i is None or code is None:
+            return None
+        return i, code
+
+
+class CompactTranscript(MutableMapping):
+    """Bảng điểm: mảng chỉ số môn (int32, tăng dần) + mảng mã điểm (uint8) cùng độ dài"""
+
+    __slots__ = ('codec', 'idx', 'codes', 'extra', '_totals')
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.idx = np.zeros(0, dtype=np.int32)
+        self.codes = np.zeros(0, dtype=np.uint8)
+        # Dòng không mã hóa được (môn ngoài danh mục, điểm lạ): giữ nguyên dạng dict
+        self.extra = None
+        self._totals = None
+
+    @classmethod
+    def from_dict(cls, codec, transcript):
+        self = cls(codec)
+        pairs = {}
+        for sub_id, grade in transcript.items():
+            encoded = codec.encode(sub_id, grade)
+            if encoded is None:
+                self.extra = self.extra or {}
+                self.extra[sub_id] = grade
+            else:
+                pairs[encoded[0]] = encoded[1]
+        order = sorted(pairs)
+        self.idx = np.array(order, dtype=np.int32)
+        self.codes = np.array([pairs[i] for i in order], dtype=np.uint8)
+        return self
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def copy(self):
+        other = CompactTranscript(self.codec)
+        other.idx, other.codes = self.idx.copy(), self.codes.copy()
+        other.extra = dict(self.extra) if self.extra else None
+        other._totals = self._totals
+        return other
+
+    # =========================================================================
+    # GIAO DIỆN dict
+    # =========================================================================
+    def _find(self, i):
+        pos = int(np.searchsorted(self.idx, i))
+        return pos, pos < len(self.idx) and self.idx[pos] == i
+
+    def __getitem__(self, sub_id):
+        i = self.codec.index.get(sub_id)
+        if i is not None:
+            pos, found = self._find(i)
+            if found:
+                return GRADES[self.codes[pos]]
+        if self.extra and sub_id in self.extra:
+            return self.extra[sub_id]
+        raise KeyError(sub_id)
+
+    def __setitem__(self, sub_id, grade):
+        self._totals = None
+        encoded = self.codec.encode(sub_id, grade)
+        i = self.codec.index.get(sub_id)
+        if i is not None:
+            pos, found = self._find(i)
+            if found and encoded is None:
+                self.idx = np.delete(self.idx, pos)
+                self.codes = np.delete(self.codes, pos)
+            elif found:
+                self.codes[pos] = encoded[1]
+            elif encoded is not None:
+                self.idx = np.insert(self.idx, pos, i)
+                self.codes = np.insert(self.codes, pos, encoded[1])
+        if encoded is None:
+            self.extra = self.extra or {}
+            self.extra[sub_id] = grade
+        elif self.extra:
+            self.extra.pop(sub_id, None)
+
+    def __delitem__(self, sub_id):
+        i = self.codec.index.get(sub_id)
+        if i is not None:
+            pos, found = self._find(i)
+            if found:
+                self._totals = None
+                self.idx = np.delete(self.idx, pos)
+                self.codes = np.delete(self.codes, pos)
+                return
+        if self.extra and sub_id in self.extra:
+            self._totals = None
+            del self.extra[sub_id]
+            return
+        raise KeyError(sub_id)
+
+    def __iter__(self):
+        ids = self.codec.ids
+        for i in self.idx:
+            yield ids[i]
+        if self.extra:
+            yield from list(self.extra)
+
+    def __len__(self):
+        return len(self.idx) + (len(self.extra) if self.extra else 0)
+
+    def items(self):
+        ids = self.codec.ids
+        pairs = [(ids[i], GRADES[c]) for i, c in zip(self.idx.tolist(), self.codes.tolist())]
+        if self.extra:
+            pairs.extend(self.extra.items())
+        return pairs
+
+    def __repr__(self):
+        return f"CompactTranscript({self.to_dict()!r})"
+
+    # =========================================================================
+    # GPA
+    # =========================================================================
+    def totals(self):
+        """(tổng điểm x tín chỉ, tổng tín chỉ): hai phép nhân vô hướng, ghi nhớ tới lần sửa sau"""
+        if self._totals is None:
+            codec = self.codec
+            credits = codec.credits[self.idx]
+            points = float(codec.points[self.codes] @ credits)
+            total = float(codec.counted[self.codes] @ credits)
+            # Điểm lạ của môn có trong danh mục: tính tín chỉ, 0 điểm (như grade_contribution)
+            for sub_id, grade in (self.extra or {}).items():
+                i = codec.index.get(sub_id)
+                if i is not None and grade != GRADES[NOT_TAKEN]:
+                    total += float(codec.credits[i])
+            # Tín chỉ trong dữ liệu là số nguyên: trả int như đường tính bằng dict
+            self._totals = (points, int(total) if total.is_integer() else total)
+        return self._totals
+
+    def gpa(self):
+        """(GPA, tổng tín chỉ) giống AcademicAdvisor.calculate_gpa"""
+        points, credits = self.totals()
+        return (points / credits if credits > 0 else 0.0), credits
@@ -0,0 +1,70 @@
+"""
+HTML các thẻ giao diện (thẻ gợi ý, dashboard giỏ môn, thẻ môn dễ), ghi nhớ theo nội dung.
+
+Streamlit chạy lại app.py từ đầu mỗi lần tương tác nên hàm khai báo trong
+app.py bị tạo mới mỗi lượt; để ở module riêng thì cache tồn tại suốt tiến
+trình và dùng chung cho mọi phiên. Tham số đều là giá trị băm được.
+"""
+import functools
+
+CARD_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=CARD_CACHE_SIZE)
+def recommendation_card(priority, name, credits, difficulty, reason):
+    """Thẻ gợi ý môn học (priority 1-3 quyết định màu viền và biểu tượng)"""
+    icon = "🔥" if priority == 3 else ("⚠️" if priority == 2 else "📘")
+    return f"""
+    <div class="rec-card p-{priority}">
+        <div style="display:flex; justify-content:space-between;">
+            <div style="font-weight:bold;">{icon} {name}</div>
+            <span style="background:#21262d; padding:2px 8px; border-radius:4px; font-size:0.8em; border:1px solid #30363d;">
+                {credits} TC
+            </span>
+        </div>
+        <div style="font-size:0.9em; color:#8b949e; margin-top:4px;">Độ khó: {"⭐"*difficulty}</div>
+        <div style="font-size:0.9em; color:#c9d1d9; font-style:italic; margin-top:6px;">👉 {reason}</div>
+    </div>
+    """
+
+
+@functools.lru_cache(maxsize=CARD_CACHE_SIZE)
+def plan_dashboard(total_creds, credit_cap, avg_diff, fee, over_cap, comment):
+    """Dashboard thống kê giỏ môn: tổng tín chỉ / trần, học phí, thanh độ khó trung bình"""
+    bar_width = min(avg_diff / 5 * 100, 100)
+    cred_color = '#ff6b6b' if over_cap else '#51cf66'
+    return f"""
+    <div class="plan-dashboard">
+        <div style="display:flex; justify-content:space-between; margin-bottom:10px;">
+            <div>
+                <div class="stat-label">Tổng tín chỉ</div>
+                <div class="stat-value" style="color:{cred_color}">{total_creds} <span style="font-size:0.6em; color:#8b949e">/ {credit_cap}</span></div>
+            </div>
+            <div style="text-align:right;">
+                <div class="stat-label">Học phí (Ước tính)</div>
+                <div class="stat-value" style="color:#e0e0e0;">{fee:,.0f} đ</div>
+            </div>
+        </div>
+        <div style="display:flex; justify-content:space-between; align-items:end; margin-bottom:5px;">
+            <div class="stat-label">Độ khó trung bình</div>
+            <div style="font-weight:bold; color:#f0f6fc;">{avg_diff:.1f}/5.0</div>
+        </div>
+        <div style="height:8px; background:#21262d; border-radius:4px; overflow:hidden;">
+            <div style="height:100%; width:{bar_width}%; background: linear-gradient(90deg, #51cf66, #fcc419, #ff6b6b); transition: width 0.5s;"></div>
+        </div>
+        <div style="font-size:0.8em; color:#8b949e; margin-top:5px; text-align:right; font-style:italic;">{comment}</div>
+    </div>
+    """
+
+
+@functools.lru_cache(maxsize=CARD_CACHE_SIZE)
+def easy_win_card(name, credits, difficulty, expected_points):
+    """Thẻ môn dễ (tab Chiến lược GPA); expected_points None khi không có mô hình điểm"""
+    expected = f" | Kỳ vọng: {expected_points:.1f}" if expected_points is not None else ""
+    return f"""
+    <div style="background:#161b22; border:1px solid #30363d; border-radius:8px; padding:15px; text-align:center; height:140px; display:flex; flex-direction:column; justify-content:center;">
+        <div style="font-size:2em;">🍀</div>
+        <div style="font-weight:bold; color:#58a6ff; margin-top:5px;">{name}</div>
+        <div style="font-size:0.8em; color:#8b949e;">{credits} TC | Khó: {difficulty}{expected}</div>
+    </div>
+    """
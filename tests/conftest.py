@@ -0,0 +1,39 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# app.py chạy từ src/ nên các module import lẫn nhau theo tên trần
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tools'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+CURRICULUM_PATH = os.path.join(ROOT_DIR, 'data', 'curriculum.json')
+
+
+@pytest.fixture
+def advisor():
+    from decision_engine import AcademicAdvisor
+    return AcademicAdvisor(CURRICULUM_PATH)
+
+
+@pytest.fixture
+def mini_curriculum(tmp_path):
+    """Chương trình nhỏ dùng cả hai kiểu khóa tiên quyết"""
+    data = {
+        "majors": {
+            "X": {"name": "Ngành X", "roadmap": {"1": ["A", "B"], "2": ["C", "D"], "3": ["E"]}}
+        },
+        "subjects": {
+            "A": {"name": "A", "credits": 3, "prereq": [], "difficulty": 2, "category": "Core"},
+            "B": {"name": "B", "credits": 4, "prereq": [], "difficulty": 4, "category": "Math"},
+            "C": {"name": "C", "credits": 3, "prerequisites": ["A"], "difficulty": 3, "category": "Core"},
+            "D": {"name": "D", "credits": 2, "prereq": ["A", "B"], "difficulty": 1, "category": "Gen"},
+            "E": {"name": "E", "credits": 3, "prereq": ["C", "D"], "difficulty": 5, "category": "Core"},
+        },
+    }
+    path = tmp_path / "curriculum.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    return str(path)
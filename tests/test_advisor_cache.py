@@ -0,0 +1,64 @@
+from advisor_cache import CachedAdvisor, LRUCache, state_key
+from decision_engine import AcademicAdvisor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_state_key_is_order_independent():
+    assert state_key({'A': 'B', 'C': 'F'}, ['X']) == state_key({'C': 'F', 'A': 'B'}, ['X'])
+    assert state_key({'A': 'B'}) != state_key({'A': 'C'})
+
+
+def test_lru_evicts_and_expires():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+    assert cache.evictions == 1
+    clock.now = 11
+    assert cache.get('a') is None
+
+
+def test_cached_results_match_and_count_hits(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    cached = CachedAdvisor(advisor)
+    transcript = {'A': 'B', 'B': 'F'}
+    first = cached.suggest_next_semester(transcript, 'X', 1, ['C'])
+    second = cached.suggest_next_semester(dict(reversed(list(transcript.items()))), 'X', 1, ['C'])
+    assert first == second == advisor.suggest_next_semester(transcript, 'X', 1, ['C'])
+    assert cached.calculate_gpa(transcript) == advisor.calculate_gpa(transcript)
+    assert cached.stats()['hits'] == 1 and cached.stats()['misses'] == 2
+
+    # Người gọi sửa kết quả không làm hỏng bản trong cache
+    first[0]['score'] = -1
+    first.clear()
+    assert cached.suggest_next_semester(transcript, 'X', 1, ['C']) == advisor.suggest_next_semester(
+        transcript, 'X', 1, ['C'])
+    easy = cached.find_easiest_subjects(transcript, [], major_code='X')
+    easy[0]['id'] = 'Z'
+    assert cached.find_easiest_subjects(transcript, [], major_code='X')[0]['id'] != 'Z'
+
+
+def test_incremental_updates_match_full_recompute(advisor):
+    cached = CachedAdvisor(advisor)
+    transcript = {}
+    steps = [('MAT101', 'A'), ('INT101', 'B+'), ('MAT102', 'F'), ('INT101', 'F'), ('MAT102', 'C')]
+    for sub_id, grade in steps:
+        transcript[sub_id] = grade
+        got = cached.suggest_next_semester(transcript, 'CNTT', 2, ['ENG101'], session_key='s1')
+        assert got == advisor.suggest_next_semester(transcript, 'CNTT', 2, ['ENG101'])
+        gpa, creds = cached.calculate_gpa(transcript, session_key='s1')
+        expected = advisor.calculate_gpa(transcript)
+        assert abs(gpa - expected[0]) < 1e-9 and creds == expected[1]
+    # Bước 3 và 4 cho lại tập môn đã qua từng gặp: gợi ý lấy thẳng từ cache
+    assert cached.stats()['hits'] == 2
+    assert cached.stats()['incremental'] == (len(steps) - 1) + 2
@@ -0,0 +1,60 @@
+import contextlib
+import inspect
+import io
+import time
+
+import run_benchmarks
+import synthetic
+from convert_data import run_conversion
+from decision_engine import AcademicAdvisor
+from graph_engine import CurriculumGraph
+
+
+def test_synthetic_curriculum_is_a_closed_dag():
+    data = synthetic.generate_curriculum(300, n_majors=3, seed=4)
+    assert data == synthetic.generate_curriculum(300, n_majors=3, seed=4)
+    graph = CurriculumGraph(data['subjects'], data['majors'])
+    assert not graph.has_cycle
+    for code, major in data['majors'].items():
+        in_major = {s for ids in major['roadmap'].values() for s in ids}
+        for sub_id in in_major:
+            assert set(graph.prereqs[sub_id]) <= in_major
+            assert all(graph.semester_of[code][p] < graph.semester_of[code][sub_id] for p in graph.prereqs[sub_id])
+
+
+def test_benchmark_covers_every_advisor_method(tmp_path):
+    results = run_benchmarks.bench_size(80, 30, 2, str(tmp_path), with_etl=True)
+    measured = {r['case'] for r in results}
+    public = {name for name, _ in inspect.getmembers(AcademicAdvisor, inspect.isfunction)
+              if not name.startswith('_')}
+    assert {f'AcademicAdvisor.{name}' for name in public} <= measured
+    assert 'convert_data.run_conversion' in measured
+    assert all(r['median_ms'] >= 0 and r['peak_kb'] >= 0 for r in results)
+
+
+def test_warm_start_from_snapshot_beats_json(tmp_path):
+    data = synthetic.generate_curriculum(3000, seed=0)
+    path = str(tmp_path / 'curriculum.json')
+    synthetic.write_curriculum(data, path)
+    xlsx = str(tmp_path / 'data.xlsx')
+    synthetic.write_workbook(data, xlsx)
+    kb_dir = str(tmp_path / 'kb')
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_conversion(xlsx, kb_dir)
+    AcademicAdvisor(kb_dir)  # lần đầu biên dịch snapshot
+
+    def best(source):
+        times = []
+        for _ in range(5):
+            start = time.perf_counter()
+            AcademicAdvisor(source)
+            times.append(time.perf_counter() - start)
+        return min(times)
+    # Đồ thị đọc thẳng từ mảng đã biên dịch: không tính lại đường găng / bitset
+    assert best(kb_dir) < best(path)
+
+
+def test_compare_flags_regressions():
+    baseline = {'results': [{'case': 'x', 'subjects': 10, 'median_ms': 1.0}]}
+    assert run_benchmarks.compare([{'case': 'x', 'subjects': 10, 'median_ms': 1.2}], baseline, 1.5) == []
+    assert len(run_benchmarks.compare([{'case': 'x', 'subjects': 10, 'median_ms': 2.0}], baseline, 1.5)) == 1
@@ -0,0 +1,76 @@
+import json
+
+import pandas as pd
+import pytest
+
+from convert_data import run_conversion
+
+
+def _write_workbook(path, curriculum_rows):
+    subjects = pd.DataFrame({
+        'SubjectID': ['A', 'B', 'C', 'D'],
+        'Name': ['Môn A', 'Môn B', 'Môn C', 'Môn D'],
+        'Credits': [3, 4, 2, 'x'],
+        'Theory': [2, 4, None, 1],
+        'Practice': [1, None, 2, 0],
+        'Semesters': ['1, 2', 1, None, '2'],
+        'Prerequisites': [None, 'A', 'A, B', 'C'],
+    })
+    curriculum = pd.DataFrame(curriculum_rows, columns=['MajorCode', 'SubjectID', 'SuggestedSem', 'Type'])
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        subjects.to_excel(writer, sheet_name='SubjectsList', index=False)
+        curriculum.to_excel(writer, sheet_name='Curriculum', index=False)
+
+
+CURRICULUM = [
+    ('CS', 'A', 1, 'Bắt buộc'), ('CS', 'B', 2, 'Bắt buộc'),
+    ('DS', 'A', 1, 'Bắt buộc'), ('CS', 'C', 3, 'Tự chọn'),
+]
+
+
+def _read(path):
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_conversion_output(tmp_path, streaming):
+    xlsx = tmp_path / "data.xlsx"
+    _write_workbook(xlsx, CURRICULUM)
+    out = tmp_path / "kb"
+    run_conversion(str(xlsx), str(out), streaming=streaming)
+
+    subjects = _read(out / "subjects.json")
+    assert [s['id'] for s in subjects] == ['A', 'B', 'C']
+    assert subjects[0] == {'id': 'A', 'name': 'Môn A', 'credits': 3, 'theory_credits': 2,
+                           'practice_credits': 1, 'semesters_offered': [1, 2]}
+    assert subjects[1]['semesters_offered'] == [1] and subjects[2]['semesters_offered'] == []
+    assert _read(out / "relations.json") == [
+        {'source': 'A', 'target': 'B', 'type': 'prerequisite'},
+        {'source': 'A', 'target': 'C', 'type': 'prerequisite'},
+        {'source': 'B', 'target': 'C', 'type': 'prerequisite'},
+    ]
+    assert _read(out / "majors" / "CS.json") == [
+        {'subject_id': 'A', 'suggested_semester': 1, 'type': 'Bắt buộc'},
+        {'subject_id': 'B', 'suggested_semester': 2, 'type': 'Bắt buộc'},
+        {'subject_id': 'C', 'suggested_semester': 3, 'type': 'Tự chọn'},
+    ]
+
+
+def test_incremental_rewrites_only_changed_outputs(tmp_path):
+    xlsx = tmp_path / "data.xlsx"
+    out = tmp_path / "kb"
+    _write_workbook(xlsx, CURRICULUM)
+    run_conversion(str(xlsx), str(out), incremental=True)
+
+    _write_workbook(xlsx, CURRICULUM[:2] + [('DS', 'B', 2, 'Bắt buộc')])
+    written = run_conversion(str(xlsx), str(out), incremental=True)
+    assert written == ['majors/CS.json', 'majors/DS.json']
+
+    _write_workbook(xlsx, [r for r in CURRICULUM if r[0] == 'CS'])
+    assert run_conversion(str(xlsx), str(out), incremental=True) == ['majors/CS.json', 'majors/DS.json (xóa)']
+    assert not (out / "majors" / "DS.json").exists()
+
+    # Output bị xóa tay: hash sheet không đổi nhưng vẫn phải ghi lại
+    (out / "subjects.json").unlink()
+    (out / "majors" / "CS.json").unlink()
+    assert run_conversion(str(xlsx), str(out), incremental=True) == ['subjects.json', 'majors/CS.json']
@@ -0,0 +1,130 @@
+import json
+import os
+
+import numpy as np
+
+import data_loader
+from data_loader import MajorRegistry, load_curriculum, load_knowledge_base, read_knowledge_base
+from decision_engine import AcademicAdvisor
+from graph_engine import CurriculumGraph
+
+
+def _write_kb(kb_dir):
+    os.makedirs(kb_dir / "majors")
+    subjects = [
+        {"id": "A", "name": "Môn A", "credits": 3, "theory_credits": 2, "practice_credits": 1, "semesters_offered": [1]},
+        {"id": "B", "name": "Môn B", "credits": 4, "theory_credits": 4, "practice_credits": 0, "semesters_offered": [1, 2]},
+        {"id": "C", "name": "Môn C", "credits": 2, "theory_credits": 2, "practice_credits": 0, "semesters_offered": []},
+    ]
+    relations = [
+        {"source": "A", "target": "C", "type": "prerequisite"},
+        {"source": "B", "target": "C", "type": "prerequisite"},
+    ]
+    major = [
+        {"subject_id": "A", "suggested_semester": 1, "type": "Bắt buộc"},
+        {"subject_id": "B", "suggested_semester": 1, "type": "Bắt buộc"},
+        {"subject_id": "C", "suggested_semester": 2, "type": "Tự chọn"},
+    ]
+    (kb_dir / "subjects.json").write_text(json.dumps(subjects, ensure_ascii=False), encoding='utf-8')
+    (kb_dir / "relations.json").write_text(json.dumps(relations), encoding='utf-8')
+    (kb_dir / "majors" / "KHMT.json").write_text(json.dumps(major, ensure_ascii=False), encoding='utf-8')
+
+
+def test_snapshot_round_trips_knowledge_base(tmp_path):
+    kb_dir = tmp_path / "knowledge_base"
+    _write_kb(kb_dir)
+    data = load_knowledge_base(str(kb_dir)).to_data()
+    assert data == read_knowledge_base(str(kb_dir))
+    assert data['majors']['KHMT']['roadmap'] == {'1': ['A', 'B'], '2': ['C']}
+    assert data['subjects']['C']['prerequisites'] == ['A', 'B']
+
+
+def test_snapshot_reused_until_sources_change(tmp_path, monkeypatch):
+    kb_dir = tmp_path / "knowledge_base"
+    _write_kb(kb_dir)
+    load_knowledge_base(str(kb_dir))
+
+    calls = []
+    real_compile = data_loader.compile_snapshot
+    monkeypatch.setattr(data_loader, 'compile_snapshot', lambda *a: calls.append(a) or real_compile(*a))
+    snapshot = load_knowledge_base(str(kb_dir))
+    assert calls == []
+    assert snapshot['prereq_indices'].tolist() == [0, 1]
+
+    (kb_dir / "relations.json").write_text("[]", encoding='utf-8')
+    snapshot = load_knowledge_base(str(kb_dir))
+    assert len(calls) == 1
+    assert snapshot['prereq_indices'].tolist() == []
+
+
+def test_advisor_accepts_knowledge_base_dir(tmp_path):
+    kb_dir = tmp_path / "knowledge_base"
+    _write_kb(kb_dir)
+    advisor = AcademicAdvisor(str(kb_dir))
+    assert [r['id'] for r in advisor.suggest_next_semester({'A': 'B'}, 'KHMT', 1)] == ['B']
+
+
+def test_majors_load_lazily_from_snapshot(tmp_path):
+    kb_dir = tmp_path / "knowledge_base"
+    _write_kb(kb_dir)
+    majors = load_curriculum(str(kb_dir))['majors']
+    assert list(majors) == ['KHMT'] and majors.names['KHMT'] == 'KHMT'
+    assert majors.loaded() == []
+    assert majors['KHMT']['subject_ids'] == ('A', 'B', 'C')
+    assert majors.loaded() == ['KHMT']
+
+
+def test_registry_evicts_least_recently_used_under_budget(mini_curriculum):
+    roadmaps = {code: {'1': [f'{code}{i}' for i in range(20)]} for code in ('M1', 'M2', 'M3')}
+    registry = MajorRegistry({c: c for c in roadmaps}, roadmaps.__getitem__)
+    one_major = MajorRegistry({'M1': 'M1'}, roadmaps.__getitem__)
+    one_major['M1']
+    registry.budget_bytes = int(one_major.resident_bytes * 2.5)
+    evicted = []
+    registry.on_evict(evicted.append)
+    registry['M1'], registry['M2'], registry['M1'], registry['M3']
+    assert evicted == ['M2'] and registry.loaded() == ['M1', 'M3']
+    assert registry.stats()['loads'] == 3
+
+    advisor = AcademicAdvisor(mini_curriculum, major_budget_bytes=1)
+    advisor.suggest_next_semester({}, 'X', 0)
+    assert advisor.majors.loaded() == ['X'] and 'X' in advisor.graph.roadmap_entries
+
+
+def test_budgeted_json_serves_roadmaps_from_snapshot(mini_curriculum):
+    with open(mini_curriculum, encoding='utf-8') as f:
+        source = json.load(f)
+    data = load_curriculum(mini_curriculum, major_budget_bytes=1)
+    majors = data['majors']
+    # Lộ trình đọc lại từ snapshot, không từ dict JSON đã parse: giải phóng mới có tác dụng
+    assert isinstance(getattr(majors._load_roadmap, '__self__', None), data_loader.CurriculumSnapshot)
+    assert majors['X']['roadmap'] == source['majors']['X']['roadmap']
+    assert data['subjects'] == source['subjects']
+    assert os.path.isdir(os.path.join(os.path.dirname(mini_curriculum), '.snapshot', 'curriculum'))
+
+
+def test_snapshot_graph_matches_compiled_graph(tmp_path):
+    kb_dir = tmp_path / "knowledge_base"
+    _write_kb(kb_dir)
+    graph = AcademicAdvisor(str(kb_dir)).graph
+    # Bitset đọc từ mmap chỉ đọc: vá đồ thị phải sao chép, không ghi vào snapshot
+    data = load_curriculum(str(kb_dir))
+    subjects = {**data['subjects'], 'C': {**data['subjects']['C'], 'prerequisites': ['A']}}
+    patched = graph.updated(subjects, data['majors'], ['C'])
+    assert patched.prereqs['C'] == ('A',)
+    assert np.array_equal(graph.prereq_bits, CurriculumGraph(data['subjects'], data['majors']).prereq_bits)
+
+    # Thêm môn tiên quyết ngoài danh mục để kiểm tra cả phần chỉ số mở rộng
+    relations = json.loads((kb_dir / "relations.json").read_text(encoding='utf-8'))
+    relations.append({"source": "Z", "target": "B", "type": "prerequisite"})
+    (kb_dir / "relations.json").write_text(json.dumps(relations), encoding='utf-8')
+    data = load_curriculum(str(kb_dir))
+    built = AcademicAdvisor(str(kb_dir)).graph
+    fresh = CurriculumGraph(data['subjects'], data['majors'])
+    assert built.ids == fresh.ids and built.n_known == fresh.n_known
+    assert built.prereqs == fresh.prereqs and built.dependents == fresh.dependents
+    assert built.prereq_idx == fresh.prereq_idx and built.topo_order == fresh.topo_order
+    assert built.offered == fresh.offered and built.has_cycle == fresh.has_cycle
+    for name in ('credits', 'difficulty', 'descendant_count', 'chain_depth', 'prereq_bits', 'easy_order_all'):
+        assert np.array_equal(getattr(built, name), getattr(fresh, name)), name
+    assert built.roadmap_entries['KHMT'] == fresh.roadmap_entries['KHMT']
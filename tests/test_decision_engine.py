@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import load_curriculum
+from decision_engine import AcademicAdvisor
+
+
+def test_graph_normalizes_both_prereq_keys(mini_curriculum):
+    graph = AcademicAdvisor(mini_curriculum).graph
+    assert graph.prereqs['C'] == ('A',)
+    assert graph.prereqs['D'] == ('A', 'B')
+    assert sorted(graph.dependents['A']) == ['C', 'D']
+    assert graph.semester_of['X']['E'] == 3
+
+
+def test_suggest_respects_prerequisites(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    recs = advisor.suggest_next_semester({'A': 'B'}, 'X', 1)
+    ids = [r['id'] for r in recs]
+    assert 'C' in ids and 'B' in ids
+    assert 'D' not in ids and 'E' not in ids
+
+
+def test_suggest_scores_unlock_power(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    recs = {r['id']: r for r in advisor.suggest_next_semester({}, 'X', 1, planned_courses=['B'])}
+    assert set(recs) == {'A'}
+    assert recs['A']['reason'].startswith('🔑')
+
+
+def test_real_curriculum_has_prerequisites(advisor):
+    recs = advisor.suggest_next_semester({}, 'CNTT', 0)
+    assert 'MAT102' not in [r['id'] for r in recs]
+    assert recs[0]['score'] >= recs[-1]['score']
+
+
+def test_bitset_mode_matches_set_mode(mini_curriculum):
+    by_set = AcademicAdvisor(mini_curriculum, eligibility_mode='set')
+    by_bits = AcademicAdvisor(mini_curriculum, eligibility_mode='bitset')
+    for transcript, planned in [({}, []), ({'A': 'B', 'B': 'F'}, ['C']), ({'A': 'A', 'B': 'D', 'C': 'C'}, [])]:
+        assert by_set.suggest_next_semester(transcript, 'X', 2, planned) == \
+            by_bits.suggest_next_semester(transcript, 'X', 2, planned)
+
+
+def test_eligible_mask_batch(mini_curriculum):
+    graph = AcademicAdvisor(mini_curriculum).graph
+    bits = np.stack([graph.encode([]), graph.encode(['A', 'B'])])
+    mask = graph.eligible_mask(bits)
+    assert mask.shape == (2, len(graph.ids))
+    assert not mask[0, graph.index['D']] and mask[1, graph.index['D']]
+
+
+def _cohort_frame(transcripts):
+    rows = [(student, sub_id, grade)
+            for student, transcript in transcripts.items()
+            for sub_id, grade in transcript.items()]
+    return pd.DataFrame(rows, columns=['student', 'subject', 'grade'])
+
+
+def test_advise_cohort_matches_single_student_api(advisor):
+    rng = np.random.default_rng(7)
+    grades = list(advisor.GRADE_POINTS)
+    subject_ids = list(advisor.subjects)
+    transcripts = {
+        f"SV{i:03d}": {s: grades[rng.integers(len(grades))]
+                       for s in rng.choice(subject_ids, size=rng.integers(0, 8), replace=False)}
+        for i in range(40)
+    }
+    # Khóa mới: SV chưa có điểm, hoặc chỉ có dòng 'Chưa học', chỉ xuất hiện trong roster
+    transcripts['SV900'] = {}
+    transcripts['SV901'] = {'MAT101': 'Chưa học'}
+    roster = sorted(transcripts)
+    summary, suggestions = advisor.advise_cohort(_cohort_frame(transcripts), 'CNTT', 2, roster=roster)
+    assert list(summary.index) == roster
+    for student, transcript in transcripts.items():
+        gpa, creds = advisor.calculate_gpa(transcript)
+        assert summary.loc[student, 'gpa'] == pytest.approx(gpa)
+        assert summary.loc[student, 'credits'] == creds
+        expected = advisor.suggest_next_semester(transcript, 'CNTT', 2)
+        got = suggestions[suggestions['student'] == student]
+        assert got.drop(columns=['student', 'rank']).to_dict('records') == expected
+
+
+def test_advise_cohort_reads_csv_and_limits_top_k(advisor, tmp_path):
+    path = tmp_path / "cohort.csv"
+    _cohort_frame({'S1': {'MAT101': 'A', 'INT101': 'F'}, 'S2': {'ENG101': 'B'}}).to_csv(path, index=False)
+    summary, suggestions = advisor.advise_cohort(str(path), 'CNTT', {'S1': 1, 'S2': 2}, top_k=2)
+    assert list(summary.index) == ['S1', 'S2']
+    assert suggestions.groupby('student')['rank'].max().tolist() == [2, 2]
+
+
+def test_plan_graduation_respects_prereqs_and_cap(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    result = advisor.plan_graduation({'A': 'F'}, 'X', 0, credit_cap=7)
+    done = set()
+    for sem_plan in result['semesters']:
+        assert sem_plan['credits'] <= 7
+        for sub_id in sem_plan['subjects']:
+            assert set(advisor.graph.prereqs[sub_id]) <= done
+        done.update(sem_plan['subjects'])
+    assert done == {'A', 'B', 'C', 'D', 'E'}
+    assert len(result['semesters']) == 3 and result['search_complete']
+
+
+def test_plan_graduation_honours_offered_terms(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    advisor.subjects['C']['semesters_offered'] = [1]
+    advisor.graph = type(advisor.graph)(advisor.subjects, advisor.majors)
+    result = advisor.plan_graduation({'A': 'A', 'B': 'A', 'D': 'B'}, 'X', 0)
+    assert [s['subjects'] for s in result['semesters']] == [['C'], ['E']]
+    assert result['semesters'][0]['semester'] % 2 == 1
+
+
+def test_plan_graduation_reports_coreq_and_offering_conflicts(mini_curriculum):
+    passed = {'A': 'A', 'B': 'A'}
+    together = AcademicAdvisor(mini_curriculum, rules={'corequisites': {'C': ['D'], 'D': ['C']}})
+    result = together.plan_graduation(passed, 'X', 0)
+    assert [s['subjects'] for s in result['semesters']] == [['C', 'D'], ['E']]
+
+    # C chỉ mở kỳ 1, D chỉ mở kỳ 2 mà phải học cùng nhau: không kỳ nào xếp được
+    together.subjects['C']['semesters_offered'] = [1]
+    together.subjects['D']['semesters_offered'] = [2]
+    together.graph = type(together.graph)(together.subjects, together.majors)
+    result = together.plan_graduation(passed, 'X', 0)
+    assert result['semesters'] == [] and result['unschedulable'] == ['C', 'D', 'E']
+    # Phần xếp được vẫn giữ, kỳ trống ở cuối bị cắt
+    result = together.plan_graduation({'A': 'A'}, 'X', 0)
+    assert [s['subjects'] for s in result['semesters']] == [['B']]
+    assert result['unschedulable'] == ['C', 'D', 'E']
+
+
+def test_plan_graduation_reports_missing_subjects(advisor):
+    result = advisor.plan_graduation({}, 'CNTT', 0)
+    assert result['unschedulable'] == ['PRJ301']
+
+
+def test_auto_fill_basket_maximizes_score_under_cap(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    transcript = {'A': 'A', 'B': 'B'}
+    candidates = advisor.suggest_next_semester(transcript, 'X', 1)
+    basket = advisor.auto_fill_basket(transcript, 'X', 1, credit_cap=3)
+    assert sum(c['credits'] for c in basket) <= 3
+    best_single = max((c for c in candidates if c['credits'] <= 3), key=lambda c: c['score'])
+    assert sum(c['score'] for c in basket) >= best_single['score']
+    full = advisor.auto_fill_basket(transcript, 'X', 1, planned_courses=['C'], credit_cap=5)
+    assert [c['id'] for c in full] == ['D']
+
+
+def test_auto_fill_basket_penalizes_difficulty(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    transcript = {'A': 'A', 'B': 'B', 'C': 'B', 'D': 'C'}
+    assert [c['id'] for c in advisor.auto_fill_basket(transcript, 'X', 2)] == ['E']
+    assert advisor.auto_fill_basket(transcript, 'X', 2, difficulty_penalty=20) == []
+
+
+def test_critical_path_metrics_are_transitive(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    assert advisor.critical_path('A') == {'unlocks': 3, 'chain': 2}
+    assert advisor.critical_path('C') == {'unlocks': 1, 'chain': 1}
+    assert advisor.critical_path('E') == {'unlocks': 0, 'chain': 0}
+    recs = {r['id']: r for r in advisor.suggest_next_semester({}, 'X', 0)}
+    assert recs['A']['reason'] == "🔑 Mở khóa cho 3 môn sau này"
+    assert recs['A']['score'] > recs['B']['score']
+
+
+def test_min_semesters_remaining(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    assert advisor.min_semesters_remaining({}, 'X') == 3
+    assert advisor.min_semesters_remaining({'A': 'A', 'B': 'B'}, 'X') == 2
+    assert advisor.min_semesters_remaining({}, 'X', credit_cap=4) == 4
+    done = {s: 'A' for s in 'ABCDE'}
+    assert advisor.min_semesters_remaining(done, 'X') == 0
+
+
+def test_find_easiest_subjects_walks_index(mini_curriculum):
+    for mode in ('set', 'bitset'):
+        advisor = AcademicAdvisor(mini_curriculum, eligibility_mode=mode)
+        # Môn rớt (F) vẫn được gợi ý, môn chưa đủ tiên quyết thì không
+        easy = advisor.find_easiest_subjects({'A': 'B', 'B': 'F'}, [], limit=4, major_code='X')
+        assert [s['id'] for s in easy] == ['C', 'B']
+        assert [s['id'] for s in advisor.find_easiest_subjects({'A': 'A', 'B': 'A'}, ['C'], limit=1)] == ['D']
+        assert [s['id'] for s in advisor.find_easiest_subjects({}, [], category='Math')] == ['B']
+
+
+def test_find_easiest_subjects_matches_full_sort(advisor):
+    transcript = {'MAT101': 'A', 'INT101': 'F', 'ENG101': 'C'}
+    passed = {'MAT101', 'ENG101'}
+    expected = sorted(
+        (s for s, sub in advisor.subjects.items()
+         if s not in passed and advisor.graph.is_eligible(s, passed)),
+        key=lambda s: (advisor.subjects[s].get('difficulty', 3), -advisor.subjects[s]['credits']))
+    got = advisor.find_easiest_subjects(transcript, [], limit=len(advisor.subjects))
+    assert [s['id'] for s in got] == expected
+
+
+def test_failure_impact_ranks_by_delay_and_blocked(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    rows = advisor.failure_impact({}, 'X', 0)
+    assert [(r['id'], r['delay'], r['blocked']) for r in rows] == [
+        ('A', 1, ['C', 'D', 'E']), ('B', 1, ['D', 'E']), ('C', 1, ['E']), ('D', 1, ['E']), ('E', 1, [])]
+    assert rows[0]['semester'] == 1 and rows[0]['graduation_semester'] == 4
+    assert advisor.failure_impact({s: 'A' for s in 'ABCDE'}, 'X', 3) == []
+
+
+def test_failure_impact_pruning_and_pool_match_full_replan(advisor):
+    transcript = {s: 'B' for s in advisor.majors['CNTT']['roadmap']['1']}
+    serial = advisor.failure_impact(transcript, 'CNTT', 1, workers=1)
+    # Môn không chặn môn nào và còn chỗ ở kỳ sau: không cần xếp lại, trễ 0 kỳ
+    assert {r['id'] for r in serial if r['delay'] == 0} == {'INT202', 'INT203', 'MAT201', 'PHY101'}
+    baseline = advisor.plan_graduation(transcript, 'CNTT', 1)['semesters']
+    full = advisor._failure_scenarios(list(transcript), 'CNTT', 1, 20, 2, baseline, [r['id'] for r in serial])
+    assert {r['id']: r['delay'] for r in full} == {r['id']: r['delay'] for r in serial}
+    assert advisor.failure_impact(transcript, 'CNTT', 1, workers=2) == serial
+
+    # Engine dựng từ dữ liệu trong bộ nhớ (không có file để worker đọc lại), đã sửa khác file
+    data = load_curriculum(advisor.data_path)
+    data['subjects']['PHY101'] = dict(data['subjects']['PHY101'], credits=30)
+    in_memory = AcademicAdvisor(None, data=data)
+    assert in_memory.failure_impact(transcript, 'CNTT', 1, workers=2) == \
+        in_memory.failure_impact(transcript, 'CNTT', 1, workers=1) != serial
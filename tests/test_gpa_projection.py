@@ -0,0 +1,36 @@
+import numpy as np
+
+import gpa_projection
+
+
+def test_credits_needed_grid_matches_scalar_formula(advisor):
+    targets = [2.5, 3.0, 3.5, 3.9]
+    perfs = [3.0, 3.6, 4.0]
+    grid = gpa_projection.credits_needed_grid(3.0, 60, targets, perfs)
+    for i, t in enumerate(targets):
+        for j, p in enumerate(perfs):
+            assert grid[i, j] == advisor.calculate_credits_needed(3.0, 60, t, p)
+
+
+def test_gpa_trajectory_shape_and_values():
+    traj = gpa_projection.gpa_trajectory(2.0, 30, [4.0, 2.0], [0, 30, 90])
+    assert traj.shape == (2, 3)
+    np.testing.assert_allclose(traj[0], [2.0, 3.0, 3.5])
+    np.testing.assert_allclose(traj[1], [2.0, 2.0, 2.0])
+    assert gpa_projection.gpa_trajectory(0.0, 0, [3.0], [0, 3])[0].tolist() == [0.0, 3.0]
+
+
+def test_grade_distribution_shifts_with_difficulty():
+    probs = gpa_projection.grade_distribution(3.0, [1, 5])
+    np.testing.assert_allclose(probs.sum(axis=-1), 1.0)
+    expected = probs @ gpa_projection.GRADE_LEVELS
+    assert expected[0] > expected[1]
+
+
+def test_simulate_gpa_is_seeded_and_bounded(advisor):
+    a = advisor.simulate_gpa({'MAT101': 'C'}, 'CNTT', 3.0, 3.6, n_sims=500, seed=1)
+    b = advisor.simulate_gpa({'MAT101': 'C'}, 'CNTT', 3.0, 3.6, n_sims=500, seed=1)
+    np.testing.assert_array_equal(a['bands'][50], b['bands'][50])
+    assert (a['bands'][10] <= a['bands'][90]).all()
+    assert 0.0 <= a['final_p_reach'] <= 1.0
+    assert a['credits'][-1] == sum(s['credits'] for s in advisor.subjects.values())
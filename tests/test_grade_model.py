@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+import gpa_projection
+from advisor_cache import CachedAdvisor
+from decision_engine import AcademicAdvisor
+from grade_model import LETTERS, PRIOR_WEIGHT, GradeModel
+from storage import AdvisorStore
+
+
+def _counts(model, sub_id):
+    return model.counts[model.index[sub_id]].tolist()
+
+
+def test_bulk_counts_and_online_updates_agree(tmp_path):
+    store = AdvisorStore(str(tmp_path / 'advisor.db'))
+    store.upsert_students([(f'SV{i:02d}', 'X', 2) for i in range(12)])
+    store.upsert_grades([(f'SV{i:02d}', 'A', 'A' if i < 9 else 'F') for i in range(12)]
+                        + [(f'SV{i:02d}', 'B', 'C') for i in range(4)] + [('SV00', 'C', 'Chưa học')])
+    model = GradeModel.from_store(store)
+    store.on_grades_changed(model.observe)
+    assert _counts(model, 'A') == [9, 0, 0, 0, 0, 0, 0, 3] and _counts(model, 'B')[LETTERS.index('C')] == 4
+    assert 'C' not in model.index
+
+    # Nộp/sửa/xóa điểm: cập nhật trực tuyến khớp với đếm lại toàn bộ
+    version = model.version
+    store.save_transcript('SV09', {'A': 'B+', 'C': 'A'})
+    store.save_transcript('SV00', {'B': 'C'})
+    store.save_transcript('SV01', {'A': 'A', 'B': 'C'})
+    assert model.version > version
+    fresh = GradeModel.from_store(store)
+    for sub_id in ('A', 'B', 'C'):
+        assert _counts(model, sub_id) == _counts(fresh, sub_id)
+
+    # Lô thô (không có cột n) từ iter_cohort cũng cộng được
+    raw = GradeModel()
+    for _, grades, _ in store.iter_cohort(chunk_students=5):
+        raw.add(grades)
+    assert _counts(raw, 'A') == _counts(fresh, 'A')
+
+
+def test_anonymous_sessions_are_not_learned(tmp_path):
+    store = AdvisorStore(str(tmp_path / 'advisor.db'))
+    store.upsert_students([('SV01', 'X', 2)])
+    store.upsert_students([('3f2c9a', 'X', 2)], anonymous=True)
+    store.save_transcript('SV01', {'A': 'B'})
+    store.save_transcript('3f2c9a', {'A': 'F', 'B': 'F'})
+    model = GradeModel.from_store(store)
+    store.on_grades_changed(model.observe)
+    assert _counts(model, 'A') == [0, 0, 1, 0, 0, 0, 0, 0] and 'B' not in model.index
+
+    # Điểm "thử" của phiên khách, hoặc của mã chưa có hồ sơ, không làm đổi mô hình
+    version = model.version
+    store.save_transcript('3f2c9a', {'A': 'A', 'B': 'A'})
+    store.save_transcript('NOPROFILE', {'A': 'A'})
+    assert model.version == version
+    store.save_transcript('SV01', {'A': 'A'})
+    assert model.version == version + 1
+
+
+def test_expected_points_blend_history_with_difficulty_prior():
+    model = GradeModel(capacity=1)
+    difficulty = [3, 3, 5]
+    prior = gpa_projection.grade_distribution(3.0, difficulty) @ gpa_projection.GRADE_LEVELS
+    np.testing.assert_allclose(model.expected_points(['A', 'B', 'C'], difficulty), prior)
+    np.testing.assert_allclose(model.effective_difficulty(['A', 'B', 'C'], difficulty), difficulty)
+
+    model.add(pd.DataFrame({'subject': ['A', 'B'], 'grade': ['A', 'F'], 'n': [200, 200]}))
+    points = model.expected_points(['A', 'B', 'C'], difficulty)
+    np.testing.assert_allclose(points[0], (200 * 4.0 + PRIOR_WEIGHT * prior[0]) / (200 + PRIOR_WEIGHT))
+    assert points[0] > prior[0] > points[1] and points[2] == prior[2]
+    eff = model.effective_difficulty(['A', 'B'], [3, 3])
+    assert eff[0] < 3 < eff[1]
+    assert model.sample_sizes(['A', 'C']).tolist() == [200, 0]
+
+
+def test_easy_wins_and_simulation_use_cohort_grades(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    cached = CachedAdvisor(advisor)
+    transcript = {'A': 'A', 'B': 'A'}
+    # Theo độ khó nhập tay: D (1) rồi C (3)
+    assert [s['id'] for s in cached.find_easiest_subjects(transcript, [], major_code='X')] == ['D', 'C']
+
+    model = GradeModel()
+    model.add(pd.DataFrame({'subject': ['C', 'D'], 'grade': ['A', 'D'], 'n': [50, 50]}))
+    easy = cached.find_easiest_subjects(transcript, [], major_code='X', grade_model=model)
+    assert [s['id'] for s in easy] == ['C', 'D'] and easy[0]['expected_points'] > 3.5
+    # Thứ tự xếp theo mô hình được ghi nhớ tới khi mô hình đổi phiên bản
+    ranked = advisor._expected_order[model]['X']
+    advisor.find_easiest_subjects({'A': 'A'}, [], major_code='X', grade_model=model)
+    assert advisor._expected_order[model]['X'] is ranked
+    # Điểm mới nộp làm đổi thứ hạng: kết quả cache cũ không được dùng lại
+    model.observe([('C', None, 'F')] * 200)
+    easy = cached.find_easiest_subjects(transcript, [], major_code='X', grade_model=model)
+    assert [s['id'] for s in easy] == ['D', 'C']
+
+    table = advisor.expected_grades(advisor.remaining_roadmap(transcript, 'X'), model)
+    assert table['id'].tolist() == ['C', 'D', 'E'] and table['samples'].tolist() == [250, 50, 0]
+    plain = advisor.simulate_gpa({'A': 'A'}, 'X', 3.0, 3.0, n_sims=400, seed=0)
+    calibrated = advisor.simulate_gpa({'A': 'A'}, 'X', 3.0, 3.0, n_sims=400, seed=0, grade_model=model)
+    assert calibrated['mean'][-1] < plain['mean'][-1]
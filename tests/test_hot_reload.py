@@ -0,0 +1,84 @@
+import json
+import os
+
+from advisor_cache import CachedAdvisor
+from decision_engine import AcademicAdvisor
+from hot_reload import CurriculumReloader
+
+
+def _edit(path, change):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    change(data)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    # Bảo đảm mtime khác lần ghi trước dù hệ thống file có độ phân giải thấp
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_swaps_in_incremental_rebuild(mini_curriculum):
+    cached = CachedAdvisor(AcademicAdvisor(mini_curriculum))
+    reloader = CurriculumReloader(cached, interval=0)
+    old = cached.advisor
+    assert reloader.check() is None
+    assert [s['id'] for s in cached.suggest_next_semester({'A': 'A'}, 'X', 1)] == ['C', 'B']
+
+    def change(data):
+        data['subjects']['C']['prerequisites'] = ['A', 'B']
+        data['subjects']['A']['credits'] = 4
+    _edit(mini_curriculum, change)
+    report = reloader.check()
+    assert report['incremental'] and report['changed_subjects'] == ['A', 'C'] and not report['errors']
+    assert cached.advisor is not old and reloader.reloads == 1
+    # Engine cũ (phiên đang chạy dở) không bị sửa
+    assert old.graph.prereqs['C'] == ('A',) and old.calculate_gpa({'A': 'A'}) == (4.0, 3)
+    assert [s['id'] for s in cached.suggest_next_semester({'A': 'A'}, 'X', 1)] == ['B']
+    assert cached.calculate_gpa({'A': 'A'}) == (4.0, 4)
+    assert cached.graph.critical_path('B') == (3, 2)
+
+
+def test_reload_rejects_cycles_and_dangling_prerequisites(mini_curriculum):
+    cached = CachedAdvisor(AcademicAdvisor(mini_curriculum))
+    reloader = CurriculumReloader(cached, interval=0)
+    engine = cached.advisor
+
+    _edit(mini_curriculum, lambda data: data['subjects']['A'].update(prereq=['E']))
+    assert 'Chu trình' in reloader.check()['errors'][0]
+    _edit(mini_curriculum, lambda data: data['subjects']['A'].update(prereq=['ZZZ999']))
+    assert 'ZZZ999' in reloader.check()['errors'][0]
+    _edit(mini_curriculum, lambda data: data.pop('subjects'))
+    assert reloader.check()['errors'][0].startswith('KeyError')
+    assert cached.advisor is engine and reloader.rejected == 3 and reloader.reloads == 0
+
+    # Sửa lại dữ liệu đúng (thêm môn mới: dựng lại toàn bộ) thì nạp bình thường
+    _edit(mini_curriculum, lambda data: data.update(subjects={
+        **{s: engine.subjects[s] for s in 'ABCDE'},
+        'F': {'name': 'F', 'credits': 2, 'prereq': ['E'], 'difficulty': 1, 'category': 'Gen'}}))
+    report = reloader.check()
+    assert not report['errors'] and not report['incremental'] and report['changed_subjects'] == ['F']
+    assert reloader.last_error is None and 'F' in cached.subjects
+
+
+def test_reload_watches_only_files_rebuild_reads(tmp_path, mini_curriculum):
+    kb_dir = tmp_path / "knowledge_base"
+    os.makedirs(kb_dir / "majors")
+    (kb_dir / "subjects.json").write_text(json.dumps([
+        {"id": "A", "name": "A", "credits": 3}, {"id": "B", "name": "B", "credits": 2}]), encoding='utf-8')
+    (kb_dir / "majors" / "X.json").write_text(json.dumps([
+        {"subject_id": "A", "suggested_semester": 1}, {"subject_id": "B", "suggested_semester": 2}]),
+        encoding='utf-8')
+    reloader = CurriculumReloader(CachedAdvisor(AcademicAdvisor(str(kb_dir))), interval=0)
+    # Trạng thái của tools/convert_data.py đổi sau mỗi lần chạy, không phải dữ liệu
+    (kb_dir / ".etl_state.json").write_text('{"SubjectsList": "x"}', encoding='utf-8')
+    assert reloader.check() is None
+    _edit(str(kb_dir / "subjects.json"), lambda rows: rows[1].update(credits=4))
+    assert reloader.check()['changed_subjects'] == ['B']
+
+    # Luật nạp từ file: sửa file luật cũng dựng lại engine
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text('{"credit_cap": 20}', encoding='utf-8')
+    cached = CachedAdvisor(AcademicAdvisor(mini_curriculum, rules=str(rules_path)))
+    reloader = CurriculumReloader(cached, interval=0)
+    _edit(str(rules_path), lambda rules: rules.update(credit_cap=12))
+    assert reloader.check() is not None and cached.rules.credit_cap == 12
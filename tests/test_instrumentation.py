@@ -0,0 +1,59 @@
+from advisor_cache import CachedAdvisor
+from decision_engine import AcademicAdvisor
+import instrumentation
+from instrumentation import Profiler
+
+
+def test_disabled_profiler_adds_no_wrappers():
+    profiler = Profiler(enabled=False)
+
+    def fn():
+        return 1
+    assert profiler.timed('x')(fn) is fn
+    assert profiler.section('a') is profiler.section('b')
+    advisor = object()
+    assert profiler.instrument(advisor, 'advisor') is advisor
+    profiler.count('cache.gpa.hit')
+    assert profiler.snapshot()['timings'] == {} and profiler.snapshot()['counters'] == {}
+
+
+def test_instrumented_advisor_records_calls_sessions_and_cache_hits(mini_curriculum, monkeypatch):
+    profiler = Profiler(enabled=True)
+    monkeypatch.setattr(instrumentation, 'PROFILER', profiler)
+    monkeypatch.setattr('advisor_cache.PROFILER', profiler)
+
+    engine = profiler.instrument(AcademicAdvisor(mini_curriculum), 'advisor')
+    cached = CachedAdvisor(engine)
+    profiler.add_gauge_source('cache', cached.stats)
+    profiler.bind_session('s1')
+    with profiler.section('ui.tab2'):
+        for _ in range(2):
+            cached.suggest_next_semester({'A': 'B'}, 'X', 1)
+
+    snap = profiler.snapshot()
+    assert snap['timings']['ui.tab2']['calls'] == 1
+    # Lần thứ hai lấy từ cache nên engine chỉ chấm điểm một lượt
+    assert snap['timings']['advisor.score_candidate']['calls'] == 2
+    assert snap['counters'] == {'cache.suggest.miss': 1, 'cache.suggest.hit': 1}
+    assert snap['gauges']['cache']['hits'] == 1
+    # Chỉ khối ngoài cùng được tính vào phiên
+    assert snap['top_sessions'][0]['session'] == 's1'
+    assert abs(snap['top_sessions'][0]['total_s'] - snap['timings']['ui.tab2']['total_s']) < 1e-12
+
+    text = profiler.to_prometheus()
+    assert 'advisor_calls_total{name="ui.tab2"} 1' in text
+    assert 'advisor_events_total{name="cache.suggest.hit"} 1' in text
+
+
+def test_prometheus_escapes_label_values():
+    profiler = Profiler(enabled=True)
+    with profiler.section('tab "GPA"\nC:\\plan'):
+        pass
+    profiler.count('a"b')
+    profiler.add_gauge_source('src\\1', lambda: {'n\n': 1})
+    text = profiler.to_prometheus()
+    assert 'advisor_calls_total{name="tab \\"GPA\\"\\nC:\\\\plan"} 1' in text
+    assert 'advisor_events_total{name="a\\"b"} 1' in text
+    assert 'advisor_gauge{source="src\\\\1",name="n\\n"} 1' in text
+    # Mỗi mẫu nằm trọn trên một dòng
+    assert all(line.startswith(('#', 'advisor_')) for line in text.splitlines())
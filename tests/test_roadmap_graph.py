@@ -0,0 +1,47 @@
+import json
+import os
+
+from decision_engine import AcademicAdvisor
+from roadmap_graph import LayoutCache, compute_layout, curriculum_version, render_html, student_overlay
+
+
+def test_layout_is_layered_by_semester(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    layout = compute_layout(advisor.graph, advisor.subjects, 'X')
+    pos = {n['id']: (n['x'], n['y']) for n in layout['nodes']}
+    assert [pos[s][0] for s in 'ABCDE'] == [0, 0, 220, 220, 440]
+    # Mọi cạnh tiên quyết đi từ cột trái sang cột phải
+    assert all(pos[a][0] < pos[b][0] for a, b in layout['edges'])
+    assert sorted(map(tuple, layout['edges'])) == [('A', 'C'), ('A', 'D'), ('B', 'D'), ('C', 'E'), ('D', 'E')]
+
+
+def test_layout_cache_reuses_disk_until_curriculum_changes(mini_curriculum, tmp_path):
+    advisor = AcademicAdvisor(mini_curriculum)
+    cache = LayoutCache(str(tmp_path / 'layout'))
+    layout = cache.get(advisor.graph, advisor.subjects, 'X')
+    assert cache.get(advisor.graph, advisor.subjects, 'X') is layout
+    # Tiến trình khác (cache mới) đọc lại từ đĩa, không tính lại
+    other = LayoutCache(str(tmp_path / 'layout'))
+    assert other.get(advisor.graph, advisor.subjects, 'X') == layout and other.computed == 0
+    assert len(os.listdir(tmp_path / 'layout')) == 1
+
+    with open(mini_curriculum, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['subjects']['E']['prereq'] = ['C']
+    with open(mini_curriculum, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    changed = AcademicAdvisor(mini_curriculum)
+    assert curriculum_version(changed.graph, changed.subjects, 'X') != \
+        curriculum_version(advisor.graph, advisor.subjects, 'X')
+    assert ['D', 'E'] not in other.get(changed.graph, changed.subjects, 'X')['edges']
+    assert other.computed == 1
+
+
+def test_overlay_and_html(mini_curriculum):
+    advisor = AcademicAdvisor(mini_curriculum)
+    layout = compute_layout(advisor.graph, advisor.subjects, 'X')
+    overlay = student_overlay(advisor.graph, {'A': 'A', 'B': 'F'}, ['C'], layout)
+    assert overlay == {'A': 'passed', 'B': 'failed', 'C': 'planned', 'D': 'locked', 'E': 'locked'}
+    html = render_html(layout, overlay)
+    assert '"physics": {"enabled": false}' in html and 'vis.Network' in html
+    assert '#f85149' in html
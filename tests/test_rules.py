@@ -0,0 +1,90 @@
+import json
+
+import pandas as pd
+import pytest
+
+from advisor_cache import CachedAdvisor
+from decision_engine import AcademicAdvisor
+from rules import DEFAULT_RULES, load_rules
+
+# C chỉ mở kỳ 1 của năm; D phải học cùng (hoặc sau) C; được học cải thiện điểm D
+RULES = {'corequisites': {'D': ['C']}, 'improvable_grades': ['D']}
+
+
+@pytest.fixture
+def ruled_curriculum(mini_curriculum):
+    with open(mini_curriculum, encoding='utf-8') as f:
+        data = json.load(f)
+    data['subjects']['C']['semesters_offered'] = [1]
+    with open(mini_curriculum, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return mini_curriculum
+
+
+def test_load_rules_merges_and_rejects_unknown_keys(tmp_path):
+    assert load_rules() == DEFAULT_RULES
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'credit_cap': 24}), encoding='utf-8')
+    assert load_rules(str(path))['credit_cap'] == 24
+    with pytest.raises(ValueError):
+        load_rules({'credit_limit': 24})
+
+
+def test_offering_corequisite_and_retake_rules(ruled_curriculum):
+    advisor = AcademicAdvisor(ruled_curriculum, rules=RULES)
+    passed = {'A': 'B', 'B': 'C'}
+    # Kỳ 2 (kỳ thứ 2 trong năm): C không mở nên D thiếu môn song hành
+    assert [r['id'] for r in advisor.suggest_next_semester(passed, 'X', 1)] == []
+    assert {r['id'] for r in advisor.suggest_next_semester(passed, 'X', 2)} == {'C', 'D'}
+    assert {r['id'] for r in advisor.suggest_next_semester(passed, 'X', 2, ['C'])} == {'D'}
+
+    recs = {r['id']: r for r in advisor.suggest_next_semester({'A': 'D'}, 'X', 2)}
+    assert recs['A']['reason'] == "♻️ Học cải thiện điểm" and recs['A']['score'] == advisor.RETAKE_SCORE
+
+
+def test_rule_modes_and_cache_agree(ruled_curriculum):
+    by_set = AcademicAdvisor(ruled_curriculum, eligibility_mode='set', rules=RULES)
+    by_bits = AcademicAdvisor(ruled_curriculum, eligibility_mode='bitset', rules=RULES)
+    cached = CachedAdvisor(AcademicAdvisor(ruled_curriculum, rules=RULES))
+    transcript = {}
+    steps = [('A', 'D'), ('B', 'C'), ('C', 'F'), ('A', 'B'), ('C', 'B+')]
+    for sem in (1, 2):
+        for sub_id, grade in steps:
+            transcript[sub_id] = grade
+            expected = by_set.suggest_next_semester(transcript, 'X', sem)
+            assert by_bits.suggest_next_semester(transcript, 'X', sem) == expected
+            assert cached.suggest_next_semester(transcript, 'X', sem, session_key='s') == expected
+        transcript = {}
+
+    rows = [('s1', 'A', 'D'), ('s1', 'B', 'C'), ('s2', 'A', 'B'), ('s2', 'B', 'A'), ('s2', 'C', 'B')]
+    _, suggestions = by_set.advise_cohort(pd.DataFrame(rows, columns=['student', 'subject', 'grade']), 'X', 2)
+    for student in ('s1', 's2'):
+        transcript = {s: g for st, s, g in rows if st == student}
+        got = suggestions[suggestions['student'] == student].drop(columns=['student', 'rank'])
+        assert got.to_dict('records') == by_set.suggest_next_semester(transcript, 'X', 2)
+
+
+def test_check_plan_reports_violations(ruled_curriculum):
+    advisor = AcademicAdvisor(ruled_curriculum, rules={**RULES, 'credit_cap': 4})
+    report = advisor.check_plan({'A': 'B', 'B': 'C'}, ['C', 'D'], 1)
+    assert report['credits'] == 5 and report['fee'] == 5 * DEFAULT_RULES['fee_per_credit']
+    assert report['over_cap'] and report['not_offered'] == ['C']
+    assert report['coreq_missing'] == {}
+    assert advisor.check_plan({'A': 'B', 'B': 'C'}, ['D'], 2)['coreq_missing'] == {'D': ['C']}
+    assert len(report['violations']) == 2
+
+
+def test_check_cohort_plans_matches_single_student(ruled_curriculum):
+    advisor = AcademicAdvisor(ruled_curriculum, rules=RULES)
+    records = pd.DataFrame([('s1', 'A', 'B'), ('s1', 'B', 'C'), ('s2', 'A', 'F')],
+                           columns=['student', 'subject', 'grade'])
+    plans = pd.DataFrame([('s1', 'D'), ('s2', 'A'), ('s2', 'C'), ('s3', 'B')], columns=['student', 'subject'])
+    summary = advisor.check_cohort_plans(records, plans, {'s1': 2, 's2': 1, 's3': 2})
+    for student, sem in {'s1': 2, 's2': 1, 's3': 2}.items():
+        transcript = {s: g for st, s, g in records.itertuples(index=False) if st == student}
+        report = advisor.check_plan(transcript, list(plans.loc[plans['student'] == student, 'subject']), sem)
+        row = summary.loc[student]
+        assert row['credits'] == report['credits']
+        assert row['not_offered'] == len(report['not_offered'])
+        assert row['coreq_missing'] == len(report['coreq_missing'])
+        assert row['valid'] == (not report['violations'])
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+
+import load_test
+from conftest import CURRICULUM_PATH
+import service
+from decision_engine import AcademicAdvisor
+from service import AdvisorService
+
+
+def _serve(data_path, scenario):
+    """Chạy dịch vụ 1 worker trên cổng trống, gọi scenario(fetch, url) rồi dọn dẹp"""
+    service = AdvisorService(data_path, workers=1)
+
+    async def main():
+        sock, port = bind_unused_port()
+        server = HTTPServer(service.make_app())
+        server.add_sockets([sock])
+        url = f'http://127.0.0.1:{port}'
+        client = AsyncHTTPClient()
+
+        async def fetch(path, body=None):
+            try:
+                response = await client.fetch(
+                    url + path, method='GET' if body is None else 'POST',
+                    body=None if body is None else (body if isinstance(body, str) else json.dumps(body)))
+            except HTTPClientError as e:
+                response = e.response
+            text = response.body.decode('utf-8')
+            return response.code, (json.loads(text) if path != '/metrics' else text)
+        try:
+            return await scenario(fetch, url)
+        finally:
+            server.stop()
+
+    try:
+        return asyncio.run(main())
+    finally:
+        service.close()
+
+
+def test_endpoints_match_engine(mini_curriculum):
+    async def scenario(fetch, url):
+        transcript = {'A': 'A', 'B': 'F'}
+        assert (await fetch('/health'))[0] == 200
+        code, gpa = await fetch('/gpa', {'transcript': transcript})
+        assert code == 200 and gpa == {'gpa': 12 / 7, 'credits': 7}
+        code, sugg = await fetch('/suggestions', {'transcript': transcript, 'major_code': 'X', 'current_sem': 1})
+        assert code == 200 and {s['id'] for s in sugg} == {'B', 'C'}
+        code, need = await fetch('/credits-needed', {'current_gpa': 3.9, 'current_credits': 100,
+                                                     'target_gpa': 4.0, 'performance_gpa': 4.0})
+        assert code == 200 and need == {'credits_needed': None, 'feasible': False}
+        code, easy = await fetch('/easiest-subjects', {'transcript': transcript, 'limit': 2})
+        assert code == 200 and [s['id'] for s in easy] == ['C', 'B']
+        code, batch = await fetch('/batch', {'requests': [{'op': 'gpa', 'transcript': transcript},
+                                                          {'op': 'suggestions', 'transcript': transcript}]})
+        assert code == 200 and batch['results'][0]['result'] == gpa and 'error' in batch['results'][1]
+        assert 'advisor_calls_total{name="http.gpa"} 1' in (await fetch('/metrics'))[1]
+    _serve(mini_curriculum, scenario)
+
+
+def test_bad_requests_return_400(mini_curriculum):
+    async def scenario(fetch, url):
+        code, body = await fetch('/gpa', 'không phải json')
+        assert code == 400 and 'JSON' in body['error']
+        code, body = await fetch('/suggestions', {'transcript': {}})
+        assert code == 400 and 'major_code' in body['error']
+        code, body = await fetch('/batch', {'requests': [{'op': 'xoa-du-lieu'}]})
+        assert code == 400 and 'xoa-du-lieu' in body['error']
+    _serve(mini_curriculum, scenario)
+
+
+def test_unexpected_error_fails_only_its_request(mini_curriculum, monkeypatch):
+    monkeypatch.setattr(service, '_ADVISOR', AcademicAdvisor(mini_curriculum))
+
+    def explode(advisor, payload):
+        raise RuntimeError("hỏng")
+    monkeypatch.setitem(service.OPS, 'explode', explode)
+    transcript = {'A': 'A', 'B': 'F'}
+    results = service.run_batch([
+        ('gpa', {'transcript': transcript}),
+        # JSON 1e999 -> inf: int(inf) ném OverflowError
+        ('suggestions', {'transcript': transcript, 'major_code': 'X', 'current_sem': float('inf')}),
+        ('explode', {}),
+        ('easiest-subjects', {'transcript': transcript, 'limit': 1}),
+    ])
+    assert results[0] == {'result': {'gpa': 12 / 7, 'credits': 7}}
+    assert results[1]['error'].startswith('OverflowError') and results[1]['internal']
+    assert results[2] == {'error': 'RuntimeError: hỏng', 'internal': True}
+    assert [s['id'] for s in results[3]['result']] == ['C']
+
+
+def test_load_harness_batches_concurrent_requests():
+    with open(CURRICULUM_PATH, 'r', encoding='utf-8') as f:
+        requests = load_test.build_requests(json.load(f), 120, seed=1)
+
+    async def scenario(fetch, url):
+        return await load_test.run_load(url, requests, concurrency=16)
+    stats = _serve(CURRICULUM_PATH, scenario)
+    assert stats['requests'] == 120 and stats['errors'] == 0
+    assert stats['p50_ms'] <= stats['p99_ms']
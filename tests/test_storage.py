@@ -0,0 +1,138 @@
+import threading
+
+import pandas as pd
+
+from storage import MIGRATIONS, AdvisorStore, advise_department, check_department_plans
+
+
+def _fill(store):
+    store.upsert_students([(f'SV{i:02d}', 'CNTT' if i % 2 else 'KTPM', 1 + i % 3) for i in range(20)])
+    store.upsert_grades([(f'SV{i:02d}', sub_id, grade) for i in range(20)
+                         for sub_id, grade in (('MAT101', 'A'), ('INT101', 'F' if i % 4 else 'B'))])
+
+
+def test_migrations_are_idempotent(tmp_path):
+    path = str(tmp_path / 'advisor.db')
+    store = AdvisorStore(path)
+    assert store.migrate() == len(MIGRATIONS)
+    store.close()
+    assert AdvisorStore(path).migrate() == len(MIGRATIONS)
+
+
+def test_concurrent_first_open_migrates_once(tmp_path):
+    # Nhiều tiến trình (app + advisor-api) cùng mở một DB chưa có bảng nào
+    barrier = threading.Barrier(6)
+    errors = []
+
+    def open_store(k):
+        path = str(tmp_path / f'advisor{k}.db')
+        barrier.wait()
+        try:
+            assert AdvisorStore(path).migrate() == len(MIGRATIONS)
+        except Exception as e:
+            errors.append(e)
+
+    for k in range(5):
+        threads = [threading.Thread(target=open_store, args=(k,)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert errors == []
+
+
+def test_transcript_and_plan_round_trip(tmp_path):
+    store = AdvisorStore(str(tmp_path / 'advisor.db'))
+    _fill(store)
+    assert store.get_transcript('SV00') == {'MAT101': 'A', 'INT101': 'B'}
+    assert store.save_transcript('SV00', {'MAT101': 'B+', 'ENG101': 'C'}) == 3
+    assert store.get_transcript('SV00') == {'MAT101': 'B+', 'ENG101': 'C'}
+    store.save_plan('SV01', 3, ['MAT102', 'INT102'])
+    store.save_plan('SV01', 3, ['INT102', 'PHY101'])
+    assert store.get_plan('SV01', 3) == ['INT102', 'PHY101']
+    assert store.get_student('SV01') == {'major_code': 'CNTT', 'current_sem': 2}
+    assert list(store.students('CNTT', 2)['student']) == ['SV01', 'SV07', 'SV13', 'SV19']
+
+
+def test_iter_cohort_filters_and_chunks(tmp_path):
+    store = AdvisorStore(str(tmp_path / 'advisor.db'))
+    _fill(store)
+    store.save_plan('SV01', 3, ['MAT102'])
+    chunks = list(store.iter_cohort('CNTT', chunk_students=3))
+    assert [len(students) for students, _, _ in chunks] == [3, 3, 3, 1]
+    grades = pd.concat([g for _, g, _ in chunks])
+    assert set(grades['student']) == {f'SV{i:02d}' for i in range(1, 20, 2)}
+    assert len(grades) == 20
+    plans = pd.concat([p for _, _, p in chunks])
+    assert plans.values.tolist() == [['SV01', 'MAT102']]
+
+
+def test_advise_department_matches_in_memory_cohort(tmp_path, advisor):
+    store = AdvisorStore(str(tmp_path / 'advisor.db'))
+    _fill(store)
+    students = store.students('CNTT').set_index('student')['current_sem']
+    records = pd.concat([g for _, g, _ in store.iter_cohort('CNTT')])
+    expected = advisor.advise_cohort(records, 'CNTT', students, top_k=3)[1]
+    got = pd.concat([s for _, s in advise_department(advisor, store, 'CNTT', top_k=3, chunk_students=4)])
+    pd.testing.assert_frame_equal(got.reset_index(drop=True), expected)
+    summary = pd.concat(check_department_plans(advisor, store, 'CNTT', chunk_students=4))
+    assert len(summary) == 10 and summary['valid'].all()
+
+
+def test_advise_department_includes_students_without_grades(tmp_path, advisor):
+    store = AdvisorStore(str(tmp_path / 'advisor.db'))
+    _fill(store)
+    # Cả một lô chỉ gồm SV khóa mới (chưa có dòng điểm nào)
+    store.upsert_students([(f'SV9{i}', 'CNTT', 0) for i in range(4)])
+    runs = list(advise_department(advisor, store, 'CNTT', top_k=3, chunk_students=4))
+    summary = pd.concat([s for s, _ in runs])
+    suggestions = pd.concat([s for _, s in runs])
+    assert len(summary) == 14 and summary.loc['SV90', 'credits'] == 0
+    expected = advisor.suggest_next_semester({}, 'CNTT', 0)[:3]
+    assert suggestions[suggestions['student'] == 'SV93']['id'].tolist() == [c['id'] for c in expected]
+
+
+def test_pool_handles_concurrent_writers(tmp_path):
+    store = AdvisorStore(str(tmp_path / 'advisor.db'), pool_size=2)
+
+    def write(worker):
+        for i in range(25):
+            store.save_transcript(f'W{worker}', {f'S{j}': 'A' for j in range(i + 1)})
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(len(store.get_transcript(f'W{w}')) == 25 for w in range(6))
+
+
+def test_access_tokens_gate_existing_profiles(tmp_path):
+    store = AdvisorStore(str(tmp_path / 'advisor.db'))
+    _fill(store)
+    # Mã đã có dữ liệu (kể cả SV nạp từ CSV) không nhận quyền được, chưa có mã thì không mở được
+    assert store.claim_student('SV00') is None and not store.check_token('SV00', None)
+    token = store.claim_student('SV99', 'CNTT', 2)
+    assert token and store.claim_student('SV99') is None
+    assert store.check_token('SV99', token) and not store.check_token('SV99', token + 'x')
+    assert store.get_student('SV99') == {'major_code': 'CNTT', 'current_sem': 2}
+    issued = store.issue_token('SV00')
+    assert store.check_token('SV00', issued) and not store.check_token('SV00', 'đoán bừa')
+    # Cập nhật hồ sơ không làm mất mã
+    store.upsert_students([('SV00', 'CNTT', 3)])
+    assert store.check_token('SV00', issued)
+
+
+def test_import_without_semester_keeps_existing_students(tmp_path):
+    store = AdvisorStore(str(tmp_path / 'advisor.db'))
+    store.upsert_students([('SV01', 'CNTT', 5)])
+    csv = tmp_path / 'grades.csv'
+    csv.write_text("student,subject,grade\nSV01,MAT101,A\nSV02,MAT101,B\n", encoding='utf-8')
+    assert store.import_csv(str(csv), 'KTPM') == 2
+    assert store.get_student('SV01') == {'major_code': 'CNTT', 'current_sem': 5}
+    assert store.get_student('SV02') == {'major_code': 'KTPM', 'current_sem': 1}
+    assert store.get_transcript('SV01') == {'MAT101': 'A'}
+
+    csv.write_text("student,subject,grade,current_sem\nSV01,MAT102,B,6\n", encoding='utf-8')
+    store.import_csv(str(csv), 'CNTT')
+    assert store.get_student('SV01') == {'major_code': 'CNTT', 'current_sem': 6}
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+from advisor_cache import CachedAdvisor, state_key
+from transcript import GRADES, CompactTranscript
+
+
+def test_round_trip_and_dict_behaviour(advisor):
+    source = {'MAT101': 'A', 'INT101': 'F', 'ENG101': 'Chưa học', 'XYZ999': 'B', 'PHY101': '??'}
+    compact = advisor.compact_transcript(source)
+    assert isinstance(compact, CompactTranscript) and not hasattr(compact, '__dict__')
+    assert compact == source and compact.to_dict() == source and len(compact) == 5
+    # Môn ngoài danh mục / điểm lạ giữ nguyên ở phần dict phụ
+    assert compact.extra == {'XYZ999': 'B', 'PHY101': '??'}
+
+    compact['INT101'] = 'B+'
+    compact['PHY101'] = 'C'
+    del compact['ENG101']
+    compact['MAT102'] = 'D'
+    assert compact.to_dict() == {'MAT101': 'A', 'INT101': 'B+', 'XYZ999': 'B', 'PHY101': 'C', 'MAT102': 'D'}
+    assert compact.extra == {'XYZ999': 'B'}
+    assert list(compact.idx) == sorted(compact.idx)
+    with pytest.raises(KeyError):
+        del compact['ENG101']
+    assert state_key(compact) == state_key(compact.to_dict())
+
+
+def test_gpa_matches_dict_path(advisor):
+    rng = random.Random(3)
+    ids = list(advisor.subjects) + ['XYZ999']
+    for _ in range(30):
+        transcript = {s: rng.choice(GRADES + ('??',)) for s in rng.sample(ids, rng.randint(0, len(ids)))}
+        compact = advisor.compact_transcript(transcript)
+        gpa, credits = advisor.calculate_gpa(compact)
+        expected_gpa, expected_credits = advisor.calculate_gpa(transcript)
+        assert gpa == pytest.approx(expected_gpa) and credits == expected_credits
+        # Sửa điểm làm mất tổng đã ghi nhớ
+        if transcript:
+            compact[next(iter(transcript))] = 'A'
+            transcript[next(iter(transcript))] = 'A'
+            assert advisor.calculate_gpa(compact)[0] == pytest.approx(advisor.calculate_gpa(transcript)[0])
+
+
+def test_cached_advisor_accepts_compact_transcripts(advisor):
+    cached = CachedAdvisor(advisor)
+    compact = advisor.compact_transcript({'MAT101': 'A', 'INT101': 'F'})
+    plain = compact.to_dict()
+    assert cached.calculate_gpa(compact, session_key='s') == advisor.calculate_gpa(plain)
+    assert cached.stats()['misses'] == 0
+    assert cached.suggest_next_semester(compact, 'CNTT', 1) == advisor.suggest_next_semester(plain, 'CNTT', 1)
+    assert cached.find_easiest_subjects(compact, []) == advisor.find_easiest_subjects(plain, [])
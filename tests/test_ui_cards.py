@@ -0,0 +1,14 @@
+import ui_cards
+
+
+def test_cards_are_memoized_by_content():
+    ui_cards.recommendation_card.cache_clear()
+    html = ui_cards.recommendation_card(3, 'Toán rời rạc', 3, 2, 'Môn tiên quyết')
+    assert 'p-3' in html and '🔥' in html and '⭐⭐<' in html
+    assert ui_cards.recommendation_card(3, 'Toán rời rạc', 3, 2, 'Môn tiên quyết') is html
+    assert ui_cards.recommendation_card.cache_info().hits == 1
+
+    dashboard = ui_cards.plan_dashboard(24, 20, 3.5, 9600000.0, True, 'Nặng')
+    assert '#ff6b6b' in dashboard and '9,600,000 đ' in dashboard and 'width:70.0%' in dashboard
+    assert 'Kỳ vọng' not in ui_cards.easy_win_card('A', 3, 1, None)
+    assert 'Kỳ vọng: 3.4' in ui_cards.easy_win_card('A', 3, 1, 3.42)
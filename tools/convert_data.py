@@ -1,4 +1,6 @@
 import pandas as pd
+import argparse
+import hashlib
 import json
 import os
 import sys
@@ -7,102 +9,206 @@ import sys
 INPUT_EXCEL_PATH = 'data/raw/data_daotao.xlsx'
 OUTPUT_BASE_DIR = 'data/knowledge_base'
 
-def clean_list_string(text):
+# File lưu hash nội dung từng sheet/ngành cho chế độ incremental
+STATE_FILE = '.etl_state.json'
+# Workbook lớn hơn ngưỡng này sẽ được đọc bằng openpyxl read-only
+STREAMING_MIN_BYTES = 20 * 1024 * 1024
+
+
+def read_sheet(path, sheet_name, streaming=False):
     """
-    Hàm hỗ trợ: Chuyển chuỗi 'INT1001, INT1002' thành list ['INT1001', 'INT1002'].
+    Đọc một sheet thành DataFrame.
+    streaming=True: đọc bằng openpyxl read-only (không dựng cây ô của cả
+    workbook, chỉ sheet cần đọc). Kết quả vẫn là DataFrame đầy đủ của sheet
+    vì hash nội dung và các bước xử lý cần toàn bộ dữ liệu.
     """
-    if pd.isna(text) or str(text).strip() == "":
-        return []
-    return [item.strip() for item in str(text).split(',') if item.strip()]
+    if not streaming:
+        df = pd.read_excel(path, sheet_name=sheet_name, engine='openpyxl')
+    else:
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb[sheet_name].iter_rows(values_only=True)
+            header = next(rows, ())
+            # Bỏ các dòng trống hoàn toàn như pandas
+            df = pd.DataFrame((r for r in rows if any(v is not None for v in r)), columns=header)
+        finally:
+            wb.close()
+    # Chuẩn hóa tên cột (đề phòng người dùng viết hoa/thường không chuẩn)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def content_hash(df):
+    """Hash nội dung sheet (không phụ thuộc cách đọc) để phát hiện thay đổi"""
+    as_text = df.astype(object).where(df.notna(), '').astype(str)
+    row_hashes = pd.util.hash_pandas_object(as_text, index=False).to_numpy()
+    h = hashlib.sha256(','.join(df.columns).encode('utf-8'))
+    h.update(row_hashes.tobytes())
+    return h.hexdigest()
+
+
+def split_list_column(series):
+    """
+    Vector hóa: cột 'INT1001, INT1002' -> Series đã explode (index = dòng gốc),
+    bỏ phần tử rỗng.
+    """
+    if pd.api.types.is_float_dtype(series):
+        # Cột chỉ toàn số (vd. kỳ '1') bị pandas đọc thành 1.0
+        series = series.astype('Int64')
+    items = series.astype('string').fillna('').str.split(',').explode().str.strip()
+    return items[items.notna() & (items != '')]
+
+
+def build_subjects(df_subjects):
+    """Trả về (subjects_data, relations_data) từ sheet SubjectsList"""
+    df = df_subjects.copy()
+    df['SubjectID'] = df['SubjectID'].astype('string').str.strip()
+    credits = pd.to_numeric(df['Credits'], errors='coerce')
+    bad = credits.isna() | df['SubjectID'].isna()
+    for sub_id in df.loc[bad, 'SubjectID'].fillna('Unknown'):
+        print(f"⚠️ Cảnh báo lỗi dòng môn {sub_id}: thiếu/sai số tín chỉ")
+    df, credits = df[~bad], credits[~bad]
+
+    # Lý thuyết/Thực hành: để trống thì mặc định là 0
+    theory = pd.to_numeric(df.get('Theory'), errors='coerce').fillna(0).astype(int) if 'Theory' in df else 0
+    practice = pd.to_numeric(df.get('Practice'), errors='coerce').fillna(0).astype(int) if 'Practice' in df else 0
+
+    sems = split_list_column(df['Semesters'])
+    sems = sems[sems.str.isdigit()].astype(int)
+    sems_by_row = sems.groupby(level=0).agg(list)
+
+    out = pd.DataFrame({
+        'id': df['SubjectID'],
+        'name': df['Name'].astype(str).str.strip(),
+        'credits': credits.astype(int),
+        'theory_credits': theory,
+        'practice_credits': practice,
+    })
+    out['semesters_offered'] = sems_by_row.reindex(out.index).apply(
+        lambda v: v if isinstance(v, list) else [])
+    subjects_data = out.to_dict('records')
 
-def run_conversion():
+    # Xử lý Tiên quyết: explode một lần cho cả sheet
+    prereqs = split_list_column(df['Prerequisites'])
+    relations = pd.DataFrame({
+        'source': prereqs.to_numpy(),
+        'target': df['SubjectID'].loc[prereqs.index].to_numpy(),
+        'type': 'prerequisite',
+    })
+    relations_data = relations.astype({'source': object, 'target': object}).to_dict('records')
+    return subjects_data, relations_data
+
+
+def build_majors(df_curriculum):
+    """Tách chương trình từng ngành bằng một lần groupby -> {mã ngành: (records, hash)}"""
+    df = pd.DataFrame({
+        'MajorCode': df_curriculum['MajorCode'].astype(str).str.strip(),
+        'subject_id': df_curriculum['SubjectID'].astype(str).str.strip(),
+        'suggested_semester': pd.to_numeric(df_curriculum['SuggestedSem']).astype(int),
+        'type': df_curriculum['Type'].astype(str).str.strip(),
+    })
+    majors = {}
+    for code, group in df.groupby('MajorCode', sort=False):
+        group = group.drop(columns='MajorCode')
+        majors[code] = (group.to_dict('records'), content_hash(group))
+    return majors
+
+
+def write_json(path, data):
+    """Ghi JSON; bỏ qua nếu nội dung không đổi. Trả về True nếu file được ghi"""
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+
+def run_conversion(input_path=INPUT_EXCEL_PATH, output_dir=OUTPUT_BASE_DIR,
+                   incremental=False, streaming=None):
     print("🚀 Bắt đầu quy trình chuyển đổi dữ liệu (ETL)...")
-    
+
     # 1. Kiểm tra file Excel
-    if not os.path.exists(INPUT_EXCEL_PATH):
-        print(f"❌ LỖI: Không tìm thấy file tại '{INPUT_EXCEL_PATH}'")
+    if not os.path.exists(input_path):
+        print(f"❌ LỖI: Không tìm thấy file tại '{input_path}'")
         return
 
+    if streaming is None:
+        streaming = os.path.getsize(input_path) >= STREAMING_MIN_BYTES
+
     # 2. Đọc file Excel
     try:
-        print(f"📂 Đang đọc file: {INPUT_EXCEL_PATH}...")
-        df_subjects = pd.read_excel(INPUT_EXCEL_PATH, sheet_name='SubjectsList', engine='openpyxl')
-        df_curriculum = pd.read_excel(INPUT_EXCEL_PATH, sheet_name='Curriculum', engine='openpyxl')
+        print(f"📂 Đang đọc file: {input_path}{' (read-only)' if streaming else ''}...")
+        df_subjects = read_sheet(input_path, 'SubjectsList', streaming)
+        df_curriculum = read_sheet(input_path, 'Curriculum', streaming)
     except Exception as e:
         print(f"❌ Lỗi khi đọc file Excel: {e}")
         return
 
+    os.makedirs(output_dir, exist_ok=True)
+    state_path = os.path.join(output_dir, STATE_FILE)
+    state = {}
+    if incremental and os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    new_state = {'majors': {}}
+    written = []
+
     # --- BƯỚC 3: XỬ LÝ DANH SÁCH MÔN (SubjectsList) ---
-    subjects_data = []
-    relations_data = []
+    subjects_hash = content_hash(df_subjects)
+    new_state['SubjectsList'] = subjects_hash
+    outputs_exist = all(os.path.exists(f'{output_dir}/{name}') for name in ('subjects.json', 'relations.json'))
+    if incremental and state.get('SubjectsList') == subjects_hash and outputs_exist:
+        print("⏭️ SubjectsList không đổi, bỏ qua.")
+    else:
+        print("⚙️ Đang xử lý danh sách môn học...")
+        subjects_data, relations_data = build_subjects(df_subjects)
 
-    print("⚙️ Đang xử lý danh sách môn học...")
-    # Chuẩn hóa tên cột (đề phòng người dùng viết hoa/thường không chuẩn)
-    df_subjects.columns = [c.strip() for c in df_subjects.columns]
+        # --- BƯỚC 4: LƯU FILE JSON ---
+        if write_json(f'{output_dir}/subjects.json', subjects_data):
+            written.append('subjects.json')
+        if write_json(f'{output_dir}/relations.json', relations_data):
+            written.append('relations.json')
 
-    for _, row in df_subjects.iterrows():
-        try:
-            ma_mon = str(row['SubjectID']).strip()
-            
-            # --- ĐOẠN NÀY ĐÃ ĐƯỢC CẬP NHẬT ---
-            # Lấy thông tin Lý thuyết/Thực hành. Nếu để trống thì mặc định là 0.
-            theory_cred = int(row['Theory']) if pd.notna(row.get('Theory')) else 0
-            practice_cred = int(row['Practice']) if pd.notna(row.get('Practice')) else 0
-            
-            sub_item = {
-                "id": ma_mon,
-                "name": str(row['Name']).strip(),
-                "credits": int(row['Credits']),
-                "theory_credits": theory_cred,      # Mới thêm
-                "practice_credits": practice_cred,  # Mới thêm
-                "semesters_offered": [int(k) for k in clean_list_string(row['Semesters']) if str(k).isdigit()]
-            }
-            subjects_data.append(sub_item)
-
-            # Xử lý Tiên quyết
-            tien_quyet_list = clean_list_string(row['Prerequisites'])
-            for tq_id in tien_quyet_list:
-                relations_data.append({
-                    "source": tq_id,
-                    "target": ma_mon,
-                    "type": "prerequisite"
-                })
-        except Exception as e:
-            print(f"⚠️ Cảnh báo lỗi dòng môn {row.get('SubjectID', 'Unknown')}: {e}")
-
-    # --- BƯỚC 4: LƯU FILE JSON ---
-    os.makedirs(OUTPUT_BASE_DIR, exist_ok=True)
-
-    with open(f'{OUTPUT_BASE_DIR}/subjects.json', 'w', encoding='utf-8') as f:
-        json.dump(subjects_data, f, ensure_ascii=False, indent=2)
-    print(f"✅ Đã cập nhật: subjects.json (Thêm thông tin LT/TH)")
-
-    with open(f'{OUTPUT_BASE_DIR}/relations.json', 'w', encoding='utf-8') as f:
-        json.dump(relations_data, f, ensure_ascii=False, indent=2)
-
-    # --- BƯỚC 5: XỬ LÝ NGÀNH (Giữ nguyên) ---
+    # --- BƯỚC 5: XỬ LÝ NGÀNH ---
     print("⚙️ Đang tách file ngành...")
-    majors_dir = f'{OUTPUT_BASE_DIR}/majors'
+    majors_dir = f'{output_dir}/majors'
     os.makedirs(majors_dir, exist_ok=True)
 
     if 'MajorCode' in df_curriculum.columns:
-        list_nganh = df_curriculum['MajorCode'].unique()
-        for nganh in list_nganh:
-            nganh_code = str(nganh).strip()
-            df_nganh = df_curriculum[df_curriculum['MajorCode'] == nganh]
-            
-            curriculum_list = []
-            for _, row in df_nganh.iterrows():
-                curriculum_list.append({
-                    "subject_id": str(row['SubjectID']).strip(),
-                    "suggested_semester": int(row['SuggestedSem']),
-                    "type": str(row['Type']).strip()
-                })
-            
-            with open(f'{majors_dir}/{nganh_code}.json', 'w', encoding='utf-8') as f:
-                json.dump(curriculum_list, f, ensure_ascii=False, indent=2)
-    
+        old_majors = state.get('majors', {})
+        for code, (records, major_hash) in build_majors(df_curriculum).items():
+            new_state['majors'][code] = major_hash
+            out_path = f'{majors_dir}/{code}.json'
+            if incremental and old_majors.get(code) == major_hash and os.path.exists(out_path):
+                continue
+            if write_json(out_path, records):
+                written.append(f'majors/{code}.json')
+        # Ngành đã bị xóa khỏi sheet
+        if incremental:
+            for code in set(old_majors) - set(new_state['majors']):
+                stale = f'{majors_dir}/{code}.json'
+                if os.path.exists(stale):
+                    os.remove(stale)
+                    written.append(f'majors/{code}.json (xóa)')
+
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(new_state, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Đã cập nhật {len(written)} file: {', '.join(written) or '(không có thay đổi)'}")
     print("\n🎉 HOÀN TẤT! Dữ liệu mới đã sẵn sàng.")
+    return written
+
 
 if __name__ == "__main__":
-    run_conversion()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Chuyển Excel đào tạo -> data/knowledge_base")
+    parser.add_argument('--input', default=INPUT_EXCEL_PATH)
+    parser.add_argument('--output', default=OUTPUT_BASE_DIR)
+    parser.add_argument('--incremental', action='store_true', help="Chỉ ghi lại các file có sheet nguồn thay đổi")
+    parser.add_argument('--stream', action='store_true', default=None, help="Đọc bằng openpyxl read-only")
+    args = parser.parse_args()
+    result = run_conversion(args.input, args.output, args.incremental, args.stream)
+    sys.exit(0 if result is not None else 1)